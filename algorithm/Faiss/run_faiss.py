@@ -8,6 +8,8 @@ def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))  # 得到 script/Faiss 路径
     project_root = os.path.dirname(os.path.dirname(script_dir))  # 回退到项目根目录
     build_script = os.path.join(project_root, "algorithm", "Faiss", "build.sh")
+    sys.path.insert(0, os.path.join(project_root, "script"))
+    from common.memsampler import run_sampled
     
     # 确保构建脚本有执行权限
     if os.path.exists(build_script):
@@ -112,8 +114,13 @@ def main():
             # 执行命令
             print(f"\nRunning: {cmd_display}")
             print("-" * 50)
-            subprocess.run(cmd)
+            # 后台采样子进程内存；taskset 会 exec 目标程序，pid 不变
+            _, memory = run_sampled(cmd)
             print("-" * 50)
+            print(f"Peak RSS: {memory.peak_rss_mb:.1f} MB, VmHWM: {memory.vm_hwm_mb:.1f} MB, "
+                  f"faults (minor/major): {memory.minor_faults}/{memory.major_faults}, "
+                  f"ctx switches (vol/invol): {memory.vol_ctx_switches}/{memory.invol_ctx_switches}, "
+                  f"wall: {memory.wall_s:.1f} s")
         else:
             print(f"Error: Executable {exe['name']} not found in {exe_path}")
     
@@ -1,6 +1,9 @@
 #ifndef DATASTRUCTURES_HPP
 #define DATASTRUCTURES_HPP
 
+#include <cstdint>
+#include <iomanip>
+#include <sstream>
 #include <vector>
 #include <string>
 
@@ -26,14 +29,22 @@ class Query
 public:
     uint32_t imin;
     uint32_t imax;
+    double lo;  // 属性值范围 [lo, hi]，属性即 id 时与 imin / imax 相同
+    double hi;
     std::vector<float> queryVector;
 
     Query(const uint32_t &_imin, const uint32_t &_imax, const std::vector<float> &queryVec)
-        : imin(_imin), imax(_imax),
+        : imin(_imin), imax(_imax), lo(_imin), hi(_imax),
           queryVector(queryVec) {}
 
     Query(const std::vector<uint32_t> &attrs, const std::vector<float> &queryVec)
-        : imin(attrs[0]), imax(attrs[1]),
+        : imin(attrs[0]), imax(attrs[1]), lo(attrs[0]), hi(attrs[1]),
+          queryVector(queryVec)
+    {
+    }
+
+    Query(const double &_lo, const double &_hi, const std::vector<float> &queryVec)
+        : imin(toId(_lo)), imax(toId(_hi)), lo(_lo), hi(_hi),
           queryVector(queryVec)
     {
     }
@@ -43,9 +54,20 @@ public:
 
     std::string generateGroupKey()
     {
-        return std::to_string(imin) + "_" + std::to_string(imax);
+        std::ostringstream key;
+        key << std::setprecision(17) << lo << "_" << hi;
+        return key.str();
     }
 
+private:
+    static uint32_t toId(double value)
+    {
+        if (value <= 0)
+        {
+            return 0;
+        }
+        return value >= 4294967295.0 ? 4294967295u : static_cast<uint32_t>(value);
+    }
 
 };
 
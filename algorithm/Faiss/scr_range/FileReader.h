@@ -5,6 +5,11 @@
 #include <sstream>
 #include <iostream>
 #include <vector>
+#include <string>
+#include <cstdint>
+#include <utility>
+#include <algorithm>
+#include <stdexcept>
 
 #include "DataStructures.h"
 
@@ -15,9 +20,17 @@ public:
 
     static std::vector<Query> readQueries(const std::string& labelFile, const std::string& vectorFile, size_t& vectorDim) {
         std::vector<Query> queries;
-        std::ifstream labelStream(labelFile);
-        if (!labelStream.is_open()) {
-            throw std::runtime_error("Failed to open file: " + labelFile);
+        std::vector<std::pair<double, double>> ranges = readQueryRanges(labelFile);
+
+        if (isNpy(vectorFile)) {
+            std::vector<float> data = readNpyVectors(vectorFile, vectorDim);
+            if (data.size() / vectorDim < ranges.size()) {
+                throw std::runtime_error("向量文件数据不足");
+            }
+            for (size_t i = 0; i < ranges.size(); ++i) {
+                std::vector<float> vec(data.begin() + i * vectorDim, data.begin() + (i + 1) * vectorDim);
+                queries.emplace_back(ranges[i].first, ranges[i].second, vec);
+            }
             return queries;
         }
 
@@ -29,40 +42,196 @@ public:
 
         vectorStream.read(reinterpret_cast<char*>(&vectorDim), sizeof(int));
         vectorStream.seekg(0, std::ios::beg);
+
+        for (const auto& range : ranges) {
+            std::vector<float> vec(vectorDim);
+            vectorStream.seekg(4, std::ios::cur);
+            vectorStream.read(reinterpret_cast<char*>(vec.data()), vectorDim * sizeof(float));
+            if (vectorStream.gcount() != vectorDim * sizeof(float)) {
+                throw std::runtime_error("向量文件数据不足");
+                break;
+            }
+
+            queries.emplace_back(range.first, range.second, vec);
+        }
+
+        return queries;
+    }
+
+    // 读取查询范围：文本文件每行 "lo hi"，或 WinFilter 的 (nq, 2) .npy 文件
+    static std::vector<std::pair<double, double>> readQueryRanges(const std::string& labelFile) {
+        std::vector<std::pair<double, double>> ranges;
+        if (isNpy(labelFile)) {
+            std::vector<size_t> shape;
+            std::vector<double> values = readNpy(labelFile, shape);
+            if (shape.size() != 2 || shape[1] < 2) {
+                throw std::runtime_error("查询范围文件应为 (nq, 2) 数组: " + labelFile);
+            }
+            for (size_t i = 0; i < shape[0]; ++i) {
+                ranges.emplace_back(values[i * shape[1]], values[i * shape[1] + 1]);
+            }
+            return ranges;
+        }
+
+        std::ifstream labelStream(labelFile);
+        if (!labelStream.is_open()) {
+            throw std::runtime_error("Failed to open file: " + labelFile);
+        }
+
         std::string line;
-        
         //std::getline(labelStream, line);  // 跳过文件头
 
         while (std::getline(labelStream, line)) {
             std::istringstream iss(line);
-            std::vector<uint32_t> ranges(2);
+            double lo, hi;
 
             // 读取查询的范围
-            for (size_t i = 0; i < ranges.size(); ++i) {
-                uint32_t attr;
-                
-                if (!(iss >> attr)) {
-                    throw std::runtime_error("标签文件格式错误: " + line);
-                    continue;
-                }
-                ranges[i] = attr;
+            if (!(iss >> lo >> hi)) {
+                throw std::runtime_error("标签文件格式错误: " + line);
             }
+            ranges.emplace_back(lo, hi);
+        }
+        return ranges;
+    }
 
-            std::vector<float> vec(vectorDim);
-            vectorStream.seekg(4, std::ios::cur);
-            vectorStream.read(reinterpret_cast<char*>(vec.data()), vectorDim * sizeof(float));
-            if (vectorStream.gcount() != vectorDim * sizeof(float)) {
-                throw std::runtime_error("向量文件数据不足");
-                break;
+    // 读取每个数据点的属性值：.npy（如 WinFilter 的 filter-values.npy）或每行一个值的文本文件
+    static std::vector<double> readAttributeValues(const std::string& fileName) {
+        if (isNpy(fileName)) {
+            std::vector<size_t> shape;
+            std::vector<double> values = readNpy(fileName, shape);
+            if (shape.size() > 2 || (shape.size() == 2 && shape[1] != 1)) {
+                throw std::runtime_error("属性文件应为一维数组: " + fileName);
             }
+            return values;
+        }
 
-            queries.emplace_back(ranges, vec);
+        std::ifstream file(fileName);
+        if (!file) {
+            throw std::runtime_error("Failed to open file: " + fileName);
         }
+        std::vector<double> values;
+        double value;
+        while (file >> value) {
+            values.push_back(value);
+        }
+        return values;
+    }
 
-        return queries;
+    static bool isNpy(const std::string& fileName) {
+        return fileName.size() >= 4 && fileName.compare(fileName.size() - 4, 4, ".npy") == 0;
     }
 
+    // 解析 .npy 文件头，返回 descr（如 "<f4"）并填充 shape，file 停在数据起始处
+    static std::string readNpyHeader(std::ifstream& file, const std::string& fileName, std::vector<size_t>& shape) {
+        char magic[6];
+        uint8_t version[2];
+        file.read(magic, 6);
+        file.read(reinterpret_cast<char*>(version), 2);
+        if (!file || std::string(magic, 6) != "\x93NUMPY") {
+            throw std::runtime_error("不是 .npy 文件: " + fileName);
+        }
+        uint32_t headerLen = 0;
+        if (version[0] == 1) {
+            uint16_t len16;
+            file.read(reinterpret_cast<char*>(&len16), 2);
+            headerLen = len16;
+        } else {
+            file.read(reinterpret_cast<char*>(&headerLen), 4);
+        }
+        std::string header(headerLen, '\0');
+        file.read(&header[0], headerLen);
+
+        auto field = [&header, &fileName](const std::string& key) {
+            size_t pos = header.find("'" + key + "'");
+            if (pos == std::string::npos) {
+                throw std::runtime_error(".npy 文件头缺少 " + key + ": " + fileName);
+            }
+            return header.substr(header.find(':', pos) + 1);
+        };
+
+        std::string descr = field("descr");
+        descr = descr.substr(descr.find('\'') + 1);
+        descr = descr.substr(0, descr.find('\''));
+        std::string fortranOrder = field("fortran_order");
+        if (fortranOrder.compare(fortranOrder.find_first_not_of(' '), 4, "True") == 0) {
+            throw std::runtime_error("不支持 Fortran 顺序的 .npy 文件: " + fileName);
+        }
+
+        std::string shapeStr = field("shape");
+        shapeStr = shapeStr.substr(shapeStr.find('(') + 1);
+        shapeStr = shapeStr.substr(0, shapeStr.find(')'));
+        shape.clear();
+        std::istringstream shapeStream(shapeStr);
+        std::string dim;
+        while (std::getline(shapeStream, dim, ',')) {
+            if (dim.find_first_of("0123456789") != std::string::npos) {
+                shape.push_back(std::stoull(dim));
+            }
+        }
+        return descr;
+    }
+
+    // 读取 C 顺序、小端的数值型 .npy 文件，统一转换为 double
+    static std::vector<double> readNpy(const std::string& fileName, std::vector<size_t>& shape) {
+        std::ifstream file(fileName, std::ios::binary);
+        if (!file) {
+            throw std::runtime_error("Failed to open file: " + fileName);
+        }
+        std::string descr = readNpyHeader(file, fileName, shape);
+        size_t count = 1;
+        for (size_t d : shape) {
+            count *= d;
+        }
+
+        std::vector<double> values(count);
+        auto readAs = [&](auto tag) {
+            using T = decltype(tag);
+            std::vector<T> raw(count);
+            file.read(reinterpret_cast<char*>(raw.data()), count * sizeof(T));
+            if (static_cast<size_t>(file.gcount()) != count * sizeof(T)) {
+                throw std::runtime_error(".npy 文件数据不足: " + fileName);
+            }
+            std::copy(raw.begin(), raw.end(), values.begin());
+        };
+
+        if (descr == "<f4") readAs(float());
+        else if (descr == "<f8") readAs(double());
+        else if (descr == "<i4") readAs(int32_t());
+        else if (descr == "<i8") readAs(int64_t());
+        else if (descr == "<u4") readAs(uint32_t());
+        else if (descr == "<u8") readAs(uint64_t());
+        else if (descr == "<i2") readAs(int16_t());
+        else if (descr == "<u2") readAs(uint16_t());
+        else throw std::runtime_error("不支持的 .npy 数据类型 " + descr + ": " + fileName);
+
+        return values;
+    }
+
+    // 读取 (n, d) float32 .npy 向量文件（WinFilter 的数据格式），直接读入 float 避免转换为 double
+    static std::vector<float> readNpyVectors(const std::string& fileName, size_t& vectorDim) {
+        std::ifstream file(fileName, std::ios::binary);
+        if (!file) {
+            throw std::runtime_error("Failed to open file: " + fileName);
+        }
+        std::vector<size_t> shape;
+        std::string descr = readNpyHeader(file, fileName, shape);
+        if (shape.size() != 2 || descr != "<f4") {
+            throw std::runtime_error("向量文件应为 (n, d) float32 数组: " + fileName);
+        }
+        vectorDim = shape[1];
+        std::vector<float> data(shape[0] * shape[1]);
+        file.read(reinterpret_cast<char*>(data.data()), data.size() * sizeof(float));
+        if (static_cast<size_t>(file.gcount()) != data.size() * sizeof(float)) {
+            throw std::runtime_error(".npy 文件数据不足: " + fileName);
+        }
+        return data;
+    }
+
+    // 读取 .fvecs 向量文件；.npy 文件交给 readNpyVectors
     static std::vector<float> readIvecs(const std::string& fileName, size_t& vectorDim) {
+        if (isNpy(fileName)) {
+            return readNpyVectors(fileName, vectorDim);
+        }
         std::ifstream file(fileName, std::ios::binary | std::ios::ate);
         if (!file) {
             throw std::runtime_error("Failed to open file: " + fileName);
@@ -125,7 +294,20 @@ public:
         return data;
     }
 
+    // 读取文本 ground truth（每行一个查询的近邻 id），或 WinFilter 的 (nq, k) .npy 文件
     static std::vector<std::vector<int>> readGroundTruth_txt(const std::string& fileName) {
+        if (isNpy(fileName)) {
+            std::vector<size_t> shape;
+            std::vector<double> values = readNpy(fileName, shape);
+            if (shape.size() != 2) {
+                throw std::runtime_error("ground truth 文件应为 (nq, k) 数组: " + fileName);
+            }
+            std::vector<std::vector<int>> data(shape[0]);
+            for (size_t i = 0; i < shape[0]; ++i) {
+                data[i].assign(values.begin() + i * shape[1], values.begin() + (i + 1) * shape[1]);
+            }
+            return data;
+        }
         std::ifstream file(fileName);  // 移除 std::ios::binary 标志
         if (!file) {
             throw std::runtime_error("Failed to open file: " + fileName);
@@ -13,6 +13,7 @@
 #include <fstream>
 #include <iomanip> 
 #include <cstdlib>
+#include <numeric>
 
 #include <faiss/IVFlib.h>
 #include <faiss/IndexIVF.h>
@@ -27,6 +28,10 @@
 
 #include "FileReader.h"
 #include "DataStructures.h"
+#include "RangeIndex.h"
+#include "RunStats.h"
+#include "LatencyHistogram.h"
+#include "MemorySampler.h"
 
 using idx_t = faiss::idx_t;
 
@@ -34,6 +39,7 @@ class HybridSearchExperiment {
 public:
     std::string dataset;
     std::string vectorFileBase;
+    std::string attributeFileBase;  // 每个数据点的属性值，为空时属性即 id（数据已按属性排序）
     std::string labelFileQuery;
     std::string vectorFileQuery;
     std::string groundTruthFile;
@@ -51,6 +57,12 @@ public:
     size_t cycleNum;
     bool isBatch;
     bool isSaveToFile;
+    bool useMmap;  // 以 mmap 方式打开缓存的索引，多个进程共享同一份页缓存
+    size_t warmupRuns;             // 每个 nprobe 前若干次运行作为预热丢弃（cycleNum 不大于它时不丢弃）
+    double stabilityCvThreshold;   // QPS / 延迟的变异系数不超过该值时标记为稳定
+    bool latencyTrace;             // 为每组参数写出逐查询延迟的二进制记录 (.qlat)
+    int memorySampleIntervalMs;    // 后台内存采样间隔
+    bool memoryTrace;              // 写出构建 / 每组参数的内存时间序列 (.mem.csv)
 
     
 
@@ -59,6 +71,12 @@ public:
           cycleNum(3), 
           isSaveToFile(true), 
           isBatch(false), 
+          useMmap(false),
+          warmupRuns(1),
+          stabilityCvThreshold(0.05),
+          latencyTrace(false),
+          memorySampleIntervalMs(10),
+          memoryTrace(false),
           vectorDim(0), 
           index_key("IVF1000,Flat"),
           index_path("../../index/") {}
@@ -66,6 +84,10 @@ public:
         vectorFileBase = vectorBase;  
     }
 
+    void setAttributeFile(const std::string& attributeBase) {
+        attributeFileBase = attributeBase;
+    }
+
     void setBulidIndexResultFile(const std::string& buildIndexResult){
         buildIndexResultFile = buildIndexResult;
     }
@@ -115,10 +137,47 @@ public:
         isSaveToFile = _isSaveToFile;
     }
 
+    void setUseMmap(const bool& _useMmap) {
+        useMmap = _useMmap;
+    }
+
+    void setWarmupRuns(const size_t& _warmupRuns) {
+        warmupRuns = _warmupRuns;
+    }
+
+    void setStabilityThreshold(const double& _stabilityCvThreshold) {
+        stabilityCvThreshold = _stabilityCvThreshold;
+    }
+
+    void setLatencyTrace(const bool& _latencyTrace) {
+        latencyTrace = _latencyTrace;
+    }
+
+    void setMemorySampling(const int& _intervalMs, const bool& _memoryTrace) {
+        memorySampleIntervalMs = _intervalMs;
+        memoryTrace = _memoryTrace;
+    }
+
     void buildIndex() {
+        // 按属性值重排的数据使用单独的索引文件；属性模式的基础向量为 WinFilter 的 .npy，
+        // 与早先按 .fvecs 顺序构建的 _attrsorted 索引不同，换用新文件名避免误用旧索引
+        bool sortByAttribute = !attributeFileBase.empty();
+        if (sortByAttribute) {
+            auto startRangeIndex = std::chrono::high_resolution_clock::now();
+            rangeIndex_.build(FileReader::readAttributeValues(attributeFileBase));
+            auto endRangeIndex = std::chrono::high_resolution_clock::now();
+            std::cout << "Range index build time: "
+                      << std::chrono::duration_cast<std::chrono::milliseconds>(endRangeIndex - startRangeIndex).count()
+                      << " ms" << std::endl;
+        }
+
         // 索引文件路径
-        std::string stored_name = index_path + dataset + "_" + index_key + ".faissindex";
+        std::string stored_name = index_path + dataset + "_" + index_key
+            + (sortByAttribute ? "_attrsorted_winfilter" : "") + ".faissindex";
     
+        // 记录加载索引前的常驻内存，用于拆分索引 / 查询各自占用的内存
+        getResidentMemory(memAnonBeforeIndex_, memFileBeforeIndex_);
+
         // 如果索引文件不存在，创建并保存
         
         if (access(stored_name.c_str(), F_OK) != 0) {
@@ -126,6 +185,8 @@ public:
             int thread_num = omp_get_max_threads();
             omp_set_num_threads(thread_num);
 
+            MemorySampler sampler(memorySampleIntervalMs);
+            sampler.start();
             auto startIndexTime = std::chrono::high_resolution_clock::now();
             // 读取数据点
             std::vector<float> data = FileReader::readIvecs(vectorFileBase, vectorDim);
@@ -134,7 +195,25 @@ public:
             std::cout << "Creating index..." << std::endl;
             index.reset(faiss::index_factory(vectorDim, index_key.c_str()));
             index->train(nb, xb);
-            index->add(nb, xb);
+            if (sortByAttribute) {
+                if (rangeIndex_.size() != nb) {
+                    throw std::runtime_error("属性文件行数与向量数不一致: " + attributeFileBase);
+                }
+                // 按属性值从小到大插入，索引内 id 即为属性值的 rank
+                const std::vector<uint32_t>& order = rangeIndex_.order();
+                const size_t chunk = 65536;
+                std::vector<float> buffer(chunk * vectorDim);
+                for (size_t start = 0; start < nb; start += chunk) {
+                    size_t n = std::min(chunk, nb - start);
+                    for (size_t i = 0; i < n; ++i) {
+                        std::copy(xb + order[start + i] * vectorDim, xb + (order[start + i] + 1) * vectorDim,
+                                  buffer.begin() + i * vectorDim);
+                    }
+                    index->add(n, buffer.data());
+                }
+            } else {
+                index->add(nb, xb);
+            }
             std::cout << "Index created." << std::endl;
     
             // 计算索引构建时间
@@ -151,11 +230,14 @@ public:
             // 获取索引构建时的内存占用
             float indexActualMem, indexVirtualMem;
             getMemoryUsage(indexActualMem, indexVirtualMem);
+            MemorySampler::Summary memory = sampler.stop();
+            saveMemorySeries(sampler, buildIndexResultFile);
     
             // 保存索引构建结果
             std::ostringstream indexResult;
-            indexResult << "query_set,memory_mb,build_time,index_size_mb" << std::endl;
-            indexResult  << "1," << indexActualMem << "," << indexBuildTime << "," << indexSize << "," << std::endl;
+            indexResult << "query_set,memory_mb,build_time,index_size_mb,peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches" << std::endl;
+            indexResult  << "1," << indexActualMem << "," << indexBuildTime << "," << indexSize
+                         << "," << memorySummaryColumns(memory) << "," << std::endl;
             
             saveResultsToFile(indexResult.str(), false, false); // 仅第一次保存
 
@@ -164,10 +246,36 @@ public:
             std::cout << "Index Build Time: " << indexBuildTime << " s" << std::endl;
             std::cout << "Index size: " << indexSize << " MB" << std::endl;
             std::cout << "Memory (VIRT/RES): " << indexActualMem << " MB / " << indexVirtualMem << " MB" << std::endl;
+            std::cout << "Peak RSS / VmHWM: " << memory.peakRssMB << " MB / " << memory.hwmMB << " MB" << std::endl;
+
+            // mmap 模式下重新以 mmap 方式打开刚写出的文件，与之后的运行保持一致
+            if (useMmap) {
+                data.clear();
+                data.shrink_to_fit();
+                index.reset();
+                getResidentMemory(memAnonBeforeIndex_, memFileBeforeIndex_);
+                loadIndex(stored_name);
+            }
         } else {
-            std::cout << "Loading index from file: " << stored_name << std::endl;
-            index.reset(faiss::read_index(stored_name.c_str()));
+            loadIndex(stored_name);
+            if (sortByAttribute && rangeIndex_.size() != static_cast<size_t>(index->ntotal)) {
+                throw std::runtime_error("属性文件行数与索引向量数不一致: " + attributeFileBase);
+            }
         }
+        float fileMem;
+        getResidentMemory(memAnonAfterIndex_, fileMem);
+    }
+
+    // 读取缓存的索引；useMmap 时倒排表直接映射索引文件（IVF 只读），启动时不再整体读入内存
+    void loadIndex(const std::string& stored_name) {
+        std::cout << "Loading index from file: " << stored_name << (useMmap ? " (mmap)" : "") << std::endl;
+        auto startLoad = std::chrono::high_resolution_clock::now();
+        int io_flags = useMmap ? (faiss::IO_FLAG_MMAP | faiss::IO_FLAG_READ_ONLY) : 0;
+        index.reset(faiss::read_index(stored_name.c_str(), io_flags));
+        auto endLoad = std::chrono::high_resolution_clock::now();
+        std::cout << "Index load time: "
+                  << std::chrono::duration_cast<std::chrono::milliseconds>(endLoad - startLoad).count()
+                  << " ms" << std::endl;
     }
 
     void run() {
@@ -197,14 +305,31 @@ public:
                     << std::setw(11) << "Recall@10" 
                     << std::setw(9) << "RES(MB)"
                     << std::setw(10) << "VIRT(MB)"  
+                    << std::setw(9) << "IDX(MB)"
+                    << std::setw(9) << "QRY(MB)"
                     << std::setw(23) << "total_filter_time(ms)" 
                     << std::setw(21) << "avg_filter_time(ms)" 
                     << std::setw(23) << "total_search_time(ms)" 
-                    << std::setw(21) << "avg_search_time(ms)" << std::endl;
+                    << std::setw(21) << "avg_search_time(ms)"
+                    << std::setw(6) << "runs"
+                    << std::setw(22) << "QPS CI95"
+                    << std::setw(12) << "QPS CV"
+                    << std::setw(7) << "stable"
+                    << std::setw(20) << "p50/p99(ms)"
+                    << std::setw(10) << "PEAK(MB)" << std::endl;
 
             //threadNumAndCsvHeader << "Thread Num: " << thread_num << std::endl;
             threadNumAndCsvHeader << "nprobe,Query Time(ms),QPS,Recall@" << k 
-                << ",RES(MB),VIRT(MB),total_filter_time(ms),avg_filter_time(ms),total_search_time(ms),avg_search_time(ms)" << std::endl;
+                << ",RES(MB),VIRT(MB),index_mem_mb,query_mem_mb,total_filter_time(ms),avg_filter_time(ms),total_search_time(ms),avg_search_time(ms),runs"
+                << ",qps_median,qps_mean,qps_min,qps_max,qps_std,qps_ci_low,qps_ci_high,qps_cv"
+                << ",latency_median_ms,latency_mean_ms,latency_min_ms,latency_max_ms,latency_std_ms,latency_ci_low_ms,latency_ci_high_ms,latency_cv"
+                << ",stable";
+            for (const char* stage : {"filter", "search", "total"}) {
+                for (const char* p : {"p50", "p95", "p99", "p999"}) {
+                    threadNumAndCsvHeader << "," << stage << "_" << p << "_ms";
+                }
+            }
+            threadNumAndCsvHeader << ",peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches,avg_rss_mb" << std::endl;
             saveResultsToFile(threadNumAndCsvHeader.str(), true, false);
                 
             
@@ -213,76 +338,118 @@ public:
             for (int nprobe : nprobe_values) {
                 index_ivf->nprobe = nprobe;  // 设置 nprobe
                 
-                std::vector<std::vector<idx_t>> results(queries.size());
-                double best_total_filter_time = 0;
-                double best_total_search_time = 0;
-                double best_queryTime = std::numeric_limits<double>::max();
-                float best_qps = 0.0f;
-                float recall = 0.0f;
-                float best_searchActualMem, best_searchVirtualMem;
-
-                // 运行 cycleNum 次测试，取 qps 最低的一次的结果
+                // 运行 cycleNum 次测试，保留每次的结果；前 warmupRuns 次作为预热丢弃
+                std::vector<CycleResult> cycles;
+                MemorySampler sampler(memorySampleIntervalMs);  // 覆盖该组参数的所有运行
+                sampler.start();
                 for(int i = 0 ; i < cycleNum; i++){
                     
                     // 执行搜索
-                    double queryTime, total_filter_time, total_search_time;
-                    std::vector<std::vector<idx_t>> searchResults;
+                    CycleResult cycle;
 
                     if(isBatch){
                         index_ivf->parallel_mode = 3;
                         omp_set_num_threads(thread_num);
-                        std::tie(queryTime, total_filter_time, total_search_time, searchResults) = 
+                        std::tie(cycle.queryTime, cycle.filterTime, cycle.searchTime, cycle.results, cycle.latencies) = 
                             executeGroupedSearch(queries, nb, nprobe, k);
                     }
                     else{
                         omp_set_num_threads(thread_num);
-                        std::tie(queryTime, total_filter_time, total_search_time, searchResults) = 
+                        std::tie(cycle.queryTime, cycle.filterTime, cycle.searchTime, cycle.results, cycle.latencies) = 
                             executeSearch(queries, nb, nprobe, thread_num, k);
-                    
-                    
+                    }
         
-                        float qps = queries.size() / (queryTime / 1000000.0);
-            
-                        // 计算搜索时的内存占用
-                        float searchActualMem, searchVirtualMem;
-                        getMemoryUsage(searchActualMem, searchVirtualMem);
-
-                        if(queryTime < best_queryTime){
-                            best_queryTime = queryTime;
-                            best_qps = qps;
-                            best_searchActualMem = searchActualMem;
-                            best_searchVirtualMem = searchVirtualMem;
-                            best_total_filter_time = total_filter_time;
-                            best_total_search_time = total_search_time;
-                            results = std::move(searchResults);
-                        }
+                    cycle.qps = queries.size() / (cycle.queryTime / 1000000.0);
+        
+                    // 计算搜索时的内存占用
+                    getMemoryUsage(cycle.actualMem, cycle.virtualMem);
+                    getIndexQueryMemory(cycle.indexMem, cycle.queryMem);
+
+                    if (i >= warmupRuns || cycleNum <= warmupRuns) {
+                        cycles.push_back(std::move(cycle));
                     }
                 }
+
+                MemorySampler::Summary memory = sampler.stop();
+
+                // QPS 与单查询延迟（过滤 + 搜索，ms）的统计量
+                std::vector<double> qpsSamples, latencySamples;
+                StageHistograms histograms;  // 所有保留运行的逐查询延迟
+                for (const CycleResult& cycle : cycles) {
+                    qpsSamples.push_back(cycle.qps);
+                    histograms.add(cycle.latencies);
+                    latencySamples.push_back((cycle.filterTime + cycle.searchTime) / (queries.size() * 1000.0));
+                }
+                RunStats qpsStats = RunStats::compute(qpsSamples);
+                RunStats latencyStats = RunStats::compute(latencySamples);
+                bool stable = qpsStats.stable(stabilityCvThreshold) && latencyStats.stable(stabilityCvThreshold);
+
+                // 单次运行的各列取 QPS 为中位数的那次运行（偶数次时取较慢的一次）
+                std::vector<size_t> byQps(cycles.size());
+                std::iota(byQps.begin(), byQps.end(), 0);
+                std::sort(byQps.begin(), byQps.end(), [&cycles](size_t a, size_t b) {
+                    return cycles[a].qps < cycles[b].qps;
+                });
+                const CycleResult& median = cycles[byQps[(byQps.size() - 1) / 2]];
     
                 // 计算 Recall
-                recall = computeRecall(results, groundTruth, k);
+                float recall = computeRecall(median.results, groundTruth, k);
+
+                saveMemorySeries(sampler, resultFile.substr(0, resultFile.rfind(".csv"))
+                    + "_t" + std::to_string(thread_num) + "_np" + std::to_string(nprobe) + ".csv");
+
+                if (latencyTrace && isSaveToFile) {
+                    std::string tracePath = resultFile.substr(0, resultFile.rfind(".csv"))
+                        + "_t" + std::to_string(thread_num) + "_np" + std::to_string(nprobe) + ".qlat";
+                    writeLatencyTrace(tracePath, median.latencies);
+                }
     
                 // 保存搜索过程结果
                 std::ostringstream searchResult;
-                double avg_filter_time = best_total_filter_time / (queries.size() * 1000.0); // 转换为毫秒
-                double avg_search_time = best_total_search_time / (queries.size() * 1000.0); // 转换为毫秒
+                double avg_filter_time = median.filterTime / (queries.size() * 1000.0); // 转换为毫秒
+                double avg_search_time = median.searchTime / (queries.size() * 1000.0); // 转换为毫秒
+
+                std::ostringstream qpsCi;
+                qpsCi << std::fixed << std::setprecision(1) << qpsStats.ciLow << "-" << qpsStats.ciHigh;
 
                 std::cout << std::setw(8) << nprobe 
-                            << std::setw(16) << best_queryTime / 1000.0
-                            << std::setw(10) << best_qps 
+                            << std::setw(16) << median.queryTime / 1000.0
+                            << std::setw(10) << median.qps 
                             << std::setw(11) << recall 
-                            << std::setw(9) << best_searchActualMem 
-                            << std::setw(10) << best_searchVirtualMem
-                            << std::setw(23) << (best_total_filter_time / 1000.0) 
+                            << std::setw(9) << median.actualMem 
+                            << std::setw(10) << median.virtualMem
+                            << std::setw(9) << median.indexMem
+                            << std::setw(9) << median.queryMem
+                            << std::setw(23) << (median.filterTime / 1000.0) 
                             << std::setw(21) << avg_filter_time
-                            << std::setw(23) << (best_total_search_time / 1000.0) 
-                            << std::setw(21) << avg_search_time << std::endl;
-
-                searchResult << nprobe << "," << best_queryTime / 1000.0 << "," << best_qps << "," << recall 
-                             << "," << best_searchActualMem 
-                             << "," << best_searchVirtualMem 
-                             << "," << best_total_filter_time / 1000.0 << "," << avg_filter_time 
-                             << "," << best_total_search_time / 1000.0 << "," << avg_search_time << std::endl;
+                            << std::setw(23) << (median.searchTime / 1000.0) 
+                            << std::setw(21) << avg_search_time
+                            << std::setw(6) << qpsStats.runs
+                            << std::setw(22) << qpsCi.str()
+                            << std::setw(12) << qpsStats.cv
+                            << std::setw(7) << (stable ? "yes" : "no")
+                            << std::setw(20) << (std::to_string(histograms.total.percentileMs(50)).substr(0, 7) + "/"
+                                                 + std::to_string(histograms.total.percentileMs(99)).substr(0, 7))
+                            << std::setw(10) << memory.peakRssMB << std::endl;
+
+                searchResult << nprobe << "," << median.queryTime / 1000.0 << "," << median.qps << "," << recall 
+                             << "," << median.actualMem 
+                             << "," << median.virtualMem 
+                             << "," << median.indexMem << "," << median.queryMem
+                             << "," << median.filterTime / 1000.0 << "," << avg_filter_time 
+                             << "," << median.searchTime / 1000.0 << "," << avg_search_time
+                             << "," << qpsStats.runs;
+                for (const RunStats* stats : {&qpsStats, &latencyStats}) {
+                    searchResult << "," << stats->median << "," << stats->mean << "," << stats->min << "," << stats->max
+                                 << "," << stats->stddev << "," << stats->ciLow << "," << stats->ciHigh << "," << stats->cv;
+                }
+                searchResult << "," << (stable ? 1 : 0);
+                for (const LatencyHistogram* histogram : {&histograms.filter, &histograms.search, &histograms.total}) {
+                    for (double p : {50.0, 95.0, 99.0, 99.9}) {
+                        searchResult << "," << histogram->percentileMs(p);
+                    }
+                }
+                searchResult << "," << memorySummaryColumns(memory) << "," << memory.avgRssMB << std::endl;
                 saveResultsToFile(searchResult.str());
             }
             //std::cout << "--------------------------------------" << std::endl;
@@ -291,40 +458,39 @@ public:
     
 
 private:
-
-    // 生成位图
-    // 类成员变量
-    static constexpr uint8_t BIT_MASKS[8] = {0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80};
-
-    std::vector<uint8_t> generateBitmap(const Query& query) {
-        const size_t nb = index->ntotal;
-        const size_t imin = query.imin;
-        const size_t imax = query.imax;
-        
-        std::vector<uint8_t> bitmap((nb + 7) / 8, 0);
-        
-        // 计算完整字节范围
-        size_t start_byte = (imin + 7) / 8;
-        size_t end_byte = imax / 8;
-        
-        // 1. 处理起始的不完整字节
-        if (imin / 8 == start_byte - 1) {
-            uint8_t mask = 0xFF << (imin % 8);
-            bitmap[imin / 8] = mask;
+    // 一次完整查询集运行的结果
+    struct CycleResult {
+        double queryTime = 0, filterTime = 0, searchTime = 0;  // us
+        float qps = 0;
+        float actualMem = 0, virtualMem = 0, indexMem = 0, queryMem = 0;
+        std::vector<std::vector<idx_t>> results;
+        std::vector<QueryLatency> latencies;  // 按查询序号
+    };
+
+    float memAnonBeforeIndex_ = 0;  // 加载索引前后的常驻内存 (MB)
+    float memFileBeforeIndex_ = 0;
+    float memAnonAfterIndex_ = 0;
+
+    RangeIndex rangeIndex_;  // 属性值的有序排列，attributeFileBase 为空时不使用
+
+    // 查询范围对应的索引内 id 区间 [first, second)，无需为每个查询分配位图
+    std::pair<idx_t, idx_t> queryIdRange(const Query& query, size_t nb) const {
+        if (rangeIndex_.empty()) {
+            return RangeIndex::idRange(query.lo, query.hi, nb);
         }
-        
-        // 2. 设置中间的完整字节
-        if (start_byte <= end_byte) {
-            std::memset(&bitmap[start_byte], 0xFF, end_byte - start_byte + 1);
+        return rangeIndex_.range(query.lo, query.hi);
+    }
+
+    // 按属性重排时，将索引内 id (rank) 映射回原始 id
+    void mapToOriginalIds(idx_t* ids, size_t n) const {
+        if (rangeIndex_.empty()) {
+            return;
         }
-        
-        // 3. 处理结束的不完整字节
-        if (imax / 8 == end_byte && imax % 8 != 7) {
-            uint8_t mask = (1 << ((imax % 8) + 1)) - 1;
-            bitmap[end_byte] = (bitmap[end_byte] & ~mask) | mask;
+        for (size_t i = 0; i < n; ++i) {
+            if (ids[i] >= 0) {
+                ids[i] = rangeIndex_.originalId(ids[i]);
+            }
         }
-        
-        return bitmap;
     }
 
     float computeRecall(const std::vector<std::vector<idx_t>>& results,
@@ -371,6 +537,52 @@ private:
         }
     }
 
+    // peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches
+    static std::string memorySummaryColumns(const MemorySampler::Summary& memory) {
+        std::ostringstream columns;
+        columns << memory.peakRssMB << "," << memory.hwmMB << "," << memory.minorFaults << "," << memory.majorFaults
+                << "," << memory.voluntaryCtx << "," << memory.involuntaryCtx;
+        return columns.str();
+    }
+
+    // 内存时间序列写在对应结果文件旁：<结果文件名>.mem.csv
+    void saveMemorySeries(const MemorySampler& sampler, const std::string& csvFile) const {
+        if (!memoryTrace || !isSaveToFile) {
+            return;
+        }
+        sampler.saveSeries(csvFile.substr(0, csvFile.rfind(".csv")) + ".mem.csv");
+    }
+
+    // 常驻内存按匿名页 / 文件页拆分 (MB)，mmap 打开的索引计入文件页
+    void getResidentMemory(float& anonMem, float& fileMem) {
+        std::ifstream status("/proc/self/status");
+        std::string line;
+        anonMem = fileMem = 0;
+        while (std::getline(status, line)) {
+            std::istringstream iss(line);
+            std::string field;
+            float kb;
+            if (!(iss >> field >> kb)) {
+                continue;
+            }
+            if (field == "RssAnon:") {
+                anonMem = kb / 1024.0;
+            } else if (field == "RssFile:" || field == "RssShmem:") {
+                fileMem += kb / 1024.0;
+            }
+        }
+    }
+
+    // 索引内存 = 加载索引带来的匿名页增量 + 此后增加的文件页（mmap 的索引页在搜索时才被换入）
+    // 查询内存 = 索引加载后增加的匿名页（标签、查询、位图、结果等）
+    void getIndexQueryMemory(float& indexMem, float& queryMem) {
+        float anonMem, fileMem;
+        getResidentMemory(anonMem, fileMem);
+        indexMem = std::max(0.0f, memAnonAfterIndex_ - memAnonBeforeIndex_)
+                 + std::max(0.0f, fileMem - memFileBeforeIndex_);
+        queryMem = std::max(0.0f, anonMem - memAnonAfterIndex_);
+    }
+
     void getIndexSize(float& indexFileSize, const std::string& indexFilePath) {
         std::ifstream file(indexFilePath, std::ios::binary | std::ios::ate);
         if (!file.is_open()) {
@@ -424,11 +636,12 @@ private:
     }
     
     // 执行并行搜索操作并返回性能指标
-    std::tuple<double, double, double, std::vector<std::vector<idx_t>>> 
+    std::tuple<double, double, double, std::vector<std::vector<idx_t>>, std::vector<QueryLatency>> 
     executeSearch(std::vector<Query>& queries, 
                   size_t nb, int nprobe, int thread_num, size_t k) {
         
         std::vector<std::vector<idx_t>> results(queries.size());
+        std::vector<QueryLatency> latencies(queries.size());  // 预分配，每个查询的槽位只由执行它的线程写入
         double total_filter_time = 0;
         double total_search_time = 0;
         
@@ -443,15 +656,16 @@ private:
             std::vector<idx_t> I(k);
             std::vector<float> D(k);
 
-            // 计时 generateBitmap
-            auto start_bitmap = std::chrono::high_resolution_clock::now();
-            std::vector<uint8_t> bitmap = generateBitmap(query);
-            auto end_bitmap = std::chrono::high_resolution_clock::now();
-            total_filter_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_bitmap - start_bitmap).count();
+            // 计时过滤：范围 -> id 区间
+            auto start_filter = std::chrono::high_resolution_clock::now();
+            std::pair<idx_t, idx_t> idRange = queryIdRange(query, nb);
+            auto end_filter = std::chrono::high_resolution_clock::now();
+            double filterTime = std::chrono::duration<double, std::micro>(end_filter - start_filter).count();
+            total_filter_time += filterTime;
 
+            // 倒排表内 id 按插入顺序递增，assume_sorted 让 IVF 直接二分定位区间
             faiss::IVFSearchParameters params;
-            faiss::IDSelectorBitmap sel((nb + 7) / 8, bitmap.data());
+            faiss::IDSelectorRange sel(idRange.first, idRange.second, true);
             params.sel = &sel;
             params.nprobe = nprobe;
 
@@ -460,25 +674,28 @@ private:
             faiss::ivflib::search_with_parameters(
                 index.get(), 1, xq, k, D.data(), I.data(), &params);
             auto end_search = std::chrono::high_resolution_clock::now();
-            total_search_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_search - start_search).count();
+            double searchTime = std::chrono::duration<double, std::micro>(end_search - start_search).count();
+            total_search_time += searchTime;
 
+            mapToOriginalIds(I.data(), I.size());
             results[qIndex] = std::move(I);
+            latencies[qIndex] = {static_cast<float>(filterTime), static_cast<float>(searchTime)};
         }
 
         // 计算查询时间
         auto endQueryTime = std::chrono::high_resolution_clock::now();
         double queryTime = std::chrono::duration_cast<std::chrono::microseconds>(endQueryTime - startQueryTime).count();
         
-        return {queryTime, total_filter_time, total_search_time, results};
+        return {queryTime, total_filter_time, total_search_time, results, latencies};
     }
 
     // 执行基于分组的搜索操作并返回性能指标
-    std::tuple<double, double, double, std::vector<std::vector<idx_t>>> 
+    std::tuple<double, double, double, std::vector<std::vector<idx_t>>, std::vector<QueryLatency>> 
     executeGroupedSearch(std::vector<Query>& queries, 
                         size_t nb, int nprobe, size_t k) {
         
         std::vector<std::vector<idx_t>> results(queries.size());
+        std::vector<QueryLatency> latencies(queries.size());  // 预分配，每个查询的槽位只由执行它的线程写入
         double total_filter_time = 0;
         double total_search_time = 0;
         
@@ -513,15 +730,15 @@ private:
             std::vector<idx_t> I(k * nq);
             std::vector<float> D(k * nq);
 
-            // 计时 generateBitmap
-            auto start_bitmap = std::chrono::high_resolution_clock::now();
-            std::vector<uint8_t> bitmap = generateBitmap(queries[queryGroup[0]]);
-            auto end_bitmap = std::chrono::high_resolution_clock::now();
-            total_filter_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_bitmap - start_bitmap).count();
+            // 计时过滤：范围 -> id 区间
+            auto start_filter = std::chrono::high_resolution_clock::now();
+            std::pair<idx_t, idx_t> idRange = queryIdRange(queries[queryGroup[0]], nb);
+            auto end_filter = std::chrono::high_resolution_clock::now();
+            double filterTime = std::chrono::duration<double, std::micro>(end_filter - start_filter).count();
+            total_filter_time += filterTime;
 
             faiss::IVFSearchParameters params;
-            faiss::IDSelectorBitmap sel((nb + 7) / 8, bitmap.data());
+            faiss::IDSelectorRange sel(idRange.first, idRange.second, true);
             params.sel = &sel;
             params.nprobe = nprobe;
 
@@ -530,12 +747,16 @@ private:
             faiss::ivflib::search_with_parameters(
                 index.get(), nq, xq.data(), k, D.data(), I.data(), &params);
             auto end_search = std::chrono::high_resolution_clock::now();
-            total_search_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_search - start_search).count();
+            double searchTime = std::chrono::duration<double, std::micro>(end_search - start_search).count();
+            total_search_time += searchTime;
 
+            mapToOriginalIds(I.data(), I.size());
+            // 同组查询一起返回，每个查询记整组耗时的均摊值，分位数才反映单个查询而非组大小
+            QueryLatency perQuery = {static_cast<float>(filterTime / nq), static_cast<float>(searchTime / nq)};
             for (size_t i = 0; i < nq; ++i) {
                 size_t queryIndex = queryGroup[i];
                 results[queryIndex].assign(I.begin() + i * k, I.begin() + (i + 1) * k);
+                latencies[queryIndex] = perQuery;
             }
         }
 
@@ -543,7 +764,7 @@ private:
         auto endQueryTime = std::chrono::high_resolution_clock::now();
         double queryTime = std::chrono::duration_cast<std::chrono::microseconds>(endQueryTime - startQueryTime).count();
         
-        return {queryTime, total_filter_time, total_search_time, results};
+        return {queryTime, total_filter_time, total_search_time, results, latencies};
     }
     
 };
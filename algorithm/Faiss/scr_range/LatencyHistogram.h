@@ -0,0 +1,125 @@
+#ifndef LATENCYHISTOGRAM_H
+#define LATENCYHISTOGRAM_H
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <cstdio>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+// 单个查询各阶段耗时 (us)
+struct QueryLatency {
+    float filterUs = 0;
+    float searchUs = 0;
+};
+
+// HDR 风格的对数分桶直方图（单位 ns）：
+// 小于 2^SUB_BITS 的值精确计数，之后每个 [2^e, 2^(e+1)) 区间均分为 2^SUB_BITS 个桶，
+// 相对误差不超过 1 / 2^SUB_BITS，桶数固定，合并只需逐桶相加
+class LatencyHistogram {
+public:
+    static constexpr int SUB_BITS = 7;
+    static constexpr uint64_t SUB_COUNT = uint64_t(1) << SUB_BITS;
+    static constexpr size_t NUM_BUCKETS = (64 - SUB_BITS + 1) * SUB_COUNT;
+
+    LatencyHistogram() : counts_(NUM_BUCKETS, 0) {}
+
+    void record(uint64_t ns) {
+        counts_[bucketOf(ns)]++;
+        total_++;
+    }
+
+    void recordUs(double us) {
+        record(us > 0 ? static_cast<uint64_t>(us * 1000.0 + 0.5) : 0);
+    }
+
+    void merge(const LatencyHistogram& other) {
+        for (size_t i = 0; i < NUM_BUCKETS; ++i) {
+            counts_[i] += other.counts_[i];
+        }
+        total_ += other.total_;
+    }
+
+    uint64_t count() const { return total_; }
+
+    // 第 p 百分位 (0 < p <= 100)，返回所在桶的中点，单位 ns
+    double percentile(double p) const {
+        if (total_ == 0) {
+            return 0;
+        }
+        uint64_t rank = static_cast<uint64_t>(std::ceil(p / 100.0 * total_));
+        rank = std::max<uint64_t>(1, std::min<uint64_t>(rank, total_));
+        uint64_t seen = 0;
+        for (size_t i = 0; i < NUM_BUCKETS; ++i) {
+            seen += counts_[i];
+            if (seen >= rank) {
+                return bucketMidpoint(i);
+            }
+        }
+        return bucketMidpoint(NUM_BUCKETS - 1);
+    }
+
+    double percentileMs(double p) const { return percentile(p) / 1e6; }
+
+private:
+    static size_t bucketOf(uint64_t v) {
+        if (v < SUB_COUNT) {
+            return static_cast<size_t>(v);
+        }
+        int exponent = 63 - __builtin_clzll(v);
+        int shift = exponent - SUB_BITS;
+        uint64_t mantissa = v >> shift;  // [SUB_COUNT, 2 * SUB_COUNT)
+        return static_cast<size_t>((shift + 1) * SUB_COUNT + (mantissa - SUB_COUNT));
+    }
+
+    static double bucketMidpoint(size_t index) {
+        if (index < SUB_COUNT) {
+            return static_cast<double>(index);
+        }
+        int shift = static_cast<int>(index / SUB_COUNT) - 1;
+        double lower = std::ldexp(static_cast<double>(index % SUB_COUNT + SUB_COUNT), shift);
+        return lower + (std::ldexp(1.0, shift) - 1) / 2;
+    }
+
+    std::vector<uint64_t> counts_;
+    uint64_t total_ = 0;
+};
+
+// 过滤 / 搜索 / 总延迟三个阶段的分布
+struct StageHistograms {
+    LatencyHistogram filter;
+    LatencyHistogram search;
+    LatencyHistogram total;
+
+    void add(const std::vector<QueryLatency>& latencies) {
+        for (const QueryLatency& latency : latencies) {
+            filter.recordUs(latency.filterUs);
+            search.recordUs(latency.searchUs);
+            total.recordUs(static_cast<double>(latency.filterUs) + latency.searchUs);
+        }
+    }
+};
+
+// 逐查询延迟的二进制记录：
+//   char[4] "QLAT", uint32 版本 (1), uint64 查询数，之后每个查询 float filter_us, float search_us（按查询序号）
+inline void writeLatencyTrace(const std::string& fileName, const std::vector<QueryLatency>& latencies) {
+    FILE* f = fopen(fileName.c_str(), "wb");
+    if (f == nullptr) {
+        throw std::runtime_error("无法写入延迟记录文件: " + fileName);
+    }
+    const char magic[4] = {'Q', 'L', 'A', 'T'};
+    uint32_t version = 1;
+    uint64_t n = latencies.size();
+    fwrite(magic, 1, sizeof(magic), f);
+    fwrite(&version, sizeof(version), 1, f);
+    fwrite(&n, sizeof(n), 1, f);
+    for (const QueryLatency& latency : latencies) {
+        fwrite(&latency.filterUs, sizeof(float), 1, f);
+        fwrite(&latency.searchUs, sizeof(float), 1, f);
+    }
+    fclose(f);
+}
+
+#endif // LATENCYHISTOGRAM_H
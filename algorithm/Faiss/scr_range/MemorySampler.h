@@ -0,0 +1,152 @@
+#ifndef MEMORYSAMPLER_H
+#define MEMORYSAMPLER_H
+
+#include <sys/resource.h>
+
+#include <algorithm>
+#include <chrono>
+#include <condition_variable>
+#include <fstream>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <vector>
+
+// 后台内存采样：start() 后每 intervalMs 读取一次 /proc/self/status 与 getrusage，
+// stop() 返回这一段时间内的峰值 RSS、VmHWM、缺页与上下文切换次数，
+// 避免只在搜索结束后读一次 VmRSS 而漏掉瞬时峰值
+class MemorySampler {
+public:
+    struct Sample {
+        double timeMs = 0;         // 距 start() 的时间
+        double rssMB = 0;
+        double hwmMB = 0;
+        long minorFaults = 0;      // 以下为进程累计值
+        long majorFaults = 0;
+        long voluntaryCtx = 0;
+        long involuntaryCtx = 0;
+    };
+
+    struct Summary {
+        double peakRssMB = 0;      // 采样得到的 RSS 最大值
+        double hwmMB = 0;          // 内核记录的峰值 (VmHWM)，start() 时尝试重置
+        double avgRssMB = 0;
+        long minorFaults = 0;      // 以下为 start() 到 stop() 之间的增量
+        long majorFaults = 0;
+        long voluntaryCtx = 0;
+        long involuntaryCtx = 0;
+        size_t samples = 0;
+    };
+
+    explicit MemorySampler(int intervalMs = 10) : intervalMs_(intervalMs) {}
+
+    ~MemorySampler() {
+        if (thread_.joinable()) {
+            stop();
+        }
+    }
+
+    void start() {
+        // 写 5 到 clear_refs 重置 VmHWM（Linux 4.0+），失败时 VmHWM 为进程生命周期的峰值
+        std::ofstream("/proc/self/clear_refs") << "5";
+        samples_.clear();
+        begin_ = std::chrono::steady_clock::now();
+        samples_.push_back(read());
+        running_ = true;
+        thread_ = std::thread([this] { loop(); });
+    }
+
+    Summary stop() {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            running_ = false;
+        }
+        cv_.notify_all();
+        thread_.join();
+        samples_.push_back(read());
+
+        Summary summary;
+        const Sample& first = samples_.front();
+        const Sample& last = samples_.back();
+        double rssSum = 0;
+        for (const Sample& sample : samples_) {
+            summary.peakRssMB = std::max(summary.peakRssMB, sample.rssMB);
+            rssSum += sample.rssMB;
+        }
+        summary.samples = samples_.size();
+        summary.avgRssMB = rssSum / samples_.size();
+        summary.hwmMB = std::max(last.hwmMB, summary.peakRssMB);
+        summary.minorFaults = last.minorFaults - first.minorFaults;
+        summary.majorFaults = last.majorFaults - first.majorFaults;
+        summary.voluntaryCtx = last.voluntaryCtx - first.voluntaryCtx;
+        summary.involuntaryCtx = last.involuntaryCtx - first.involuntaryCtx;
+        return summary;
+    }
+
+    const std::vector<Sample>& samples() const { return samples_; }
+
+    // 时间序列写为 CSV
+    void saveSeries(const std::string& fileName) const {
+        std::ofstream out(fileName);
+        if (!out.is_open()) {
+            return;
+        }
+        out << "time_ms,rss_mb,hwm_mb,minor_faults,major_faults,voluntary_ctx,involuntary_ctx" << std::endl;
+        for (const Sample& s : samples_) {
+            out << s.timeMs << "," << s.rssMB << "," << s.hwmMB << "," << s.minorFaults << ","
+                << s.majorFaults << "," << s.voluntaryCtx << "," << s.involuntaryCtx << std::endl;
+        }
+    }
+
+private:
+    void loop() {
+        std::unique_lock<std::mutex> lock(mutex_);
+        while (!cv_.wait_for(lock, std::chrono::milliseconds(intervalMs_), [this] { return !running_; })) {
+            lock.unlock();
+            Sample sample = read();
+            lock.lock();
+            samples_.push_back(sample);
+        }
+    }
+
+    Sample read() const {
+        Sample sample;
+        sample.timeMs = std::chrono::duration<double, std::milli>(std::chrono::steady_clock::now() - begin_).count();
+
+        std::ifstream status("/proc/self/status");
+        std::string line;
+        while (std::getline(status, line)) {
+            std::istringstream iss(line);
+            std::string field;
+            double value;
+            if (!(iss >> field >> value)) {
+                continue;
+            }
+            if (field == "VmRSS:") {
+                sample.rssMB = value / 1024.0;
+            } else if (field == "VmHWM:") {
+                sample.hwmMB = value / 1024.0;
+            }
+        }
+
+        struct rusage usage;
+        if (getrusage(RUSAGE_SELF, &usage) == 0) {
+            sample.minorFaults = usage.ru_minflt;
+            sample.majorFaults = usage.ru_majflt;
+            sample.voluntaryCtx = usage.ru_nvcsw;
+            sample.involuntaryCtx = usage.ru_nivcsw;
+        }
+        return sample;
+    }
+
+    int intervalMs_;
+    bool running_ = false;
+    std::chrono::steady_clock::time_point begin_;
+    std::vector<Sample> samples_;
+    std::thread thread_;
+    std::mutex mutex_;
+    std::condition_variable cv_;
+};
+
+#endif // MEMORYSAMPLER_H
@@ -0,0 +1,60 @@
+#ifndef RANGEINDEX_H
+#define RANGEINDEX_H
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <numeric>
+#include <utility>
+#include <vector>
+
+// 属性值的有序排列：order_[rank] 为第 rank 小的属性值对应的原始 id
+// 索引按 order_ 的顺序插入向量后，索引内 id 即为 rank，
+// 任意值域 [lo, hi] 经两次二分查找变成一个连续的 id 区间
+class RangeIndex {
+public:
+    RangeIndex() = default;
+
+    explicit RangeIndex(const std::vector<double>& values) {
+        build(values);
+    }
+
+    void build(const std::vector<double>& values) {
+        order_.resize(values.size());
+        std::iota(order_.begin(), order_.end(), 0);
+        std::stable_sort(order_.begin(), order_.end(), [&values](uint32_t a, uint32_t b) {
+            return values[a] < values[b];
+        });
+        sortedValues_.resize(values.size());
+        for (size_t rank = 0; rank < order_.size(); ++rank) {
+            sortedValues_[rank] = values[order_[rank]];
+        }
+    }
+
+    size_t size() const { return order_.size(); }
+    bool empty() const { return order_.empty(); }
+
+    // 值域 [lo, hi] 对应的 rank 区间 [first, second)
+    std::pair<int64_t, int64_t> range(double lo, double hi) const {
+        auto first = std::lower_bound(sortedValues_.begin(), sortedValues_.end(), lo);
+        auto last = std::upper_bound(first, sortedValues_.end(), hi);
+        return {first - sortedValues_.begin(), last - sortedValues_.begin()};
+    }
+
+    // 属性即 id（数据已按属性排序）时的 id 区间 [first, second)
+    static std::pair<int64_t, int64_t> idRange(double lo, double hi, size_t nb) {
+        double n = static_cast<double>(nb);
+        double first = std::min(std::ceil(std::max(lo, 0.0)), n);
+        double last = std::min(std::max(std::floor(hi) + 1, 0.0), n);
+        return {static_cast<int64_t>(first), static_cast<int64_t>(std::max(first, last))};
+    }
+
+    int64_t originalId(int64_t rank) const { return order_[rank]; }
+    const std::vector<uint32_t>& order() const { return order_; }
+
+private:
+    std::vector<uint32_t> order_;
+    std::vector<double> sortedValues_;
+};
+
+#endif // RANGEINDEX_H
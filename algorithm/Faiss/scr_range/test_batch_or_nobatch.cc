@@ -157,7 +157,7 @@ std::pair<std::map<std::string, DatasetConfig>, std::map<std::string, QuerySetCo
     return {datasets, query_sets};
 }
 
-void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, bool isBatch) {
+void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, bool isBatch, bool useAttribute, bool use_mmap, size_t warmup_runs, bool latency_trace, bool memory_trace) {
     // 获取数据集和查询集配置
     auto [datasets, query_sets] = get_query_config();
 
@@ -194,14 +194,27 @@ void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, boo
         experiment.setIsBatch(isBatch);
         experiment.setIsSaveToFile(is_save_to_file);
         experiment.setCycleNum(cycle_num);
+        experiment.setUseMmap(use_mmap);
+        experiment.setWarmupRuns(warmup_runs);
+        experiment.setLatencyTrace(latency_trace);
+        experiment.setMemorySampling(10, memory_trace);
 
         // 设置数据集名称
         experiment.setDataset(dataset_name);
         
-        // 设置向量文件路径
-        experiment.setBaseFilePaths(
-            dataDir + dataset_name  + "/" + dataset_config.base_file
-        );
+        // 使用 WinFilter 的属性文件 (filter-values.npy)，而不是假设 id 已按属性排序。
+        // filter-values 第 i 行对应 WinFilter 基础向量 <prefix>.npy 的第 i 行，其值域 ground truth
+        // (_gt.npy) 也按该顺序给出 id，因此属性模式下基础向量、查询向量和 ground truth 都使用 WinFilter 的文件，
+        // 而非按属性预排序的 .fvecs；两者行数不一致时 buildIndex 报错
+        std::string attributePrefix = dataset_config.prefix.substr(0, dataset_config.prefix.rfind("_queries"));
+        if (useAttribute) {
+            experiment.setBaseFilePaths(dataDir + "datasets/" + dataset_name + "/" + attributePrefix + ".npy");
+            experiment.setAttributeFile(dataDir + "labels/" + dataset_name + "/" + attributePrefix + "_filter-values.npy");
+        } else {
+            experiment.setBaseFilePaths(
+                dataDir + dataset_name  + "/" + dataset_config.base_file
+            );
+        }
 
         // 设置索引的类型和配置
         experiment.setIndexKey(dataset_config.index_key);
@@ -288,9 +301,12 @@ void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, boo
                 result_path = resultDir  + "/result/" + query_set_config.savefile + "/Faiss/" + dataset_name + ".csv";;
             }
             experiment.setQueryFilePaths(
-                dataDir + "query_range/" + dataset_name + "/" + dataset_config.prefix + query_set_config.suffix + "_ranges.txt",
-                dataDir + "datasets/" + dataset_name + "/" + dataset_config.query_file,
-                dataDir + "gt/" + dataset_name + "/" + dataset_config.prefix + query_set_config.suffix + "_gt.txt",
+                dataDir + "query_range/" + dataset_name + "/" + dataset_config.prefix + query_set_config.suffix
+                    + (useAttribute ? "_ranges.npy" : "_ranges.txt"),
+                dataDir + "datasets/" + dataset_name + "/"
+                    + (useAttribute ? attributePrefix + "_queries.npy" : dataset_config.query_file),
+                dataDir + "gt/" + dataset_name + "/" + dataset_config.prefix + query_set_config.suffix
+                    + (useAttribute ? "_gt.npy" : "_gt.txt"),
                 result_path
             );
 
@@ -306,8 +322,13 @@ int main(int argc, char *argv[]) {
     // 默认值
     int thread_nums = -1;
     int cycle_num = 1;
+    size_t warmup_runs = 1;
     bool is_save_to_file = false;
+    bool use_mmap = false;
+    bool latency_trace = false;
+    bool memory_trace = false;
     bool isBatch = false;
+    bool useAttribute = false;
     
     // 解析命令行参数
     for (int i = 1; i < argc; i++) {
@@ -322,37 +343,76 @@ int main(int argc, char *argv[]) {
                 cycle_num = std::stoi(argv[++i]);
             }
         }
+        else if (arg == "--warmup" || arg == "-w") {
+            if (i + 1 < argc) {
+                warmup_runs = std::stoul(argv[++i]);
+            }
+        }
         else if (arg == "--save" || arg == "-s") {
             if (i + 1 < argc) {
                 std::string value = argv[++i];
                 is_save_to_file = (value == "true" || value == "1" || value == "yes");
             }
         }
+        else if (arg == "--mmap" || arg == "-M") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                use_mmap = (value == "true" || value == "1" || value == "yes");
+            }
+        }
+        else if (arg == "--latency-trace" || arg == "-L") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                latency_trace = (value == "true" || value == "1" || value == "yes");
+            }
+        }
+        else if (arg == "--memory-trace" || arg == "-T") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                memory_trace = (value == "true" || value == "1" || value == "yes");
+            }
+        }
         else if(arg == "--batch" || arg == "-b"){
             if (i + 1 < argc) {
                 std::string value = argv[++i];
                 isBatch = (value == "true" || value == "1" || value == "yes");
             }
         }
+        else if(arg == "--attribute" || arg == "-a"){
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                useAttribute = (value == "true" || value == "1" || value == "yes");
+            }
+        }
         else if (arg == "--help" || arg == "-h") {
             std::cout << "用法: " << argv[0] << " [选项]\n"
                       << "选项:\n"
                       << "  -t, --threads N    设置线程数为N (默认: 16)\n"
                       << "  -c, --cycles N     设置循环次数为N (默认: 1)\n"
+                      << "  -w, --warmup N     每组参数丢弃前N次运行作为预热，循环次数不大于N时不丢弃 (默认: 1)\n"
                       << "  -s, --save yes/no  设置是否保存结果 (默认: 否)\n"
                       << "  -b, --batch yes/no 设置是否批量 (默认: 否)\n"
+                      << "  -M, --mmap yes/no  以 mmap 方式打开缓存的索引 (默认: 否)\n"
+                      << "  -L, --latency-trace yes/no 在结果文件旁写出逐查询延迟记录 .qlat，需同时 -s yes (默认: 否)\n"
+                      << "  -T, --memory-trace yes/no 在结果文件旁写出内存采样时间序列 .mem.csv，需同时 -s yes (默认: 否)\n"
+                      << "  -a, --attribute yes/no 使用 WinFilter 的 .npy 数据、filter-values.npy 属性和值域 ground truth，而非 id 顺序 (默认: 否)\n"
                       << "  -h, --help         显示此帮助信息\n";
             return 0;
         }
     }
     std::cout << "线程数: " << thread_nums << std::endl;
     std::cout << "循环次数: " << cycle_num << std::endl;
+    std::cout << "预热次数: " << warmup_runs << std::endl;
     std::cout << "是否批处理: " << (isBatch ? "是" : "否") << std::endl;
     std::cout << "是否保存结果: " << (is_save_to_file ? "是" : "否") << std::endl;
+    std::cout << "是否 mmap 加载索引: " << (use_mmap ? "是" : "否") << std::endl;
+    std::cout << "是否记录逐查询延迟: " << (latency_trace ? "是" : "否") << std::endl;
+    std::cout << "是否记录内存时间序列: " << (memory_trace ? "是" : "否") << std::endl;
+    std::cout << "是否使用属性文件: " << (useAttribute ? "是" : "否") << std::endl;
     if(isBatch){
         std::cout << "范围查询批处理被禁用" << std::endl;
         return 0;
     }
-    runAllExperiments(thread_nums, cycle_num, is_save_to_file, isBatch);
+    runAllExperiments(thread_nums, cycle_num, is_save_to_file, isBatch, useAttribute, use_mmap, warmup_runs, latency_trace, memory_trace);
     return 0;
 }
\ No newline at end of file
@@ -0,0 +1,131 @@
+#ifndef BITMAPCACHE_H
+#define BITMAPCACHE_H
+
+#include <atomic>
+#include <cstdint>
+#include <future>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+// 按过滤条件（Query::generateGroupKey()）缓存位图
+// - 懒加载：第一次遇到某个 key 时才生成位图，同一 key 的并发请求只生成一次
+// - 线程安全：OpenMP 各线程共享同一个缓存，跨 nprobe / cycleNum 复用
+// - 内存上限：超过 capacityBytes 时按 LRU 淘汰，capacityBytes 为 0 时不缓存
+class BitmapCache {
+public:
+    using Bitmap = std::vector<uint8_t>;
+    using BitmapPtr = std::shared_ptr<const Bitmap>;
+
+    explicit BitmapCache(size_t capacityBytes = 0) : capacityBytes_(capacityBytes) {}
+
+    void setCapacity(size_t capacityBytes) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        capacityBytes_ = capacityBytes;
+        evict("");
+    }
+
+    void clear() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        entries_.clear();
+        lru_.clear();
+        usedBytes_ = 0;
+    }
+
+    // 返回 key 对应的位图，未命中时调用 build() 生成
+    // 返回的 shared_ptr 在条目被淘汰后依然有效
+    template <typename Builder>
+    BitmapPtr get(const std::string& key, Builder build) {
+        if (capacityBytes_ == 0) {
+            misses_++;
+            return std::make_shared<const Bitmap>(build());
+        }
+
+        std::promise<BitmapPtr> promise;
+        std::shared_future<BitmapPtr> pending;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            auto it = entries_.find(key);
+            if (it != entries_.end()) {
+                hits_++;
+                lru_.splice(lru_.begin(), lru_, it->second.lruPos);
+                pending = it->second.future;
+            } else {
+                misses_++;
+                lru_.push_front(key);
+                entries_.emplace(key, Entry{promise.get_future().share(), lru_.begin(), 0});
+            }
+        }
+        // 命中：其他线程可能仍在生成，在锁外等待
+        if (pending.valid()) {
+            return pending.get();
+        }
+
+        // 未命中：在锁外生成位图，同一 key 的其他线程等待 future
+        BitmapPtr bitmap;
+        try {
+            bitmap = std::make_shared<const Bitmap>(build());
+        } catch (...) {
+            promise.set_exception(std::current_exception());
+            std::lock_guard<std::mutex> lock(mutex_);
+            auto it = entries_.find(key);
+            if (it != entries_.end()) {
+                lru_.erase(it->second.lruPos);
+                entries_.erase(it);
+            }
+            throw;
+        }
+        promise.set_value(bitmap);
+
+        std::lock_guard<std::mutex> lock(mutex_);
+        auto it = entries_.find(key);
+        if (it != entries_.end() && it->second.bytes == 0) {
+            it->second.bytes = bitmap->size();
+            usedBytes_ += bitmap->size();
+            evict(key);
+        }
+        return bitmap;
+    }
+
+    size_t hits() const { return hits_; }
+    size_t misses() const { return misses_; }
+    size_t usedBytes() const {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return usedBytes_;
+    }
+
+private:
+    struct Entry {
+        std::shared_future<BitmapPtr> future;
+        std::list<std::string>::iterator lruPos;
+        size_t bytes;
+    };
+
+    // 淘汰最久未使用且已生成完成的条目，直到占用不超过上限（keep 不会被淘汰）
+    void evict(const std::string& keep) {
+        auto it = lru_.end();
+        while (usedBytes_ > capacityBytes_ && it != lru_.begin()) {
+            --it;
+            auto entry = entries_.find(*it);
+            if (*it == keep || entry->second.bytes == 0) {
+                continue;
+            }
+            usedBytes_ -= entry->second.bytes;
+            entries_.erase(entry);
+            it = lru_.erase(it);
+        }
+    }
+
+    mutable std::mutex mutex_;
+    std::unordered_map<std::string, Entry> entries_;
+    std::list<std::string> lru_;  // 头部为最近使用
+    size_t capacityBytes_;
+    size_t usedBytes_ = 0;
+    std::atomic<size_t> hits_{0};
+    std::atomic<size_t> misses_{0};
+};
+
+#endif // BITMAPCACHE_H
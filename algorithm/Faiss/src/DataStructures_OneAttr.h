@@ -1,6 +1,8 @@
 #ifndef DATASTRUCTURES_HPP
 #define DATASTRUCTURES_HPP
 
+#include <cstddef>
+#include <cstdint>
 #include <vector>
 #include <string>
 
@@ -67,6 +69,14 @@ public:
     //   attribute15(attrs[14])
     {
     }
+
+    static constexpr size_t NUM_ATTRIBUTES = 1;
+
+    // 按下标访问属性值（供 LabelIndex 使用）
+    uint16_t getAttribute(size_t i) const
+    {
+        return attribute1;
+    }
 };
 
 // Class to represent a query with labels and a feature vector
@@ -86,6 +96,14 @@ public:
     {
     }
 
+    static constexpr size_t NUM_ATTRIBUTES = 1;
+
+    // 按下标访问属性值（供 LabelIndex 使用）
+    uint16_t getAttribute(size_t i) const
+    {
+        return attribute1;
+    }
+
     bool match(const DataPointLabel &dataPoint) const
     {
         if (attribute1 != dataPoint.attribute1)
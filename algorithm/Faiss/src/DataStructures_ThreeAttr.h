@@ -1,6 +1,8 @@
 #ifndef DATASTRUCTURES_HPP
 #define DATASTRUCTURES_HPP
 
+#include <cstddef>
+#include <cstdint>
 #include <vector>
 #include <string>
 
@@ -67,6 +69,22 @@ public:
     //   attribute15(attrs[14])
     {
     }
+
+    static constexpr size_t NUM_ATTRIBUTES = 3;
+
+    // 按下标访问属性值（供 LabelIndex 使用）
+    uint16_t getAttribute(size_t i) const
+    {
+        switch (i)
+        {
+        case 0:
+            return attribute1;
+        case 1:
+            return attribute2;
+        default:
+            return attribute3;
+        }
+    }
 };
 
 // Class to represent a query with labels and a feature vector
@@ -92,6 +110,22 @@ public:
     {
     }
 
+    static constexpr size_t NUM_ATTRIBUTES = 3;
+
+    // 按下标访问属性值（供 LabelIndex 使用）
+    uint16_t getAttribute(size_t i) const
+    {
+        switch (i)
+        {
+        case 0:
+            return attribute1;
+        case 1:
+            return attribute2;
+        default:
+            return attribute3;
+        }
+    }
+
     bool match(const DataPointLabel &dataPoint) const
     {
         if (attribute1 == dataPoint.attribute1 &&
@@ -5,6 +5,14 @@
 #include <sstream>
 #include <iostream>
 #include <vector>
+#include <string>
+#include <cstring>
+#include <cstdint>
+#include <stdexcept>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 // 使用预处理器指令动态切换头文件
 #ifdef USE_ONE_ATTR
@@ -15,6 +23,98 @@
 #include "DataStructures_ThreeAttr.h"
 #endif
 
+// 列式标签文件 (.hlbl) 的只读内存映射，格式与 script/common/labels.py 一致：
+// 64 字节文件头 (magic "HLBL", version, n, ncols, width, skip, 源文件大小, 源文件 mtime)，
+// 之后每个属性一列，每列 n 个 uint16 (width=2) 或 uint32 (width=4) 值
+class LabelColumns {
+public:
+    static constexpr size_t HEADER_SIZE = 64;
+    static constexpr uint32_t VERSION = 2;
+
+    // 文件头记录的源文本文件信息：是否跳过了第一行、文件大小、mtime（纳秒）
+    struct Source {
+        bool skipHeader = false;
+        uint64_t size = 0;
+        int64_t mtimeNs = 0;
+    };
+
+    // 只读取文件头；文件不存在、格式或版本不符时返回 false
+    static bool readSource(const std::string& path, Source& source) {
+        std::ifstream file(path, std::ios::binary);
+        char header[HEADER_SIZE];
+        if (!file.read(header, HEADER_SIZE) || std::memcmp(header, "HLBL", 4) != 0) {
+            return false;
+        }
+        uint32_t version, skip;
+        std::memcpy(&version, header + 4, sizeof(uint32_t));
+        if (version != VERSION) {
+            return false;
+        }
+        std::memcpy(&skip, header + 24, sizeof(uint32_t));
+        std::memcpy(&source.size, header + 32, sizeof(uint64_t));
+        std::memcpy(&source.mtimeNs, header + 40, sizeof(int64_t));
+        source.skipHeader = skip != 0;
+        return true;
+    }
+
+    explicit LabelColumns(const std::string& path) {
+        int fd = open(path.c_str(), O_RDONLY);
+        if (fd < 0) {
+            throw std::runtime_error("无法打开标签文件: " + path);
+        }
+        struct stat st;
+        if (fstat(fd, &st) != 0 || static_cast<size_t>(st.st_size) < HEADER_SIZE) {
+            close(fd);
+            throw std::runtime_error("列式标签文件格式错误: " + path);
+        }
+        size_ = st.st_size;
+        void* addr = mmap(nullptr, size_, PROT_READ, MAP_SHARED, fd, 0);
+        close(fd);
+        if (addr == MAP_FAILED) {
+            throw std::runtime_error("mmap 失败: " + path);
+        }
+        base_ = static_cast<const char*>(addr);
+
+        uint32_t version, width;
+        std::memcpy(&version, base_ + 4, sizeof(uint32_t));
+        std::memcpy(&n_, base_ + 8, sizeof(uint64_t));
+        std::memcpy(&ncols_, base_ + 16, sizeof(uint32_t));
+        std::memcpy(&width, base_ + 20, sizeof(uint32_t));
+        width_ = width;
+        if (std::memcmp(base_, "HLBL", 4) != 0 || version != VERSION || (width_ != 2 && width_ != 4) ||
+            HEADER_SIZE + n_ * ncols_ * width_ > size_) {
+            munmap(const_cast<char*>(base_), size_);
+            throw std::runtime_error("列式标签文件格式错误: " + path);
+        }
+    }
+
+    ~LabelColumns() {
+        munmap(const_cast<char*>(base_), size_);
+    }
+
+    LabelColumns(const LabelColumns&) = delete;
+    LabelColumns& operator=(const LabelColumns&) = delete;
+
+    size_t size() const { return n_; }
+    size_t numColumns() const { return ncols_; }
+    size_t width() const { return width_; }
+
+    uint32_t value(size_t col, size_t row) const {
+        const char* column = base_ + HEADER_SIZE + col * n_ * width_;
+        if (width_ == 2) {
+            return reinterpret_cast<const uint16_t*>(column)[row];
+        }
+        return reinterpret_cast<const uint32_t*>(column)[row];
+    }
+
+private:
+    const char* base_ = nullptr;
+    size_t size_ = 0;
+    uint64_t n_ = 0;
+    uint32_t ncols_ = 0;
+    size_t width_ = 0;
+};
+
 // FileReader 类用于从文件中读取数据
 class FileReader {
 public:
@@ -41,8 +141,68 @@ public:
         return false; // 默认不跳过
     }
 
+    // labels/xx.txt 对应的列式文件 labels/xx.hlbl
+    static std::string columnarLabelPath(const std::string& labelFile) {
+        size_t dot = labelFile.find_last_of('.');
+        size_t slash = labelFile.find_last_of('/');
+        if (dot == std::string::npos || (slash != std::string::npos && dot < slash)) {
+            return labelFile + ".hlbl";
+        }
+        return labelFile.substr(0, dot) + ".hlbl";
+    }
+
+    // 列式文件由当前这份文本文件（大小、mtime 一致）按同样的首行规则生成时返回 true，
+    // 否则（例如 Python 端以 skip_header=True 为无计数行的文件生成）回退到解析文本
+    static bool hasFreshColumnarLabels(const std::string& labelFile, const std::string& columnarFile) {
+        LabelColumns::Source source;
+        struct stat txt;
+        if (!LabelColumns::readSource(columnarFile, source) || stat(labelFile.c_str(), &txt) != 0) {
+            return false;
+        }
+        int64_t mtimeNs = static_cast<int64_t>(txt.st_mtim.tv_sec) * 1000000000LL + txt.st_mtim.tv_nsec;
+        return source.size == static_cast<uint64_t>(txt.st_size) && source.mtimeNs == mtimeNs &&
+               source.skipHeader == shouldSkipFirstLine(labelFile);
+    }
+
+    // 从列式标签文件读取指定属性
+    static std::vector<DataPointLabel> readDataPointsLabelColumnar(const std::string& columnarFile, const std::vector<int>& attributeIndices) {
+        LabelColumns columns(columnarFile);
+        // DataPointLabel 的属性为 uint16_t；uint32 列（存在 >= 65535 的标签值）不能无损收窄，
+        // 与文本解析时 uint16_t 读取失败一样报错
+        if (columns.width() != sizeof(uint16_t)) {
+            throw std::runtime_error("标签值超出 uint16 范围: " + columnarFile);
+        }
+        for (int attr : attributeIndices) {
+            if (attr < 0 || static_cast<size_t>(attr) >= columns.numColumns()) {
+                throw std::runtime_error("属性索引超出范围: " + std::to_string(attr));
+            }
+        }
+
+        size_t n = columns.size();
+        std::vector<DataPointLabel> dataPointsLabel;
+        dataPointsLabel.reserve(n);
+        std::vector<uint16_t> attributes(attributeIndices.size());
+        for (size_t row = 0; row < n; ++row) {
+            for (size_t i = 0; i < attributeIndices.size(); ++i) {
+                uint32_t value = columns.value(attributeIndices[i], row);
+                if (value == UINT16_MAX) {  // 缺失值：该行属性个数不足
+                    throw std::runtime_error("标签文件第 " + std::to_string(row + 1) + " 行缺少属性: " + columnarFile);
+                }
+                attributes[i] = static_cast<uint16_t>(value);
+            }
+            dataPointsLabel.emplace_back(attributes);
+        }
+        return dataPointsLabel;
+    }
+
     // 读取标签文件和向量文件并组合成 DataPoint
+    // 若存在同名 .hlbl 列式文件（script/common/labels.py 生成）则直接映射，不再逐行解析文本
     static std::vector<DataPointLabel> readDataPointsLabel(const std::string& labelFile, const std::vector<int>& attributeIndices) {
+        std::string columnarFile = columnarLabelPath(labelFile);
+        if (hasFreshColumnarLabels(labelFile, columnarFile)) {
+            return readDataPointsLabelColumnar(columnarFile, attributeIndices);
+        }
+
         std::vector<DataPointLabel> dataPointsLabel;
         std::ifstream labelStream(labelFile);
         if (!labelStream.is_open()) {
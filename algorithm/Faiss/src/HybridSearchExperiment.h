@@ -10,6 +10,12 @@
 #include <fstream>
 #include <iomanip> 
 #include <cstdlib>
+#include <atomic>
+#include <limits>
+#include <numeric>
+#include <stdexcept>
+#include <cstdio>
+#include <unordered_map>
 
 #include <faiss/IVFlib.h>
 #include <faiss/IndexIVF.h>
@@ -18,11 +24,18 @@
 #include <faiss/index_io.h>
 #include <faiss/utils/random.h>
 #include <faiss/utils/utils.h>
+#include <faiss/utils/distances.h>
 #include <faiss/impl/FaissAssert.h>
 
 #include <sys/resource.h>
 
 #include "FileReader.h"
+#include "BitmapCache.h"
+#include "LabelIndex.h"
+#include "RunStats.h"
+#include "RecallSearch.h"
+#include "LatencyHistogram.h"
+#include "MemorySampler.h"
 // 使用预处理器指令动态切换头文件
 #ifdef USE_ONE_ATTR
 #include "DataStructures_OneAttr.h"
@@ -36,6 +49,9 @@ using idx_t = faiss::idx_t;
 
 class HybridSearchExperiment {
 public:
+    // 过滤搜索策略
+    enum class SearchPlan { EXACT_SCAN = 0, IVF_SELECTOR = 1, IVF_POSTFILTER = 2, LABEL_PARTITION = 3 };
+
     std::string dataset;
     std::string labelFileBase;
     std::string vectorFileBase;
@@ -48,23 +64,48 @@ public:
     size_t k;
     std::vector<int> thread_nums;
     std::vector<int> nprobe_values;
+    std::vector<float> recallTargets;  // 非空时按召回率目标自适应选择 nprobe，忽略 nprobe_values
 
+    // 普通模式如 "IVF1000,Flat"；分区模式为 "Partition<最少行数>,<回退索引 key>"，
+    // 如 "Partition10000,IVF1000,Flat"：出现次数不少于 10000 的标签组合各建一个 IVF，
+    // 其余行建在回退索引中，分区在 run() 中按当前属性构建
     std::string index_key;
-    std::unique_ptr<faiss::Index> index;
+    std::unique_ptr<faiss::Index> index;  // 分区模式下为回退索引
     std::string index_path;
 
     size_t cycleNum;
     bool isBatch;
     bool isSaveToFile;
+    bool useMmap;  // 以 mmap 方式打开缓存的索引，多个进程共享同一份页缓存
+    size_t warmupRuns;             // 每个 nprobe 前若干次运行作为预热丢弃（cycleNum 不大于它时不丢弃）
+    double stabilityCvThreshold;   // QPS / 延迟的变异系数不超过该值时标记为稳定
+    bool latencyTrace;             // 为每组参数写出逐查询延迟的二进制记录 (.qlat)
+    int memorySampleIntervalMs;    // 后台内存采样间隔
+    bool memoryTrace;              // 写出构建 / 每组参数的内存时间序列 (.mem.csv)
+    size_t bitmapCacheLimitMB;  // 位图缓存上限 (MB)，0 表示每个查询都重新生成位图
+
+    // 策略选择: selector(固定 IVF+位图) / exact / postfilter / adaptive(按代价模型逐组选择)
+    std::string planMode;
+    double selectorCostRatio;     // 选择器检查一个候选的代价，以一次 d 维距离计算为单位
+    double postFilterOversample;  // 后过滤时 k 的放大倍数（在 k / 选择率 基础上）
 
-    
 
     HybridSearchExperiment()
         : k(10),
           cycleNum(3), 
           isSaveToFile(true), 
           isBatch(false), 
+          useMmap(false),
+          warmupRuns(1),
+          stabilityCvThreshold(0.05),
+          latencyTrace(false),
+          memorySampleIntervalMs(10),
+          memoryTrace(false),
           vectorDim(0),
+          bitmapCacheLimitMB(1024),
+          planMode("selector"),
+          selectorCostRatio(0.3),
+          postFilterOversample(2.0),
           index_key("IVF1000,Flat"),
           index_path("../../index/") {}
     void setBaseFilePaths(const std::string& labelBase, const std::string& vectorBase) {
@@ -97,6 +138,10 @@ public:
         nprobe_values = values;
     }
 
+    void setRecallTargets(const std::vector<float>& targets) {
+        recallTargets = targets;
+    }
+
     void setThreadNums(const std::vector<int>& values) {
         thread_nums = values;
     }
@@ -125,10 +170,62 @@ public:
         isSaveToFile = _isSaveToFile;
     }
 
+    void setUseMmap(const bool& _useMmap) {
+        useMmap = _useMmap;
+    }
+
+    void setWarmupRuns(const size_t& _warmupRuns) {
+        warmupRuns = _warmupRuns;
+    }
+
+    void setStabilityThreshold(const double& _stabilityCvThreshold) {
+        stabilityCvThreshold = _stabilityCvThreshold;
+    }
+
+    void setLatencyTrace(const bool& _latencyTrace) {
+        latencyTrace = _latencyTrace;
+    }
+
+    void setMemorySampling(const int& _intervalMs, const bool& _memoryTrace) {
+        memorySampleIntervalMs = _intervalMs;
+        memoryTrace = _memoryTrace;
+    }
+
+    void setBitmapCacheLimit(const size_t& _bitmapCacheLimitMB) {
+        bitmapCacheLimitMB = _bitmapCacheLimitMB;
+    }
+
+    void setPlanMode(const std::string& _planMode) {
+        if (_planMode != "selector" && _planMode != "exact" &&
+            _planMode != "postfilter" && _planMode != "adaptive") {
+            throw std::invalid_argument("未知的策略: " + _planMode);
+        }
+        planMode = _planMode;
+    }
+
+    void setPlannerCosts(const double& _selectorCostRatio, const double& _postFilterOversample) {
+        selectorCostRatio = _selectorCostRatio;
+        postFilterOversample = _postFilterOversample;
+    }
+
     void buildIndex() {
         // 索引文件路径
         std::string stored_name = index_path + dataset + "_" + index_key + ".faissindex";
+
+        // 分区依赖查询使用的属性，推迟到 run() 中构建
+        size_t minRows, baseNlist;
+        std::string listKey;
+        if (parsePartitionKey(minRows, baseNlist, listKey)) {
+            std::ostringstream indexResult;
+            indexResult << "query_set,memory_mb,build_time,index_size_mb,peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches" << std::endl;
+            saveResultsToFile(indexResult.str(), false, false);
+            std::cout << "Partitioned index (" << index_key << ") is built per attribute set in run()" << std::endl;
+            return;
+        }
     
+        // 记录加载索引前的常驻内存，用于拆分索引 / 查询各自占用的内存
+        getResidentMemory(memAnonBeforeIndex_, memFileBeforeIndex_);
+
         // 如果索引文件不存在，创建并保存
         
         if (access(stored_name.c_str(), F_OK) != 0) {
@@ -136,6 +233,8 @@ public:
             int thread_num = omp_get_max_threads();
             omp_set_num_threads(thread_num);
 
+            MemorySampler sampler(memorySampleIntervalMs);
+            sampler.start();
             auto startIndexTime = std::chrono::high_resolution_clock::now();
             // 读取数据点
             std::vector<float> data = FileReader::readIvecs(vectorFileBase, vectorDim);
@@ -161,11 +260,14 @@ public:
             // 获取索引构建时的内存占用
             float indexActualMem, indexVirtualMem;
             getMemoryUsage(indexActualMem, indexVirtualMem);
+            MemorySampler::Summary memory = sampler.stop();
+            saveMemorySeries(sampler, buildIndexResultFile);
     
             // 保存索引构建结果
             std::ostringstream indexResult;
-            indexResult << "query_set,memory_mb,build_time,index_size_mb" << std::endl;
-            indexResult  << "1," << indexActualMem << "," << indexBuildTime << "," << indexSize << "," << std::endl;
+            indexResult << "query_set,memory_mb,build_time,index_size_mb,peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches" << std::endl;
+            indexResult  << "1," << indexActualMem << "," << indexBuildTime << "," << indexSize
+                         << "," << memorySummaryColumns(memory) << "," << std::endl;
             
             saveResultsToFile(indexResult.str(), false, false); // 仅第一次保存
 
@@ -174,10 +276,33 @@ public:
             std::cout << "Index Build Time: " << indexBuildTime << " s" << std::endl;
             std::cout << "Index size: " << indexSize << " MB" << std::endl;
             std::cout << "Memory (VIRT/RES): " << indexActualMem << " MB / " << indexVirtualMem << " MB" << std::endl;
+            std::cout << "Peak RSS / VmHWM: " << memory.peakRssMB << " MB / " << memory.hwmMB << " MB" << std::endl;
+
+            // mmap 模式下重新以 mmap 方式打开刚写出的文件，与之后的运行保持一致
+            if (useMmap) {
+                data.clear();
+                data.shrink_to_fit();
+                index.reset();
+                getResidentMemory(memAnonBeforeIndex_, memFileBeforeIndex_);
+                loadIndex(stored_name);
+            }
         } else {
-            std::cout << "Loading index from file: " << stored_name << std::endl;
-            index.reset(faiss::read_index(stored_name.c_str()));
+            loadIndex(stored_name);
         }
+        float fileMem;
+        getResidentMemory(memAnonAfterIndex_, fileMem);
+    }
+
+    // 读取缓存的索引；useMmap 时倒排表直接映射索引文件（IVF 只读），启动时不再整体读入内存
+    void loadIndex(const std::string& stored_name) {
+        std::cout << "Loading index from file: " << stored_name << (useMmap ? " (mmap)" : "") << std::endl;
+        auto startLoad = std::chrono::high_resolution_clock::now();
+        int io_flags = useMmap ? (faiss::IO_FLAG_MMAP | faiss::IO_FLAG_READ_ONLY) : 0;
+        index.reset(faiss::read_index(stored_name.c_str(), io_flags));
+        auto endLoad = std::chrono::high_resolution_clock::now();
+        std::cout << "Index load time: "
+                  << std::chrono::duration_cast<std::chrono::milliseconds>(endLoad - startLoad).count()
+                  << " ms" << std::endl;
     }
 
     void run() {
@@ -187,11 +312,38 @@ public:
         std::vector<Query> queries = FileReader::readQueries(labelFileQuery, vectorFileQuery, vectorDim, attributeIndices_);
         std::vector<std::vector<int>> groundTruth = FileReader::readGroundTruth(groundTruthFile);
         
-        size_t nb = FileReader::readDataPointsLabel(labelFileBase, attributeIndices_).size();
+        size_t nb = dataPointsLabel.size();
+
+        // 构建标签倒排索引，位图生成只需访问匹配的行
+        auto startLabelIndex = std::chrono::high_resolution_clock::now();
+        labelIndex_.build(dataPointsLabel);
+        auto endLabelIndex = std::chrono::high_resolution_clock::now();
+        std::cout << "Label index build time: "
+                  << std::chrono::duration_cast<std::chrono::milliseconds>(endLabelIndex - startLabelIndex).count()
+                  << " ms" << std::endl;
+
+        // 位图缓存在本次 run 的所有线程数 / nprobe / cycleNum 之间共享
+        bitmapCache_.clear();
+        bitmapCache_.setCapacity(bitmapCacheLimitMB * 1024 * 1024);
+
+        // 分区模式：按当前属性加载或构建标签分区，index 指向回退索引
+        size_t minRows, baseNlist;
+        std::string listKey;
+        partitioned_ = parsePartitionKey(minRows, baseNlist, listKey);
+        if (partitioned_) {
+            buildPartitions(dataPointsLabel, minRows, baseNlist, listKey);
+        }
 
         // 设置索引参数
         faiss::IndexIVF* index_ivf = static_cast<faiss::IndexIVF*>(index.get());
         index_ivf->verbose = true;
+        // nprobe 以全局 nlist 为单位；分区模式下 index 是回退索引，其 nlist 随稀有行数变化，不能作为单位
+        nlist_ = partitioned_ ? partitionBaseNlist_ : index_ivf->nlist;
+
+        // 精确扫描需要原始向量，仅在可能选择该策略时读取
+        if ((planMode == "exact" || planMode == "adaptive") && baseVectors_.empty()) {
+            baseVectors_ = FileReader::readIvecs(vectorFileBase, vectorDim);
+        }
         
     
         // 进行搜索和计算查询时间
@@ -207,92 +359,197 @@ public:
                     << std::setw(11) << "Recall@10" 
                     << std::setw(9) << "RES(MB)"
                     << std::setw(10) << "VIRT(MB)"  
+                    << std::setw(9) << "IDX(MB)"
+                    << std::setw(9) << "QRY(MB)"
                     << std::setw(23) << "total_filter_time(ms)" 
                     << std::setw(21) << "avg_filter_time(ms)" 
                     << std::setw(23) << "total_search_time(ms)" 
-                    << std::setw(21) << "avg_search_time(ms)" << std::endl;
+                    << std::setw(21) << "avg_search_time(ms)"
+                    << std::setw(12) << "cache_hits"
+                    << std::setw(14) << "cache_misses"
+                    << std::setw(20) << "plans(E/S/P/L)"
+                    << std::setw(6) << "runs"
+                    << std::setw(22) << "QPS CI95"
+                    << std::setw(12) << "QPS CV"
+                    << std::setw(7) << "stable"
+                    << std::setw(20) << "p50/p99(ms)"
+                    << std::setw(10) << "PEAK(MB)" << std::endl;
 
             //threadNumAndCsvHeader << "Thread Num: " << thread_num << std::endl;
             threadNumAndCsvHeader << "nprobe,Query Time(ms),QPS,Recall@" << k 
-                << ",RES(MB),VIRT(MB),total_filter_time(ms),avg_filter_time(ms),total_search_time(ms),avg_search_time(ms)" << std::endl;
+                << ",RES(MB),VIRT(MB),index_mem_mb,query_mem_mb,total_filter_time(ms),avg_filter_time(ms),total_search_time(ms),avg_search_time(ms),bitmap_cache_hits,bitmap_cache_misses,plan_mode,plan_exact,plan_selector,plan_postfilter,plan_partition,runs"
+                << ",qps_median,qps_mean,qps_min,qps_max,qps_std,qps_ci_low,qps_ci_high,qps_cv"
+                << ",latency_median_ms,latency_mean_ms,latency_min_ms,latency_max_ms,latency_std_ms,latency_ci_low_ms,latency_ci_high_ms,latency_cv"
+                << ",stable";
+            for (const char* stage : {"filter", "search", "total"}) {
+                for (const char* p : {"p50", "p95", "p99", "p999"}) {
+                    threadNumAndCsvHeader << "," << stage << "_" << p << "_ms";
+                }
+            }
+            threadNumAndCsvHeader << ",peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches,avg_rss_mb" << std::endl;
             saveResultsToFile(threadNumAndCsvHeader.str(), true, false);
                 
             
             
     
-            for (int nprobe : nprobe_values) {
+            // 评估一个 nprobe：输出一行结果并返回召回率
+            auto runNprobe = [&](int nprobe) -> float {
                 index_ivf->nprobe = nprobe;  // 设置 nprobe
                 
-                std::vector<std::vector<idx_t>> results(queries.size());
-                double best_total_filter_time = 0;
-                double best_total_search_time = 0;
-                double best_queryTime = std::numeric_limits<double>::max();
-                float best_qps = 0.0f;
-                float recall = 0.0f;
-                float best_searchActualMem, best_searchVirtualMem;
-
-                // 运行 cycleNum 次测试，取 qps 最低的一次的结果
+                // 运行 cycleNum 次测试，保留每次的结果；前 warmupRuns 次作为预热丢弃
+                std::vector<CycleResult> cycles;
+                MemorySampler sampler(memorySampleIntervalMs);  // 覆盖该组参数的所有运行
+                sampler.start();
                 for(int i = 0 ; i < cycleNum; i++){
                     
                     // 执行搜索
-                    double queryTime, total_filter_time, total_search_time;
-                    std::vector<std::vector<idx_t>> searchResults;
+                    CycleResult cycle;
+                    size_t hitsBefore = bitmapCache_.hits();
+                    size_t missesBefore = bitmapCache_.misses();
+                    size_t plansBefore[4];
+                    for (int p = 0; p < 4; ++p) {
+                        plansBefore[p] = planCounts_[p];
+                    }
 
                     if(isBatch){
                         index_ivf->parallel_mode = 3;
                         omp_set_num_threads(thread_num);
-                        std::tie(queryTime, total_filter_time, total_search_time, searchResults) = 
-                            executeGroupedSearch(queries, dataPointsLabel, nb, nprobe, k);
+                        std::tie(cycle.queryTime, cycle.filterTime, cycle.searchTime, cycle.results, cycle.latencies) = 
+                            executeGroupedSearch(queries, dataPointsLabel, nb, nprobe, thread_num, k);
                     }
                     else{
                         omp_set_num_threads(thread_num);
-                        std::tie(queryTime, total_filter_time, total_search_time, searchResults) = 
+                        std::tie(cycle.queryTime, cycle.filterTime, cycle.searchTime, cycle.results, cycle.latencies) = 
                             executeSearch(queries, dataPointsLabel, nb, nprobe, thread_num, k);
                     }
                     
         
-                    float qps = queries.size() / (queryTime / 1000000.0);
+                    cycle.cacheHits = bitmapCache_.hits() - hitsBefore;
+                    cycle.cacheMisses = bitmapCache_.misses() - missesBefore;
+                    for (int p = 0; p < 4; ++p) {
+                        cycle.plans[p] = planCounts_[p] - plansBefore[p];
+                    }
+        
+                    cycle.qps = queries.size() / (cycle.queryTime / 1000000.0);
         
                     // 计算搜索时的内存占用
-                    float searchActualMem, searchVirtualMem;
-                    getMemoryUsage(searchActualMem, searchVirtualMem);
-
-                    if(queryTime < best_queryTime){
-                        best_queryTime = queryTime;
-                        best_qps = qps;
-                        best_searchActualMem = searchActualMem;
-                        best_searchVirtualMem = searchVirtualMem;
-                        best_total_filter_time = total_filter_time;
-                        best_total_search_time = total_search_time;
-                        results = std::move(searchResults);
+                    getMemoryUsage(cycle.actualMem, cycle.virtualMem);
+                    getIndexQueryMemory(cycle.indexMem, cycle.queryMem);
+
+                    if (i >= warmupRuns || cycleNum <= warmupRuns) {
+                        cycles.push_back(std::move(cycle));
                     }
                 }
+
+                MemorySampler::Summary memory = sampler.stop();
+
+                // QPS 与单查询延迟（过滤 + 搜索，ms）的统计量
+                std::vector<double> qpsSamples, latencySamples;
+                StageHistograms histograms;  // 所有保留运行的逐查询延迟
+                for (const CycleResult& cycle : cycles) {
+                    qpsSamples.push_back(cycle.qps);
+                    histograms.add(cycle.latencies);
+                    latencySamples.push_back((cycle.filterTime + cycle.searchTime) / (queries.size() * 1000.0));
+                }
+                RunStats qpsStats = RunStats::compute(qpsSamples);
+                RunStats latencyStats = RunStats::compute(latencySamples);
+                bool stable = qpsStats.stable(stabilityCvThreshold) && latencyStats.stable(stabilityCvThreshold);
+
+                // 单次运行的各列取 QPS 为中位数的那次运行（偶数次时取较慢的一次）
+                std::vector<size_t> byQps(cycles.size());
+                std::iota(byQps.begin(), byQps.end(), 0);
+                std::sort(byQps.begin(), byQps.end(), [&cycles](size_t a, size_t b) {
+                    return cycles[a].qps < cycles[b].qps;
+                });
+                const CycleResult& median = cycles[byQps[(byQps.size() - 1) / 2]];
     
                 // 计算 Recall
-                recall = computeRecall(results, groundTruth, k);
+                float recall = computeRecall(median.results, groundTruth, k);
+
+                saveMemorySeries(sampler, resultFile.substr(0, resultFile.rfind(".csv"))
+                    + "_t" + std::to_string(thread_num) + "_np" + std::to_string(nprobe) + ".csv");
+
+                if (latencyTrace && isSaveToFile) {
+                    std::string tracePath = resultFile.substr(0, resultFile.rfind(".csv"))
+                        + "_t" + std::to_string(thread_num) + "_np" + std::to_string(nprobe) + ".qlat";
+                    writeLatencyTrace(tracePath, median.latencies);
+                }
     
                 // 保存搜索过程结果
                 std::ostringstream searchResult;
-                double avg_filter_time = best_total_filter_time / (queries.size() * 1000.0); // 转换为毫秒
-                double avg_search_time = best_total_search_time / (queries.size() * 1000.0); // 转换为毫秒
+                double avg_filter_time = median.filterTime / (queries.size() * 1000.0); // 转换为毫秒
+                double avg_search_time = median.searchTime / (queries.size() * 1000.0); // 转换为毫秒
+
+                std::ostringstream qpsCi;
+                qpsCi << std::fixed << std::setprecision(1) << qpsStats.ciLow << "-" << qpsStats.ciHigh;
 
                 std::cout << std::setw(8) << nprobe 
-                            << std::setw(16) << best_queryTime / 1000.0
-                            << std::setw(10) << best_qps 
+                            << std::setw(16) << median.queryTime / 1000.0
+                            << std::setw(10) << median.qps 
                             << std::setw(11) << recall 
-                            << std::setw(9) << best_searchActualMem 
-                            << std::setw(10) << best_searchVirtualMem
-                            << std::setw(23) << (best_total_filter_time / 1000.0) 
+                            << std::setw(9) << median.actualMem 
+                            << std::setw(10) << median.virtualMem
+                            << std::setw(9) << median.indexMem
+                            << std::setw(9) << median.queryMem
+                            << std::setw(23) << (median.filterTime / 1000.0) 
                             << std::setw(21) << avg_filter_time
-                            << std::setw(23) << (best_total_search_time / 1000.0) 
-                            << std::setw(21) << avg_search_time << std::endl;
-
-                searchResult << nprobe << "," << best_queryTime / 1000.0 << "," << best_qps << "," << recall 
-                             << "," << best_searchActualMem 
-                             << "," << best_searchVirtualMem 
-                             << "," << best_total_filter_time / 1000.0 << "," << avg_filter_time 
-                             << "," << best_total_search_time / 1000.0 << "," << avg_search_time << std::endl;
+                            << std::setw(23) << (median.searchTime / 1000.0) 
+                            << std::setw(21) << avg_search_time
+                            << std::setw(12) << median.cacheHits
+                            << std::setw(14) << median.cacheMisses
+                            << std::setw(20) << (std::to_string(median.plans[0]) + "/" + std::to_string(median.plans[1])
+                                                 + "/" + std::to_string(median.plans[2])
+                                                 + "/" + std::to_string(median.plans[3]))
+                            << std::setw(6) << qpsStats.runs
+                            << std::setw(22) << qpsCi.str()
+                            << std::setw(12) << qpsStats.cv
+                            << std::setw(7) << (stable ? "yes" : "no")
+                            << std::setw(20) << (std::to_string(histograms.total.percentileMs(50)).substr(0, 7) + "/"
+                                                 + std::to_string(histograms.total.percentileMs(99)).substr(0, 7))
+                            << std::setw(10) << memory.peakRssMB << std::endl;
+
+                searchResult << nprobe << "," << median.queryTime / 1000.0 << "," << median.qps << "," << recall 
+                             << "," << median.actualMem 
+                             << "," << median.virtualMem 
+                             << "," << median.indexMem << "," << median.queryMem
+                             << "," << median.filterTime / 1000.0 << "," << avg_filter_time 
+                             << "," << median.searchTime / 1000.0 << "," << avg_search_time
+                             << "," << median.cacheHits << "," << median.cacheMisses
+                             << "," << planMode << "," << median.plans[0] << "," << median.plans[1] << "," << median.plans[2] << "," << median.plans[3]
+                             << "," << qpsStats.runs;
+                for (const RunStats* stats : {&qpsStats, &latencyStats}) {
+                    searchResult << "," << stats->median << "," << stats->mean << "," << stats->min << "," << stats->max
+                                 << "," << stats->stddev << "," << stats->ciLow << "," << stats->ciHigh << "," << stats->cv;
+                }
+                searchResult << "," << (stable ? 1 : 0);
+                for (const LatencyHistogram* histogram : {&histograms.filter, &histograms.search, &histograms.total}) {
+                    for (double p : {50.0, 95.0, 99.0, 99.9}) {
+                        searchResult << "," << histogram->percentileMs(p);
+                    }
+                }
+                searchResult << "," << memorySummaryColumns(memory) << "," << memory.avgRssMB << std::endl;
                 saveResultsToFile(searchResult.str());
+                return recall;
+            };
+
+            if (recallTargets.empty()) {
+                for (int nprobe : nprobe_values) {
+                    runNprobe(nprobe);
+                }
+            } else {
+                // 按召回率目标在 [1, nlist] 上自适应选择 nprobe，代替固定列表
+                RecallSearch search(1, static_cast<int>(nlist_), recallTargets);
+                for (std::vector<int> batch = search.nextBatch(); !batch.empty(); batch = search.nextBatch()) {
+                    for (int nprobe : batch) {
+                        search.record(nprobe, runNprobe(nprobe));
+                    }
+                }
+                std::cout << "nprobe for recall targets (" << search.evaluated() << " nprobes evaluated):";
+                for (float target : search.targets()) {
+                    int nprobe = search.answer(target);
+                    std::cout << " " << target << "->" << (nprobe == -1 ? std::string("unreachable") : std::to_string(nprobe));
+                }
+                std::cout << std::endl;
             }
             std::cout << "--------------------------------------" << std::endl;
         }
@@ -300,20 +557,380 @@ public:
     
 
 private:
+    // 一次完整查询集运行的结果
+    struct CycleResult {
+        double queryTime = 0, filterTime = 0, searchTime = 0;  // us
+        float qps = 0;
+        float actualMem = 0, virtualMem = 0, indexMem = 0, queryMem = 0;
+        size_t cacheHits = 0, cacheMisses = 0;
+        size_t plans[4] = {0, 0, 0, 0};
+        std::vector<std::vector<idx_t>> results;
+        std::vector<QueryLatency> latencies;  // 按查询序号
+    };
+
+    float memAnonBeforeIndex_ = 0;  // 加载索引前后的常驻内存 (MB)
+    float memFileBeforeIndex_ = 0;
+    float memAnonAfterIndex_ = 0;
     std::vector<int> attributeIndices_; // 用于查询时指定的属性索引
+    BitmapCache bitmapCache_;           // 按 generateGroupKey() 缓存的过滤位图
+    LabelIndex labelIndex_;             // 基础标签的倒排索引，每次 run() 读入标签后构建
+    std::vector<float> baseVectors_;    // 精确扫描使用的原始向量（按需读取）
+    size_t nlist_ = 0;
+    std::atomic<size_t> planCounts_[4] = {};  // 各策略执行的查询数
+    static constexpr size_t POSTFILTER_CHUNK_CANDIDATES = 1 << 22;  // 后过滤每块的候选上限（约 48 MB）
+
+    // 标签分区：一个标签组合对应的 IVF 索引（向量以原始行号加入）
+    struct LabelPartition {
+        std::unique_ptr<faiss::Index> index;
+        size_t nlist;
+    };
+    std::unordered_map<uint64_t, LabelPartition> partitions_;
+    bool partitioned_ = false;      // index_key 为 Partition...，index 是回退索引
+    size_t partitionBaseNlist_ = 0;
+    std::string partitionName_;  // 当前分区对应的索引文件，属性变化时重新加载
+
+    // 标签组合编码为 uint64，每个属性占 16 位
+    template <typename Labels>
+    static uint64_t partitionKey(const Labels& labels) {
+        uint64_t key = 0;
+        for (size_t attr = 0; attr < Labels::NUM_ATTRIBUTES; ++attr) {
+            key |= static_cast<uint64_t>(labels.getAttribute(attr)) << (16 * attr);
+        }
+        return key;
+    }
+
+    // 解析 "Partition<最少行数>,IVF<nlist>,<其余>"；非分区模式返回 false
+    bool parsePartitionKey(size_t& minRows, size_t& baseNlist, std::string& listKey) const {
+        const std::string prefix = "Partition";
+        if (index_key.compare(0, prefix.size(), prefix) != 0) {
+            return false;
+        }
+        size_t comma = index_key.find(',');
+        std::string base = comma == std::string::npos ? "" : index_key.substr(comma + 1);
+        try {
+            minRows = std::stoul(index_key.substr(prefix.size(), comma - prefix.size()));
+            if (base.compare(0, 3, "IVF") != 0) {
+                throw std::invalid_argument(base);
+            }
+            size_t pos;
+            baseNlist = std::stoul(base.substr(3), &pos);
+            listKey = base.substr(3 + pos);  // 如 ",Flat"
+        } catch (const std::exception&) {
+            throw std::invalid_argument("分区索引 key 格式应为 Partition<行数>,IVF<nlist>,...: " + index_key);
+        }
+        return true;
+    }
+
+    // 与全局索引保持相同的平均倒排表长度，并保证每个中心至少有 39 个训练点
+    static size_t partitionNlist(size_t baseNlist, size_t rows, size_t nb) {
+        size_t nlist = static_cast<size_t>(std::llround(static_cast<double>(baseNlist) * rows / std::max<size_t>(nb, 1)));
+        return std::max<size_t>(1, std::min(nlist, rows / 39));
+    }
+
+    // 分区（及回退索引）内扫描的比例与全局索引的 nprobe / nlist 相同
+    size_t partitionNprobe(size_t partNlist, int nprobe) const {
+        double scaled = std::ceil(static_cast<double>(nprobe) * partNlist / std::max<size_t>(partitionBaseNlist_, 1));
+        return std::min<size_t>(partNlist, std::max<size_t>(1, static_cast<size_t>(scaled)));
+    }
+
+    static std::unique_ptr<faiss::Index> buildPartitionIndex(const std::vector<float>& data, size_t dim,
+                                                             const std::vector<idx_t>& ids,
+                                                             size_t nlist, const std::string& listKey) {
+        std::vector<float> xb(ids.size() * dim);
+        for (size_t i = 0; i < ids.size(); ++i) {
+            std::copy(data.begin() + ids[i] * dim, data.begin() + (ids[i] + 1) * dim, xb.begin() + i * dim);
+        }
+        std::string key = "IVF" + std::to_string(nlist) + listKey;
+        std::unique_ptr<faiss::Index> partIndex(faiss::index_factory(dim, key.c_str()));
+        partIndex->train(ids.size(), xb.data());
+        partIndex->add_with_ids(ids.size(), xb.data(), ids.data());
+        return partIndex;
+    }
+
+    // 按当前属性把行划分为标签分区 + 回退索引，结果保存在 .faissindex 旁，文件格式：
+    //   uint64 分区数，每个分区: uint64 标签组合, uint64 nlist, faiss 索引；最后为回退索引
+    // 多个索引顺序写在同一文件中，只能整体读入，不支持 mmap 方式打开
+    void buildPartitions(const std::vector<DataPointLabel>& dataPointsLabel,
+                         size_t minRows, size_t baseNlist, const std::string& listKey) {
+        std::string attrs;
+        for (int attr : attributeIndices_) {
+            attrs += "_" + std::to_string(attr);
+        }
+        std::string stored_name = index_path + dataset + "_" + index_key + "_attr" + attrs + ".faissindex";
+        if (stored_name == partitionName_) {
+            return;
+        }
+        partitions_.clear();
+        index.reset();
+        partitionBaseNlist_ = baseNlist;
+        getResidentMemory(memAnonBeforeIndex_, memFileBeforeIndex_);
+        float fileMem;
+
+        if (access(stored_name.c_str(), F_OK) == 0) {
+            std::cout << "Loading partitioned index from file: " << stored_name << std::endl;
+            FILE* f = fopen(stored_name.c_str(), "rb");
+            if (f == nullptr) {
+                throw std::runtime_error("无法打开分区索引文件: " + stored_name);
+            }
+            uint64_t numPartitions = 0;
+            bool ok = fread(&numPartitions, sizeof(numPartitions), 1, f) == 1;
+            for (uint64_t p = 0; ok && p < numPartitions; ++p) {
+                uint64_t key, nlist;
+                ok = fread(&key, sizeof(key), 1, f) == 1 && fread(&nlist, sizeof(nlist), 1, f) == 1;
+                if (ok) {
+                    partitions_[key] = LabelPartition{std::unique_ptr<faiss::Index>(faiss::read_index(f)), nlist};
+                }
+            }
+            if (ok) {
+                index.reset(faiss::read_index(f));
+            }
+            fclose(f);
+            if (!ok) {
+                throw std::runtime_error("分区索引文件格式错误: " + stored_name);
+            }
+            partitionName_ = stored_name;
+            getResidentMemory(memAnonAfterIndex_, fileMem);
+            return;
+        }
+
+        MemorySampler sampler(memorySampleIntervalMs);
+        sampler.start();
+        auto startIndexTime = std::chrono::high_resolution_clock::now();
+        std::vector<float> loaded;
+        if (baseVectors_.empty()) {
+            loaded = FileReader::readIvecs(vectorFileBase, vectorDim);
+        }
+        const std::vector<float>& data = baseVectors_.empty() ? loaded : baseVectors_;
+        size_t nb = dataPointsLabel.size();
+
+        std::unordered_map<uint64_t, std::vector<idx_t>> rows;
+        for (size_t i = 0; i < nb; ++i) {
+            rows[partitionKey(dataPointsLabel[i])].push_back(static_cast<idx_t>(i));
+        }
+        std::vector<idx_t> rare;
+        for (auto& group : rows) {
+            if (group.second.size() < minRows) {
+                rare.insert(rare.end(), group.second.begin(), group.second.end());
+                continue;
+            }
+            size_t nlist = partitionNlist(baseNlist, group.second.size(), nb);
+            partitions_[group.first] = LabelPartition{
+                buildPartitionIndex(data, vectorDim, group.second, nlist, listKey), nlist};
+        }
+        std::sort(rare.begin(), rare.end());
+        std::cout << "Label partitions: " << partitions_.size() << ", fallback rows: " << rare.size() << std::endl;
+
+        // 回退索引只包含稀有标签的行；没有稀有行时用第 0 行训练一个单中心索引后清空
+        std::vector<idx_t> trainIds = rare.empty() ? std::vector<idx_t>{0} : rare;
+        index = buildPartitionIndex(data, vectorDim, trainIds, partitionNlist(baseNlist, rare.size(), nb), listKey);
+        if (rare.empty()) {
+            index->reset();
+        }
+
+        // 先写入临时文件再 rename：上面按“文件存在”判断是否已缓存，中途失败不能留下半个文件
+        std::string tmp_name = stored_name + ".tmp";
+        FILE* f = fopen(tmp_name.c_str(), "wb");
+        if (f == nullptr) {
+            throw std::runtime_error("无法写入分区索引文件: " + tmp_name);
+        }
+        bool ok = true;
+        try {
+            uint64_t numPartitions = partitions_.size();
+            ok = fwrite(&numPartitions, sizeof(numPartitions), 1, f) == 1;
+            for (const auto& part : partitions_) {
+                if (!ok) {
+                    break;
+                }
+                uint64_t key = part.first, nlist = part.second.nlist;
+                ok = fwrite(&key, sizeof(key), 1, f) == 1 && fwrite(&nlist, sizeof(nlist), 1, f) == 1;
+                if (ok) {
+                    faiss::write_index(part.second.index.get(), f);
+                }
+            }
+            if (ok) {
+                faiss::write_index(index.get(), f);
+            }
+        } catch (...) {
+            fclose(f);
+            std::remove(tmp_name.c_str());
+            throw;
+        }
+        ok = fclose(f) == 0 && ok;
+        if (!ok || std::rename(tmp_name.c_str(), stored_name.c_str()) != 0) {
+            std::remove(tmp_name.c_str());
+            throw std::runtime_error("写入分区索引文件失败: " + stored_name);
+        }
+        partitionName_ = stored_name;
+        loaded.clear();
+        loaded.shrink_to_fit();
+        getResidentMemory(memAnonAfterIndex_, fileMem);
+
+        auto endIndexTime = std::chrono::high_resolution_clock::now();
+        double indexBuildTime = std::chrono::duration_cast<std::chrono::seconds>(endIndexTime - startIndexTime).count();
+        float indexSize;
+        getIndexSize(indexSize, stored_name);
+        float indexActualMem, indexVirtualMem;
+        getMemoryUsage(indexActualMem, indexVirtualMem);
+        MemorySampler::Summary memory = sampler.stop();
+        saveMemorySeries(sampler, buildIndexResultFile.substr(0, buildIndexResultFile.rfind(".csv")) + "_attr" + attrs + ".csv");
+
+        std::ostringstream indexResult;
+        indexResult << "attr" << attrs << "," << indexActualMem << "," << indexBuildTime << "," << indexSize
+                    << "," << memorySummaryColumns(memory) << "," << std::endl;
+        saveResultsToFile(indexResult.str(), false, true);
+        std::cout << "Partitioned Index Build Time: " << indexBuildTime << " s" << std::endl;
+        std::cout << "Partitioned Index size: " << indexSize << " MB" << std::endl;
+    }
+
+    // 代价模型（单位：一次 d 维距离计算）：
+    //   精确扫描     = 匹配数
+    //   IVF+选择器   = nlist + 扫描候选数 * (selectorCostRatio + 选择率)
+    //   IVF+后过滤   = nlist + 扫描候选数，且扫描到的匹配数需不少于 k * postFilterOversample
+    //   命中标签分区的查询直接在分区内搜索，其余查询在（回退）索引上按上述模型选择
+    SearchPlan choosePlan(const Query& query, double estimate, int nprobe) const {
+        if (!partitions_.empty() && partitions_.count(partitionKey(query))) return SearchPlan::LABEL_PARTITION;
+        size_t nb = index->ntotal;
+        if (planMode == "exact") return SearchPlan::EXACT_SCAN;
+        if (planMode == "postfilter") return SearchPlan::IVF_POSTFILTER;
+        if (planMode != "adaptive" || nb == 0) return SearchPlan::IVF_SELECTOR;
+
+        double selectivity = estimate / nb;
+        double scanned = std::min<double>(nb, static_cast<double>(nprobe) * nb / std::max<size_t>(nlist_, 1));
+        double exactCost = estimate;
+        double selectorCost = nlist_ + scanned * (selectorCostRatio + selectivity);
+        double postCost = selectivity * scanned >= k * postFilterOversample
+            ? nlist_ + scanned : std::numeric_limits<double>::infinity();
+
+        if (exactCost <= selectorCost && exactCost <= postCost) return SearchPlan::EXACT_SCAN;
+        return postCost < selectorCost ? SearchPlan::IVF_POSTFILTER : SearchPlan::IVF_SELECTOR;
+    }
+
+    // 后过滤时从 IVF 取回的候选数：k / 选择率 * postFilterOversample。
+    // nprobe 个列表平均只扫描 nprobe * nb / nlist 个候选，所需候选数超过它时返回 0，由调用方改用选择器
+    size_t postFilterK(double estimate, size_t nb, int nprobe, size_t k) const {
+        if (nb == 0 || estimate <= 0) {
+            return 0;
+        }
+        double selectivity = estimate / nb;
+        double needed = std::max<double>(std::ceil(k * postFilterOversample / selectivity), k);
+        double scanned = std::min<double>(nb, std::ceil(static_cast<double>(nprobe) * nb / std::max<size_t>(nlist_, 1)));
+        return needed > scanned ? 0 : static_cast<size_t>(needed);
+    }
+
+    // 在匹配行上做精确 L2 top-k
+    void exactSearch(const float* xq, const std::vector<uint32_t>& ids, size_t k, idx_t* I) const {
+        std::vector<std::pair<float, idx_t>> heap;  // 大顶堆，保存当前最近的 k 个
+        heap.reserve(k + 1);
+        for (uint32_t id : ids) {
+            float dis = faiss::fvec_L2sqr(xq, baseVectors_.data() + static_cast<size_t>(id) * vectorDim, vectorDim);
+            if (heap.size() < k) {
+                heap.emplace_back(dis, id);
+                std::push_heap(heap.begin(), heap.end());
+            } else if (dis < heap.front().first) {
+                std::pop_heap(heap.begin(), heap.end());
+                heap.back() = {dis, id};
+                std::push_heap(heap.begin(), heap.end());
+            }
+        }
+        std::sort_heap(heap.begin(), heap.end());
+        for (size_t i = 0; i < k; ++i) {
+            I[i] = i < heap.size() ? heap[i].second : -1;
+        }
+    }
+
+    // 对同一过滤条件的 nq 个查询按 plan 执行搜索，结果写入 I (nq * k)
+    void searchWithPlan(SearchPlan plan, const Query& query, const std::string& key,
+                        const float* xq, size_t nq, double estimate,
+                        const std::vector<DataPointLabel>& dataPointsLabel,
+                        size_t nb, int nprobe, size_t k, idx_t* I,
+                        double& filterTime, double& searchTime) {
+        size_t kPrime = 0;
+        if (plan == SearchPlan::IVF_POSTFILTER) {
+            kPrime = postFilterK(estimate, index->ntotal, nprobe, k);
+            if (kPrime == 0) {
+                plan = SearchPlan::IVF_SELECTOR;  // 扫描到的候选不足以凑够 k 个匹配
+            }
+        }
+
+        // 计时过滤：位图（命中缓存时只计查找时间）或匹配行号
+        auto start_filter = std::chrono::high_resolution_clock::now();
+        BitmapCache::BitmapPtr bitmap;
+        std::vector<uint32_t> matches;
+        if (plan == SearchPlan::IVF_SELECTOR) {
+            bitmap = bitmapCache_.get(key, [&] {
+                return generateBitmap(query, dataPointsLabel);
+            });
+        } else if (plan == SearchPlan::EXACT_SCAN) {
+            matches = labelIndex_.match(query);
+        }
+        auto end_filter = std::chrono::high_resolution_clock::now();
+        filterTime += std::chrono::duration<double, std::micro>(end_filter - start_filter).count();
+
+        // 计时搜索
+        auto start_search = std::chrono::high_resolution_clock::now();
+        faiss::IVFSearchParameters params;
+        params.nprobe = nprobe;
+        if (partitioned_) {
+            // 回退索引按同样比例缩放 nprobe，与 choosePlan / postFilterK 中按全局 nlist 估计的扫描量一致
+            params.nprobe = partitionNprobe(static_cast<const faiss::IndexIVF*>(index.get())->nlist, nprobe);
+        }
+        if (plan == SearchPlan::EXACT_SCAN) {
+            // 大组在组内并行，小组已处于组间并行区域中时串行
+            #pragma omp parallel for if (nq > 1)
+            for (size_t i = 0; i < nq; ++i) {
+                exactSearch(xq + i * vectorDim, matches, k, I + i * k);
+            }
+        } else if (plan == SearchPlan::LABEL_PARTITION) {
+            // 分区内所有行都满足过滤条件，无需选择器
+            const LabelPartition& part = partitions_.at(partitionKey(query));
+            std::vector<float> D(k * nq);
+            params.nprobe = partitionNprobe(part.nlist, nprobe);
+            faiss::ivflib::search_with_parameters(
+                part.index.get(), nq, xq, k, D.data(), I, &params);
+        } else if (plan == SearchPlan::IVF_SELECTOR) {
+            std::vector<float> D(k * nq);
+            faiss::IDSelectorBitmap sel((nb + 7) / 8, bitmap->data());
+            params.sel = &sel;
+            faiss::ivflib::search_with_parameters(
+                index.get(), nq, xq, k, D.data(), I, &params);
+        } else {
+            // 按查询分块，候选缓冲区不超过 POSTFILTER_CHUNK_CANDIDATES 个
+            size_t chunk = std::max<size_t>(1, std::min(nq, POSTFILTER_CHUNK_CANDIDATES / kPrime));
+            std::vector<idx_t> candI(kPrime * chunk);
+            std::vector<float> candD(kPrime * chunk);
+            for (size_t begin = 0; begin < nq; begin += chunk) {
+                size_t n = std::min(chunk, nq - begin);
+                faiss::ivflib::search_with_parameters(
+                    index.get(), n, xq + begin * vectorDim, kPrime, candD.data(), candI.data(), &params);
+                for (size_t i = 0; i < n; ++i) {
+                    idx_t* out = I + (begin + i) * k;
+                    size_t found = 0;
+                    for (size_t j = 0; j < kPrime && found < k; ++j) {
+                        idx_t id = candI[i * kPrime + j];
+                        if (id >= 0 && query.match(dataPointsLabel[id])) {
+                            out[found++] = id;
+                        }
+                    }
+                    std::fill(out + found, out + k, idx_t(-1));
+                }
+            }
+        }
+        auto end_search = std::chrono::high_resolution_clock::now();
+        searchTime += std::chrono::duration<double, std::micro>(end_search - start_search).count();
 
-    // 生成位图
+        planCounts_[static_cast<int>(plan)] += nq;
+    }
+
+    // 生成位图：通过倒排索引只访问匹配的行，代价为 O(匹配数)
     std::vector<uint8_t> generateBitmap(const Query& query, const std::vector<DataPointLabel>& dataPoints) {
         size_t nb = dataPoints.size();
         std::vector<uint8_t> bitmap((nb + 7) / 8, 0); // 位图大小为数据点数量的 1/8，向上取整
 
-        for (size_t i = 0; i < nb; ++i) {
-            if (query.match(dataPoints[i])) {
-                bitmap[i >> 3] |= (1 << (i % 8)); // 设置对应位
-            }
+        for (uint32_t i : labelIndex_.match(query)) {
+            bitmap[i >> 3] |= (1 << (i % 8)); // 设置对应位
         }
 
-    return bitmap;
+        return bitmap;
     }
 
     float computeRecall(const std::vector<std::vector<idx_t>>& results,
@@ -360,6 +977,52 @@ private:
         }
     }
 
+    // peak_rss_mb,vm_hwm_mb,minor_faults,major_faults,vol_ctx_switches,invol_ctx_switches
+    static std::string memorySummaryColumns(const MemorySampler::Summary& memory) {
+        std::ostringstream columns;
+        columns << memory.peakRssMB << "," << memory.hwmMB << "," << memory.minorFaults << "," << memory.majorFaults
+                << "," << memory.voluntaryCtx << "," << memory.involuntaryCtx;
+        return columns.str();
+    }
+
+    // 内存时间序列写在对应结果文件旁：<结果文件名>.mem.csv
+    void saveMemorySeries(const MemorySampler& sampler, const std::string& csvFile) const {
+        if (!memoryTrace || !isSaveToFile) {
+            return;
+        }
+        sampler.saveSeries(csvFile.substr(0, csvFile.rfind(".csv")) + ".mem.csv");
+    }
+
+    // 常驻内存按匿名页 / 文件页拆分 (MB)，mmap 打开的索引计入文件页
+    void getResidentMemory(float& anonMem, float& fileMem) {
+        std::ifstream status("/proc/self/status");
+        std::string line;
+        anonMem = fileMem = 0;
+        while (std::getline(status, line)) {
+            std::istringstream iss(line);
+            std::string field;
+            float kb;
+            if (!(iss >> field >> kb)) {
+                continue;
+            }
+            if (field == "RssAnon:") {
+                anonMem = kb / 1024.0;
+            } else if (field == "RssFile:" || field == "RssShmem:") {
+                fileMem += kb / 1024.0;
+            }
+        }
+    }
+
+    // 索引内存 = 加载索引带来的匿名页增量 + 此后增加的文件页（mmap 的索引页在搜索时才被换入）
+    // 查询内存 = 索引加载后增加的匿名页（标签、查询、位图、结果等）
+    void getIndexQueryMemory(float& indexMem, float& queryMem) {
+        float anonMem, fileMem;
+        getResidentMemory(anonMem, fileMem);
+        indexMem = std::max(0.0f, memAnonAfterIndex_ - memAnonBeforeIndex_)
+                 + std::max(0.0f, fileMem - memFileBeforeIndex_);
+        queryMem = std::max(0.0f, anonMem - memAnonAfterIndex_);
+    }
+
     void getIndexSize(float& indexFileSize, const std::string& indexFilePath) {
         std::ifstream file(indexFilePath, std::ios::binary | std::ios::ate);
         if (!file.is_open()) {
@@ -404,12 +1067,13 @@ private:
     }
     
     // 执行并行搜索操作并返回性能指标
-    std::tuple<double, double, double, std::vector<std::vector<idx_t>>> 
+    std::tuple<double, double, double, std::vector<std::vector<idx_t>>, std::vector<QueryLatency>> 
     executeSearch(std::vector<Query>& queries, 
                   const std::vector<DataPointLabel>& dataPointsLabel,
                   size_t nb, int nprobe, int thread_num, size_t k) {
         
         std::vector<std::vector<idx_t>> results(queries.size());
+        std::vector<QueryLatency> latencies(queries.size());  // 预分配，每个查询的槽位只由执行它的线程写入
         double total_filter_time = 0;
         double total_search_time = 0;
         
@@ -422,27 +1086,16 @@ private:
             float* xq = query.queryVector.data();
 
             std::vector<idx_t> I(k);
-            std::vector<float> D(k);
 
-            // 计时 generateBitmap
-            auto start_bitmap = std::chrono::high_resolution_clock::now();
-            std::vector<uint8_t> bitmap = generateBitmap(query, dataPointsLabel);
-            auto end_bitmap = std::chrono::high_resolution_clock::now();
-            total_filter_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_bitmap - start_bitmap).count();
-
-            faiss::IVFSearchParameters params;
-            faiss::IDSelectorBitmap sel((nb + 7) / 8, bitmap.data());
-            params.sel = &sel;
-            params.nprobe = nprobe;
-
-            // 计时 search_with_parameters
-            auto start_search = std::chrono::high_resolution_clock::now();
-            faiss::ivflib::search_with_parameters(
-                index.get(), 1, xq, k, D.data(), I.data(), &params);
-            auto end_search = std::chrono::high_resolution_clock::now();
-            total_search_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_search - start_search).count();
+            // 按选择率估计为每个查询选择策略（估计只读倒排表长度）
+            double estimate = labelIndex_.estimateCount(query);
+            SearchPlan plan = choosePlan(query, estimate, nprobe);
+            double filterTime = 0, searchTime = 0;
+            searchWithPlan(plan, query, query.generateGroupKey(), xq, 1, estimate, dataPointsLabel,
+                           nb, nprobe, k, I.data(), filterTime, searchTime);
+            total_filter_time += filterTime;
+            total_search_time += searchTime;
+            latencies[qIndex] = {static_cast<float>(filterTime), static_cast<float>(searchTime)};
 
             results[qIndex] = std::move(I);
         }
@@ -451,16 +1104,20 @@ private:
         auto endQueryTime = std::chrono::high_resolution_clock::now();
         double queryTime = std::chrono::duration_cast<std::chrono::microseconds>(endQueryTime - startQueryTime).count();
         
-        return {queryTime, total_filter_time, total_search_time, results};
+        return {queryTime, total_filter_time, total_search_time, results, latencies};
     }
 
     // 执行基于分组的搜索操作并返回性能指标
-    std::tuple<double, double, double, std::vector<std::vector<idx_t>>> 
+    // 调度：分组按查询数从大到小排序，查询数不少于 总查询数/线程数 的大组逐个执行、
+    // 由 Faiss 在组内并行；其余小组按该顺序动态分配给各线程（先大后小，空闲线程取下一组），
+    // 每组在线程内串行搜索
+    std::tuple<double, double, double, std::vector<std::vector<idx_t>>, std::vector<QueryLatency>> 
     executeGroupedSearch(std::vector<Query>& queries, 
                         const std::vector<DataPointLabel>& dataPointsLabel,
-                        size_t nb, int nprobe, size_t k) {
+                        size_t nb, int nprobe, int thread_num, size_t k) {
         
         std::vector<std::vector<idx_t>> results(queries.size());
+        std::vector<QueryLatency> latencies(queries.size());  // 预分配，每个查询的槽位只由执行它的线程写入
         double total_filter_time = 0;
         double total_search_time = 0;
         
@@ -474,58 +1131,79 @@ private:
             groupedQueries[key].emplace_back(i);
         }
         
-        // 转换为 vector 以支持并行处理
+        // 转换为 vector 并按组大小降序排列
         std::vector<std::pair<std::string, std::vector<size_t>>> groupedQueriesVector;
         groupedQueriesVector.reserve(groupedQueries.size());
         for (auto &group : groupedQueries) {
             groupedQueriesVector.push_back(std::move(group));
         }
+        std::stable_sort(groupedQueriesVector.begin(), groupedQueriesVector.end(),
+                         [](const auto& a, const auto& b) { return a.second.size() > b.second.size(); });
+
+        // 所有分组的查询向量和结果按组连续存放在一块预分配的缓冲区中，offsets[g] 为第 g 组的起始查询序号
+        size_t numGroups = groupedQueriesVector.size();
+        std::vector<size_t> offsets(numGroups + 1, 0);
+        for (size_t g = 0; g < numGroups; ++g) {
+            offsets[g + 1] = offsets[g] + groupedQueriesVector[g].second.size();
+        }
+        std::vector<float> xq(queries.size() * vectorDim);
+        std::vector<idx_t> I(queries.size() * k);
+
+        // 大组：组内并行；小组：组间并行
+        size_t largeGroupSize = thread_num > 1 ? (queries.size() + thread_num - 1) / thread_num : queries.size() + 1;
+        size_t numLarge = 0;
+        while (numLarge < numGroups && groupedQueriesVector[numLarge].second.size() >= largeGroupSize) {
+            ++numLarge;
+        }
 
-        for (auto it = groupedQueriesVector.begin(); it != groupedQueriesVector.end(); ++it) {
-            const std::vector<size_t> &queryGroup = it->second;
+        // 同组查询一起返回，每个查询的延迟记为整组的耗时
+        auto searchGroup = [&](size_t g, double& totalFilterTime, double& totalSearchTime) {
+            const std::string& key = groupedQueriesVector[g].first;
+            const std::vector<size_t> &queryGroup = groupedQueriesVector[g].second;
             size_t nq = queryGroup.size();
-            std::vector<float> xq(nq * vectorDim);
-            
+            float* groupXq = xq.data() + offsets[g] * vectorDim;
+            idx_t* groupI = I.data() + offsets[g] * k;
+
             for (size_t i = 0; i < nq; i++) {
                 std::copy(queries[queryGroup[i]].queryVector.begin(),
                         queries[queryGroup[i]].queryVector.end(),
-                        xq.begin() + i * vectorDim);
+                        groupXq + i * vectorDim);
             }
 
-            std::vector<idx_t> I(k * nq);
-            std::vector<float> D(k * nq);
-
-            // 计时 generateBitmap
-            auto start_bitmap = std::chrono::high_resolution_clock::now();
-            std::vector<uint8_t> bitmap = generateBitmap(queries[queryGroup[0]], dataPointsLabel);
-            auto end_bitmap = std::chrono::high_resolution_clock::now();
-            total_filter_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_bitmap - start_bitmap).count();
-
-            faiss::IVFSearchParameters params;
-            faiss::IDSelectorBitmap sel((nb + 7) / 8, bitmap.data());
-            params.sel = &sel;
-            params.nprobe = nprobe;
-
-            // 计时 search_with_parameters
-            auto start_search = std::chrono::high_resolution_clock::now();
-            faiss::ivflib::search_with_parameters(
-                index.get(), nq, xq.data(), k, D.data(), I.data(), &params);
-            auto end_search = std::chrono::high_resolution_clock::now();
-            total_search_time += std::chrono::duration_cast<std::chrono::microseconds>(
-                end_search - start_search).count();
+            // 同组查询过滤条件相同，整组使用一个策略
+            const Query& groupQuery = queries[queryGroup[0]];
+            double estimate = labelIndex_.estimateCount(groupQuery);
+            SearchPlan plan = choosePlan(groupQuery, estimate, nprobe);
+            double filterTime = 0, searchTime = 0;
+            searchWithPlan(plan, groupQuery, key, groupXq, nq, estimate, dataPointsLabel,
+                           nb, nprobe, k, groupI, filterTime, searchTime);
+            totalFilterTime += filterTime;
+            totalSearchTime += searchTime;
 
+            // 同组查询一起返回，每个查询记整组耗时的均摊值，分位数才反映单个查询而非组大小
+            QueryLatency perQuery = {static_cast<float>(filterTime / nq), static_cast<float>(searchTime / nq)};
             for (size_t i = 0; i < nq; ++i) {
                 size_t queryIndex = queryGroup[i];
-                results[queryIndex].assign(I.begin() + i * k, I.begin() + (i + 1) * k);
+                results[queryIndex].assign(groupI + i * k, groupI + (i + 1) * k);
+                latencies[queryIndex] = perQuery;
             }
+        };
+
+        for (size_t g = 0; g < numLarge; ++g) {
+            searchGroup(g, total_filter_time, total_search_time);
+        }
+
+        // 嵌套并行默认关闭，小组内的 Faiss 搜索在各自线程中串行执行
+        #pragma omp parallel for if (thread_num > 1) schedule(dynamic, 1) reduction(+:total_filter_time,total_search_time)
+        for (size_t g = numLarge; g < numGroups; ++g) {
+            searchGroup(g, total_filter_time, total_search_time);
         }
 
         // 计算查询时间
         auto endQueryTime = std::chrono::high_resolution_clock::now();
         double queryTime = std::chrono::duration_cast<std::chrono::microseconds>(endQueryTime - startQueryTime).count();
         
-        return {queryTime, total_filter_time, total_search_time, results};
+        return {queryTime, total_filter_time, total_search_time, results, latencies};
     }
     
 };
@@ -0,0 +1,111 @@
+#ifndef LABELINDEX_H
+#define LABELINDEX_H
+
+#include <algorithm>
+#include <cstdint>
+#include <utility>
+#include <vector>
+
+// 使用预处理器指令动态切换头文件
+#ifdef USE_ONE_ATTR
+#include "DataStructures_OneAttr.h"
+#elif defined(USE_THREE_ATTR)
+#include "DataStructures_ThreeAttr.h"
+#else
+#include "DataStructures_ThreeAttr.h"
+#endif
+
+// 标签倒排索引：每个属性一份 属性值 -> 有序行号列表（CSR 存储）
+// 构建一次 O(nb)，之后按查询取匹配行号的代价为 O(匹配数)，
+// 多属性查询从最短的倒排列表出发与其余列表求交
+class LabelIndex {
+public:
+    using Posting = std::pair<const uint32_t*, const uint32_t*>;
+
+    static constexpr size_t NUM_VALUES = 1 << 16;  // uint16_t 属性的取值个数
+
+    LabelIndex() = default;
+
+    explicit LabelIndex(const std::vector<DataPointLabel>& dataPoints) {
+        build(dataPoints);
+    }
+
+    // 计数排序构建，行号天然有序
+    void build(const std::vector<DataPointLabel>& dataPoints) {
+        nb_ = dataPoints.size();
+        for (size_t attr = 0; attr < DataPointLabel::NUM_ATTRIBUTES; ++attr) {
+            std::vector<uint32_t>& offsets = offsets_[attr];
+            std::vector<uint32_t>& ids = ids_[attr];
+            offsets.assign(NUM_VALUES + 1, 0);
+            for (const DataPointLabel& point : dataPoints) {
+                offsets[point.getAttribute(attr) + 1]++;
+            }
+            for (size_t v = 0; v < NUM_VALUES; ++v) {
+                offsets[v + 1] += offsets[v];
+            }
+            ids.resize(nb_);
+            std::vector<uint32_t> cursor(offsets.begin(), offsets.end() - 1);
+            for (size_t i = 0; i < nb_; ++i) {
+                ids[cursor[dataPoints[i].getAttribute(attr)]++] = static_cast<uint32_t>(i);
+            }
+        }
+    }
+
+    size_t size() const { return nb_; }
+
+    // 第 attr 个属性取值为 value 的行号区间 [first, second)
+    Posting posting(size_t attr, uint16_t value) const {
+        const uint32_t* ids = ids_[attr].data();
+        return {ids + offsets_[attr][value], ids + offsets_[attr][value + 1]};
+    }
+
+    // 匹配行数估计：各属性倒排列表长度按独立性相乘，单属性时为精确值
+    double estimateCount(const Query& query) const {
+        if (nb_ == 0) {
+            return 0;
+        }
+        double count = static_cast<double>(nb_);
+        for (size_t attr = 0; attr < Query::NUM_ATTRIBUTES; ++attr) {
+            Posting list = posting(attr, query.getAttribute(attr));
+            count *= static_cast<double>(list.second - list.first) / nb_;
+        }
+        return count;
+    }
+
+    // 与 Query::match 语义一致：所有属性都相等的行号（升序）
+    std::vector<uint32_t> match(const Query& query) const {
+        std::vector<Posting> lists;
+        for (size_t attr = 0; attr < Query::NUM_ATTRIBUTES; ++attr) {
+            lists.push_back(posting(attr, query.getAttribute(attr)));
+        }
+        std::sort(lists.begin(), lists.end(), [](const Posting& a, const Posting& b) {
+            return (a.second - a.first) < (b.second - b.first);
+        });
+
+        std::vector<uint32_t> result(lists[0].first, lists[0].second);
+        for (size_t l = 1; l < lists.size() && !result.empty(); ++l) {
+            // 结果集远小于待求交列表，逐个二分前进
+            const uint32_t* cur = lists[l].first;
+            const uint32_t* end = lists[l].second;
+            size_t kept = 0;
+            for (uint32_t id : result) {
+                cur = std::lower_bound(cur, end, id);
+                if (cur == end) {
+                    break;
+                }
+                if (*cur == id) {
+                    result[kept++] = id;
+                }
+            }
+            result.resize(kept);
+        }
+        return result;
+    }
+
+private:
+    size_t nb_ = 0;
+    std::vector<uint32_t> offsets_[DataPointLabel::NUM_ATTRIBUTES];
+    std::vector<uint32_t> ids_[DataPointLabel::NUM_ATTRIBUTES];
+};
+
+#endif // LABELINDEX_H
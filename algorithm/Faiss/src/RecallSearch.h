@@ -0,0 +1,130 @@
+#ifndef RECALLSEARCH_H
+#define RECALLSEARCH_H
+
+#include <algorithm>
+#include <cmath>
+#include <map>
+#include <set>
+#include <vector>
+
+// 按召回率目标自适应搜索 nprobe：对每个目标维护区间 (below, reached)，
+// below 为未达到目标的最大参数，reached 为达到目标的最小参数，逐轮缩小区间。
+// 第一轮在 [lo, hi] 上按几何间隔取点；之后每个未收敛的目标提出一个点，
+// 在 (log p, log(1 - recall)) 上线性插值并限制在区间中间一半，保证每轮至少缩小四分之一。
+// 区间宽度不超过 max(1, relTol * reached) 时该目标收敛。与 script/common/adaptive.py 一致。
+class RecallSearch {
+public:
+    RecallSearch(int lo, int hi, std::vector<float> targets, double relTol = 0.05, int seeds = 4)
+        : lo_(lo), hi_(std::max(lo, hi)), targets_(std::move(targets)), relTol_(relTol), seeds_(seeds) {
+        std::sort(targets_.begin(), targets_.end());
+    }
+
+    // 下一轮要评估的参数（升序），全部目标收敛后为空
+    std::vector<int> nextBatch() const {
+        std::set<int> batch;
+        if (points_.empty()) {
+            batch.insert(hi_);
+            double base = std::max(lo_, 1);
+            double ratio = seeds_ > 1 ? std::pow(std::max(hi_, 1) / base, 1.0 / (seeds_ - 1)) : 1.0;
+            for (int i = 0; i + 1 < seeds_; ++i) {
+                batch.insert(clamp(static_cast<int>(std::lround(base * std::pow(ratio, i)))));
+            }
+        } else {
+            for (float target : targets_) {
+                if (!resolved(target)) {
+                    int p = propose(target);
+                    if (points_.find(p) == points_.end()) {
+                        batch.insert(p);
+                    }
+                }
+            }
+        }
+        return std::vector<int>(batch.begin(), batch.end());
+    }
+
+    void record(int param, float recall) {
+        points_[param] = recall;
+    }
+
+    // 达到目标的最小参数，达不到时为 -1
+    int answer(float target) const {
+        return bracket(target).second;
+    }
+
+    const std::vector<float>& targets() const {
+        return targets_;
+    }
+
+    size_t evaluated() const {
+        return points_.size();
+    }
+
+private:
+    int lo_, hi_;
+    std::vector<float> targets_;
+    double relTol_;
+    int seeds_;
+    std::map<int, float> points_;
+
+    int clamp(int p) const {
+        return std::min(std::max(p, lo_), hi_);
+    }
+
+    std::pair<int, int> bracket(float target) const {
+        int reached = -1;
+        for (const auto& [p, r] : points_) {
+            if (r >= target) {
+                reached = p;
+                break;
+            }
+        }
+        int below = -1;
+        for (const auto& [p, r] : points_) {
+            if (reached != -1 && p >= reached) {
+                break;
+            }
+            if (r < target) {
+                below = p;
+            }
+        }
+        return {below, reached};
+    }
+
+    bool resolved(float target) const {
+        auto [below, reached] = bracket(target);
+        if (reached == -1) {
+            return points_.count(hi_) > 0;  // 最大参数也达不到
+        }
+        if (reached == lo_) {
+            return true;
+        }
+        if (below == -1) {
+            return false;
+        }
+        return reached - below <= std::max(1.0, relTol_ * reached);
+    }
+
+    int propose(float target) const {
+        auto [below, reached] = bracket(target);
+        if (reached == -1) {
+            return hi_;
+        }
+        if (below == -1) {
+            return lo_;
+        }
+        double rLo = points_.at(below), rHi = points_.at(reached);
+        double width = reached - below;
+        double loGuard = below + width / 4, hiGuard = reached - width / 4;
+        double guess = (below + reached) / 2.0;
+        if (below > 0 && rLo < rHi && rHi < 1 && target < 1) {
+            double x0 = std::log(below), x1 = std::log(reached);
+            double y0 = std::log(1 - rLo), y1 = std::log(1 - rHi);
+            guess = std::exp(x0 + (std::log(1 - target) - y0) * (x1 - x0) / (y1 - y0));
+        }
+        guess = std::min(std::max(guess, loGuard), hiGuard);
+        int p = static_cast<int>(std::lround(guess));
+        return std::min(std::max(p, below + 1), reached - 1);
+    }
+};
+
+#endif
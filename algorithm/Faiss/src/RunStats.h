@@ -0,0 +1,90 @@
+#ifndef RUNSTATS_H
+#define RUNSTATS_H
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <random>
+#include <vector>
+
+// 重复运行的统计汇总：中位数、均值、极值、标准差、均值的 bootstrap 置信区间和变异系数
+struct RunStats {
+    size_t runs = 0;
+    double median = 0;
+    double mean = 0;
+    double min = 0;
+    double max = 0;
+    double stddev = 0;   // 样本标准差（n - 1）
+    double ciLow = 0;    // 均值的 bootstrap 百分位置信区间
+    double ciHigh = 0;
+    double cv = 0;       // 变异系数 stddev / mean
+
+    // CV 不超过阈值时认为结果稳定；单次运行无法判断，视为不稳定
+    bool stable(double cvThreshold) const {
+        return runs > 1 && cv <= cvThreshold;
+    }
+
+    static double medianOf(std::vector<double> values) {
+        if (values.empty()) {
+            return 0;
+        }
+        size_t mid = values.size() / 2;
+        std::nth_element(values.begin(), values.begin() + mid, values.end());
+        double upper = values[mid];
+        if (values.size() % 2 == 1) {
+            return upper;
+        }
+        double lower = *std::max_element(values.begin(), values.begin() + mid);
+        return (lower + upper) / 2;
+    }
+
+    // 固定随机种子，同一组样本每次得到相同的置信区间
+    static RunStats compute(const std::vector<double>& samples, double confidence = 0.95,
+                            size_t resamples = 2000, uint64_t seed = 42) {
+        RunStats stats;
+        stats.runs = samples.size();
+        if (samples.empty()) {
+            return stats;
+        }
+
+        double sum = 0;
+        for (double v : samples) {
+            sum += v;
+        }
+        stats.mean = sum / samples.size();
+        stats.median = medianOf(samples);
+        auto minmax = std::minmax_element(samples.begin(), samples.end());
+        stats.min = *minmax.first;
+        stats.max = *minmax.second;
+
+        if (samples.size() > 1) {
+            double sq = 0;
+            for (double v : samples) {
+                sq += (v - stats.mean) * (v - stats.mean);
+            }
+            stats.stddev = std::sqrt(sq / (samples.size() - 1));
+        }
+        stats.cv = stats.mean != 0 ? stats.stddev / std::fabs(stats.mean) : 0;
+
+        // 有放回重采样 resamples 次，取重采样均值的 (1-c)/2 与 (1+c)/2 分位数
+        std::vector<double> means(resamples);
+        std::mt19937_64 rng(seed);
+        std::uniform_int_distribution<size_t> pick(0, samples.size() - 1);
+        for (size_t r = 0; r < resamples; ++r) {
+            double s = 0;
+            for (size_t i = 0; i < samples.size(); ++i) {
+                s += samples[pick(rng)];
+            }
+            means[r] = s / samples.size();
+        }
+        std::sort(means.begin(), means.end());
+        double alpha = (1 - confidence) / 2;
+        size_t lo = static_cast<size_t>(std::floor(alpha * (resamples - 1)));
+        size_t hi = static_cast<size_t>(std::ceil((1 - alpha) * (resamples - 1)));
+        stats.ciLow = means[lo];
+        stats.ciHigh = means[hi];
+        return stats;
+    }
+};
+
+#endif // RUNSTATS_H
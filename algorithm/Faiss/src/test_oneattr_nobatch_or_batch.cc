@@ -200,7 +200,7 @@ std::pair<std::map<std::string, DatasetConfig>, std::map<std::string, QuerySetCo
 }
 
 
-void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, bool isBatch) {
+void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, bool isBatch, size_t bitmap_cache_mb, const std::string& plan_mode, size_t partition_min_rows, bool use_mmap, size_t warmup_runs, bool latency_trace, bool memory_trace, const std::vector<float>& recall_targets) {
     // 获取数据集和查询集配置
     auto [datasets, query_sets] = get_query_config();
 
@@ -232,6 +232,13 @@ void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, boo
         experiment.setIsBatch(isBatch);
         experiment.setIsSaveToFile(is_save_to_file);
         experiment.setCycleNum(cycle_num);
+        experiment.setUseMmap(use_mmap);
+        experiment.setWarmupRuns(warmup_runs);
+        experiment.setLatencyTrace(latency_trace);
+        experiment.setMemorySampling(10, memory_trace);
+        experiment.setBitmapCacheLimit(bitmap_cache_mb);
+        experiment.setPlanMode(plan_mode);
+        experiment.setRecallTargets(recall_targets);
 
         // 设置数据集名称
         experiment.setDataset(dataset_name);
@@ -249,7 +256,12 @@ void runAllExperiments(int thread_nums, int cycle_num, bool is_save_to_file, boo
         );
 
         // 设置索引的类型和配置
-        experiment.setIndexKey(dataset_config.index_key);
+        // 分区模式：出现次数不少于 partition_min_rows 的标签组合各建一个 IVF
+        if (partition_min_rows > 0) {
+            experiment.setIndexKey("Partition" + std::to_string(partition_min_rows) + "," + dataset_config.index_key);
+        } else {
+            experiment.setIndexKey(dataset_config.index_key);
+        }
 
         experiment.setIndexPath(projectRoot + "/algorithm/Faiss/build/index/");
 
@@ -322,7 +334,15 @@ int main(int argc, char *argv[]) {
     // 默认值
     int thread_nums = -1;
     int cycle_num = 1;
+    size_t warmup_runs = 1;
+    size_t bitmap_cache_mb = 1024;
+    std::string plan_mode = "selector";
+    size_t partition_min_rows = 0;
     bool is_save_to_file = false;
+    bool use_mmap = false;
+    bool latency_trace = false;
+    bool memory_trace = false;
+    std::vector<float> recall_targets;  // 为空时使用各数据集固定的 nprobe 列表
 
     // 批量需要结合taskset -c使用
     bool isBatch = 0;
@@ -340,12 +360,61 @@ int main(int argc, char *argv[]) {
                 cycle_num = std::stoi(argv[++i]);
             }
         }
+        else if (arg == "--bitmap-cache" || arg == "-m") {
+            if (i + 1 < argc) {
+                bitmap_cache_mb = std::stoul(argv[++i]);
+            }
+        }
+        else if (arg == "--plan" || arg == "-p") {
+            if (i + 1 < argc) {
+                plan_mode = argv[++i];
+            }
+        }
+        else if (arg == "--partition" || arg == "-P") {
+            if (i + 1 < argc) {
+                partition_min_rows = std::stoul(argv[++i]);
+            }
+        }
+        else if (arg == "--warmup" || arg == "-w") {
+            if (i + 1 < argc) {
+                warmup_runs = std::stoul(argv[++i]);
+            }
+        }
         else if (arg == "--save" || arg == "-s") {
             if (i + 1 < argc) {
                 std::string value = argv[++i];
                 is_save_to_file = (value == "true" || value == "1" || value == "yes");
             }
         }
+        else if (arg == "--mmap" || arg == "-M") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                use_mmap = (value == "true" || value == "1" || value == "yes");
+            }
+        }
+        else if (arg == "--latency-trace" || arg == "-L") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                latency_trace = (value == "true" || value == "1" || value == "yes");
+            }
+        }
+        else if (arg == "--memory-trace" || arg == "-T") {
+            if (i + 1 < argc) {
+                std::string value = argv[++i];
+                memory_trace = (value == "true" || value == "1" || value == "yes");
+            }
+        }
+        else if (arg == "--recall-targets" || arg == "-r") {
+            if (i + 1 < argc) {
+                std::stringstream list(argv[++i]);
+                std::string value;
+                while (std::getline(list, value, ',')) {
+                    if (!value.empty()) {
+                        recall_targets.push_back(std::stof(value));
+                    }
+                }
+            }
+        }
         else if(arg == "--batch" || arg == "-b"){
             if (i + 1 < argc) {
                 std::string value = argv[++i];
@@ -357,17 +426,37 @@ int main(int argc, char *argv[]) {
                       << "选项:\n"
                       << "  -t, --threads N    设置线程数为N (默认: 16)\n"
                       << "  -c, --cycles N     设置循环次数为N (默认: 1)\n"
+                      << "  -w, --warmup N     每组参数丢弃前N次运行作为预热，循环次数不大于N时不丢弃 (默认: 1)\n"
+                      << "  -m, --bitmap-cache N 位图缓存上限N MB，0为不缓存 (默认: 1024)\n"
+                      << "  -p, --plan MODE    过滤策略 selector/exact/postfilter/adaptive (默认: selector)\n"
+                      << "  -P, --partition N  按标签分区建索引，出现次数不少于N的标签组合单独建IVF，0为不分区 (默认: 0)\n"
                       << "  -s, --save yes/no  设置是否保存结果 (默认: 否)\n"
                       << "  -b, --batch yes/no 设置是否批量 (默认: 否)\n"
+                      << "  -M, --mmap yes/no  以 mmap 方式打开缓存的索引 (默认: 否)\n"
+                      << "  -L, --latency-trace yes/no 在结果文件旁写出逐查询延迟记录 .qlat，需同时 -s yes (默认: 否)\n"
+                      << "  -T, --memory-trace yes/no 在结果文件旁写出内存采样时间序列 .mem.csv，需同时 -s yes (默认: 否)\n"
+                      << "  -r, --recall-targets LIST 召回率目标，如 0.8,0.9,0.95,0.99：按目标自适应搜索 nprobe，代替固定列表 (默认: 不使用)\n"
                       << "  -h, --help         显示此帮助信息\n";
             return 0;
         }
     }
     std::cout << "线程数: " << thread_nums << std::endl;
     std::cout << "循环次数: " << cycle_num << std::endl;
+    std::cout << "预热次数: " << warmup_runs << std::endl;
+    std::cout << "位图缓存上限(MB): " << bitmap_cache_mb << std::endl;
+    std::cout << "过滤策略: " << plan_mode << std::endl;
+    std::cout << "标签分区最少行数: " << partition_min_rows << std::endl;
     std::cout << "是否批量: " << (isBatch ? "是" : "否") << std::endl;
     std::cout << "是否保存结果: " << (is_save_to_file ? "是" : "否") << std::endl;
+    std::cout << "是否 mmap 加载索引: " << (use_mmap ? "是" : "否") << std::endl;
+    std::cout << "是否记录逐查询延迟: " << (latency_trace ? "是" : "否") << std::endl;
+    std::cout << "是否记录内存时间序列: " << (memory_trace ? "是" : "否") << std::endl;
+    std::cout << "召回率目标: ";
+    for (float target : recall_targets) {
+        std::cout << target << " ";
+    }
+    std::cout << (recall_targets.empty() ? "无（固定 nprobe 列表）" : "") << std::endl;
     
-    runAllExperiments(thread_nums, cycle_num, is_save_to_file, isBatch);
+    runAllExperiments(thread_nums, cycle_num, is_save_to_file, isBatch, bitmap_cache_mb, plan_mode, partition_min_rows, use_mmap, warmup_runs, latency_trace, memory_trace, recall_targets);
     return 0;
 }
\ No newline at end of file
@@ -1,5 +1,9 @@
 import os
 import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.pipeline import Pipeline, pipeline_parser
 
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,6 +22,7 @@ basic_ids_c=["2-1","2-2"]
 query_ids_c=["2_1","2_2"]
 
 nprobe_values = [str(i) for i in range(500, 30500, 500)]
+search_threads = ["1", "16"]
 
 
 INDEX_EXEC = os.path.join(CAPS_DIR, "index")
@@ -33,82 +38,52 @@ def build_caps_binaries():
         print(f"❌ Error building CAPS binaries: {e}")
         exit(1)
 
-def run_commands_e(dataset):
-    
-    for basic_id, query_id in zip(basic_ids_e, query_ids_e):
-        print(f"\n🔹 Running for dataset={dataset}, query_id={query_id}")
-
-        base_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_base.fvecs")
-        base_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/labels", dataset, f"label_{basic_id}.txt")
-        index_path = os.path.join(TEMP_DIR, "index", f"{dataset}_{query_id}")
-        os.makedirs(index_path, exist_ok=True) 
-
-        query_data = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_query.fvecs")
-        query_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/query_label", dataset, f"{query_id}.txt")
-        gt_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/gt", dataset, f"gt-query_set_{query_id}.ivecs")
-        result_path = os.path.join(TEMP_DIR, "result", f"{dataset}_{query_id}")
-        os.makedirs(result_path, exist_ok=True) 
-       
-        subprocess.run([
-            INDEX_EXEC, base_path, base_attr, index_path, "1024", "kmeans", "3"
-        ], check=True)
-
-        
-        for nprobe in nprobe_values:
-            subprocess.run([
-                QUERY_EXEC, base_path, base_attr, query_data, query_attr,
-                index_path, gt_path, "1024", "kmeans", "3", nprobe, "1", dataset, result_path
-            ], check=True)
-
-     
-        for nprobe in nprobe_values:
-            print(f"[🚀 Multi Thread] nprobe={nprobe}")
-            subprocess.run([
-                QUERY_EXEC, base_path, base_attr, query_data, query_attr,
-                index_path, gt_path, "1024", "kmeans", "3", nprobe, "16", dataset, result_path
-            ], check=True)
-            
-def run_commands_c(dataset): 
-    
-    for basic_id, query_id in zip(basic_ids_c, query_ids_c):
-        print(f"\n🔹 Running for dataset={dataset}, query_id={query_id}")
-
-        base_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_base.fvecs")
-        base_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/labels", dataset, f"label_{basic_id}.txt")
-        index_path = os.path.join(TEMP_DIR, "index", f"{dataset}_{query_id}")
-        os.makedirs(index_path, exist_ok=True)  
-
-        query_data = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_query.fvecs")
-        query_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/query_label", dataset, f"caps_{query_id}.txt")
-        gt_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/gt", dataset, f"gt-query_set_{query_id}.ivecs")
-        result_path = os.path.join(TEMP_DIR, "result", f"{dataset}_{query_id}")
-        os.makedirs(result_path, exist_ok=True)  
-       
-        subprocess.run([
-            INDEX_EXEC, base_path, base_attr, index_path, "1024", "kmeans", "3"
-        ], check=True)
-        
-        
-      
+def add_caps_steps(pipeline, dataset, basic_id, query_id, query_attr_name):
+    base_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_base.fvecs")
+    base_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/labels", dataset, f"label_{basic_id}.txt")
+
+    query_data = os.path.join(EXPERIMENT_ROOT, "labelfilterData/datasets", dataset, f"{dataset}_query.fvecs")
+    query_attr = os.path.join(EXPERIMENT_ROOT, "labelfilterData/query_label", dataset, query_attr_name)
+    gt_path = os.path.join(EXPERIMENT_ROOT, "labelfilterData/gt", dataset, f"gt-query_set_{query_id}.ivecs")
+    result_path = os.path.join(TEMP_DIR, "result", f"{dataset}_{query_id}")
+
+    # 索引目录由构建参数的哈希决定，参数或二进制不变时直接复用
+    build = pipeline.add(
+        f"caps/build/{dataset}/{query_id}",
+        cmd=[INDEX_EXEC, base_path, base_attr, "{out}", "1024", "kmeans", "3"],
+        binary=INDEX_EXEC,
+        inputs=[base_path, base_attr],
+    )
+
+    # 每个 (线程数, nprobe) 写入自己的结果目录：并发运行时互不交错，目录为空即视为未完成
+    for threads in search_threads:
         for nprobe in nprobe_values:
-            subprocess.run([ 
-                QUERY_EXEC, base_path, base_attr, query_data, query_attr,
-                index_path, gt_path, "1024", "kmeans", "3", nprobe, "1", dataset, result_path
-            ], check=True)
-
-        
-        for nprobe in nprobe_values:
-            print(f"[🚀 Multi Thread] nprobe={nprobe}")
-            subprocess.run([
-                QUERY_EXEC, base_path, base_attr, query_data, query_attr,
-                index_path, gt_path, "1024", "kmeans", "3", nprobe, "16", dataset, result_path
-            ], check=True)
+            step_result_path = os.path.join(result_path, f"T{threads}", f"nprobe{nprobe}")
+            pipeline.add(
+                f"caps/search/{dataset}/{query_id}/T{threads}/nprobe{nprobe}",
+                cmd=[QUERY_EXEC, base_path, base_attr, query_data, query_attr,
+                     build.out, gt_path, "1024", "kmeans", "3", nprobe, threads, dataset, step_result_path],
+                binary=QUERY_EXEC,
+                inputs=[query_data, query_attr, gt_path],
+                deps=[build],
+                outputs=[step_result_path + "/"],
+                threads=int(threads),
+                timed=True,
+            )
 
 def main():
+    parser = pipeline_parser("CAPS build / search sweep", os.path.join(TEMP_DIR, "cache"))
+    parser.add_argument("--datasets", nargs="+", default=datasets)
+    args = parser.parse_args()
+
     build_caps_binaries()
-    for dataset in datasets:
-        run_commands_e(dataset)
-        run_commands_c(dataset)
+    pipeline = Pipeline.from_args(args)
+    for dataset in args.datasets:
+        for basic_id, query_id in zip(basic_ids_e, query_ids_e):
+            add_caps_steps(pipeline, dataset, basic_id, query_id, f"{query_id}.txt")
+        for basic_id, query_id in zip(basic_ids_c, query_ids_c):
+            add_caps_steps(pipeline, dataset, basic_id, query_id, f"caps_{query_id}.txt")
+    return 1 if pipeline.run() else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -1,5 +1,13 @@
+import json
 import os
+import re
 import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.adaptive import RecallSearch, parse_targets
+from common.convert import atomic_write_json
+from common.pipeline import Pipeline, pipeline_parser
 
 # Define datasets and IDs
 datasets = ["audio", "sift", "gist", "glove-100", "msong", "enron"]
@@ -20,109 +28,249 @@ R_e, L_e, s_R_e, s_L_e, s_SR_e = 96, 90, 32, 100, 64
 R_c, L_c, s_R_c, s_L_c, s_SR_c = 128, 180, 48, 200, 96
 
 
-# Function to create necessary directories
-def create_dirs(dataset, query_id, index_type):
-    index_path = f"/data/HybridANNS/data/Experiment/temp/diskann/index/{dataset}_{query_id}_{index_type}/"
-    result_path = f"/data/HybridANNS/data/Experiment/temp/diskann/result/{dataset}_{query_id}_{index_type}/"
-    
-    # Check and create index_path
-    if not os.path.exists(index_path):
-        os.makedirs(index_path)
-        print(f"✅ Created directory: {index_path}")
-    else:
-        print(f"ℹ️ Directory already exists: {index_path}")
-    
-    # Check and create result_path
-    if not os.path.exists(result_path):
-        os.makedirs(result_path)
-        print(f"✅ Created directory: {result_path}")
+DISKANN_APPS = "../../algorithm/DiskANN/build/apps"
+DATA_ROOT = "/data/HybridANNS/data/Experiment/labelfilterData"
+TEMP_ROOT = "/data/HybridANNS/data/Experiment/temp/diskann"
+SEARCH_BIN = f"{DISKANN_APPS}/search_memory_index"
+
+
+# Build step for a filtered (build_memory_index) or stitched (build_stitched_index) index;
+# the index files land in a directory keyed by the build parameters
+def add_build_step(pipeline, dataset, basic_id, query_id, index_type, R, L, SR=None):
+    data_path = f"{DATA_ROOT}/datasets/{dataset}/{dataset}_base.bin"
+    label_file = f"{DATA_ROOT}/labels/{dataset}/diskann_label_{basic_id}.txt"
+    if index_type == "filtered":
+        binary = f"{DISKANN_APPS}/build_memory_index"
+        cmd = [binary, "--data_type", "float", "--dist_fn", "l2"]
+        extra = []
     else:
-        print(f"ℹ️ Directory already exists: {result_path}")
-    
-    return index_path, result_path
+        binary = f"{DISKANN_APPS}/build_stitched_index"
+        cmd = [binary, "--data_type", "float"]
+        extra = ["--stitched_R", f"{SR}"]
+    cmd += [
+        "--data_path", data_path,
+        "--index_path_prefix", "{out}/_",
+        "-R", f"{R}",
+        "-L", f"{L}",
+        *extra,
+        "--alpha", f"{alpha}",
+        "-T", f"{T_b}",
+        "--label_file", label_file,
+    ]
+    return pipeline.add(f"diskann/build/{dataset}/{query_id}/{index_type}", cmd=cmd, binary=binary,
+                        inputs=[data_path, label_file], threads=T_b)
+
+
+# search_memory_index 汇总表的列名 -> 结果字段名
+COLUMNS = {
+    "Ls": "L",
+    "QPS": "qps",
+    "Avg dist cmps": "avg_dist_cmps",
+    "Mean Latency (mus)": "mean_latency_us",
+    "99.9 Latency": "p999_latency_us",
+}
+
+
+def parse_search_table(text):
+    """Rows of the ``Ls / QPS / ... / Recall@K`` table printed by search_memory_index.
+
+    ``Recall@K`` is printed as a percentage and returned as a fraction in [0, 1].
+    """
+    rows = []
+    header = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("Ls ") and "QPS" in stripped:
+            header = [COLUMNS.get(name, "recall" if name.startswith("Recall@") else name)
+                      for name in re.split(r"\s{2,}", stripped)]
+            continue
+        if header is None or not stripped or stripped.startswith("="):
+            continue
+        values = stripped.split()
+        if len(values) != len(header) or not values[0].isdigit():
+            continue
+        row = dict(zip(header, (float(v) for v in values)))
+        row["L"] = int(row["L"])
+        if "recall" in row:
+            # search_memory_index 打印百分比，统一换成 [0, 1] 与召回率目标比较
+            row["recall"] /= 100
+            if not 0 <= row["recall"] <= 1:
+                raise ValueError(f"recall {row['recall'] * 100} at L={row['L']} is not a percentage")
+        rows.append(row)
+    return rows
+
+
+def min_L_for_targets(rows, targets):
+    """Smallest measured L reaching each recall target (``None`` if none does)."""
+    return {str(t): min((row["L"] for row in rows if row.get("recall", 0) >= t), default=None)
+            for t in targets}
+
+
+def collect_results(results_file, logs, targets=(), **meta):
+    """Parse the per-thread-count search logs into one JSON results file."""
+    results = []
+    reached = {}
+    for num_threads, log_path in logs:
+        with open(log_path) as f:
+            rows = parse_search_table(f.read())
+        if not rows:
+            raise ValueError(f"no result table in {log_path}")
+        for row in rows:
+            results.append(dict(meta, threads=num_threads, **row))
+            print(f"  T={num_threads:<3} L={row['L']:<5} QPS={row['qps']:>10.2f}  "
+                  f"recall={row.get('recall', float('nan')):.4f}")
+        if targets:
+            reached[num_threads] = min_L_for_targets(rows, targets)
+    payload = {**meta, "K": K, "results": results}
+    if targets:
+        payload["targets"] = reached
+    atomic_write_json(results_file, payload)
+
+
+def tune_L(cmd, log_path, tuned_file, targets):
+    """Find the smallest L for each recall target; every round is one search_memory_index run."""
+    search = RecallSearch(K, L_search[-1], targets)
+    open(log_path, "w").close()
+
+    def evaluate(Ls):
+        with open(log_path, "a") as log:
+            subprocess.run(cmd + ["-L", *(str(L) for L in Ls)], check=True, stdout=log)
+        with open(log_path) as f:
+            return {row["L"]: row["recall"] for row in parse_search_table(f.read())}
+
+    answers = search.run(evaluate)
+    print(f"  L for recall targets: {answers} ({len(search.points)} L values evaluated)")
+    atomic_write_json(tuned_file, {"targets": {str(t): L for t, L in answers.items()},
+                                   "L": sorted(search.points)})
+
 
+def search_tuned(cmd, tuned_file, log_path):
+    """Search once with every L that tune_L evaluated."""
+    with open(tuned_file) as f:
+        Ls = json.load(f)["L"]
+    with open(log_path, "w") as log:
+        subprocess.run(cmd + ["-L", *(str(L) for L in Ls)], check=True, stdout=log)
 
-# Function to run the search command (single or multi-threaded)
-def search_index(index_type, dataset, query_id, K, T, L, index_path, result_path, num_threads=1):
-    print(f"Searching {index_type} index for {dataset} with L={L} ({num_threads} thread)...")
-    subprocess.run([
-        "../../algorithm/DiskANN/build/apps/search_memory_index",
+
+def search_cmd(build, dataset, query_id, num_threads, result_path):
+    return [
+        SEARCH_BIN,
         "--data_type", "float",
         "--dist_fn", "l2",
-        "--index_path_prefix", f"{index_path}_",
-        "--query_file", f"/data/HybridANNS/data/Experiment/labelfilterData/datasets/{dataset}/{dataset}_query.bin",
+        "--index_path_prefix", f"{build.out}/_",
+        "--query_file", f"{DATA_ROOT}/datasets/{dataset}/{dataset}_query.bin",
         "--gt_file", f"/data/filter-yjy/diskann/gt/{dataset}_{query_id}.bin",
-        "--query_filters_file", f"/data/HybridANNS/data/Experiment/labelfilterData/query_label/{dataset}/diskann_{query_id}.txt",
+        "--query_filters_file", f"{DATA_ROOT}/query_label/{dataset}/diskann_{query_id}.txt",
         "-K", f"{K}",
-        "-T", f"{T}",
-        "-L", f"{L}",
-        "--result_path", f"{result_path}{num_threads}_"
-    ])
-
-# Main function to run commands for filtered indexes
-def run_filtered(dataset, basic_id, query_id, index_type,R,L):
-    # Build the index
-    index_path, result_path = create_dirs(dataset, query_id, index_type)
-    subprocess.run([
-        "../../algorithm/DiskANN/build/apps/build_memory_index" ,
-        "--data_type", "float",
-        "--dist_fn", "l2",
-        "--data_path", f"/data/HybridANNS/data/Experiment/labelfilterData/datasets/{dataset}/{dataset}_base.bin",
-        "--index_path_prefix", f"{index_path}_",
-        "-R", f"{R}",
-        "-L", f"{L}",
-        "--alpha", f"{alpha}",
-        "-T", f"{T_b}", 
-        "--label_file", f"/data/HybridANNS/data/Experiment/labelfilterData/labels/{dataset}/diskann_label_{basic_id}.txt"
-    ], check=True)
-    # Run single-threaded search for each L value
-    for L in L_search:
-        search_index(index_type, dataset, query_id, K, T_s, L, index_path, result_path)
-
-    # Run multi-threaded search (16 threads)
-    for L in L_search:
-        search_index(index_type, dataset, query_id, K, T_m, L, index_path, result_path, num_threads=16)
-# Main function to run commands for stitched indexes
-def run_stitched(dataset, basic_id, query_id, index_type,R,L,SR):
-    # Build the index
-    index_path, result_path = create_dirs(dataset, query_id, index_type)
-    subprocess.run([
-            "../../algorithm/DiskANN/build/apps/build_stitched_index" ,
-            "--data_type", "float",
-            "--data_path", f"/data/HybridANNS/data/Experiment/labelfilterData/datasets/{dataset}/{dataset}_base.bin",
-            "--index_path_prefix", f"{index_path}_",
-            "-R", f"{R}",
-            "-L", f"{L}",
-            "--stitched_R", f"{SR}",
-            "--alpha", f"{alpha}",
-            "-T", f"{T_b}", 
-            "--label_file", f"/data/HybridANNS/data/Experiment/labelfilterData/labels/{dataset}/diskann_label_{basic_id}.txt"
-        ], check=True)
-
-    # Run single-threaded search for each L value
-    for L in L_search:
-        search_index(index_type, dataset, query_id, K, T_s, L, index_path, result_path)
-
-    # Run multi-threaded search (16 threads)
-    for L in L_search:
-        search_index(index_type, dataset, query_id, K, T_m, L, index_path, result_path, num_threads=16)
-# Loop through datasets and execute the commands
+        "-T", f"{num_threads}",
+        "--result_path", f"{result_path}{num_threads}_",
+    ]
+
+
+def search_inputs(dataset, query_id):
+    return [f"{DATA_ROOT}/datasets/{dataset}/{dataset}_query.bin",
+            f"/data/filter-yjy/diskann/gt/{dataset}_{query_id}.bin",
+            f"{DATA_ROOT}/query_label/{dataset}/diskann_{query_id}.txt"]
+
+
+# One search_memory_index run per thread count covers every L value: the index and
+# queries are loaded once, and the printed table is collected into results.json
+def add_search_steps(pipeline, build, dataset, query_id, index_type):
+    result_path = f"{TEMP_ROOT}/result/{dataset}_{query_id}_{index_type}/"
+    searches = []
+    logs = []
+    for num_threads in (T_s, T_m):
+        log_path = f"{result_path}{num_threads}_search.log"
+        searches.append(pipeline.add(
+            f"diskann/search/{dataset}/{query_id}/{index_type}/T{num_threads}",
+            cmd=search_cmd(build, dataset, query_id, num_threads, result_path)
+                + ["-L", *(str(L) for L in L_search)],
+            binary=SEARCH_BIN,
+            inputs=search_inputs(dataset, query_id),
+            deps=[build],
+            outputs=[log_path],
+            stdout=log_path,
+            threads=num_threads,
+            timed=True,
+        ))
+        logs.append((num_threads, log_path))
+    add_results_step(pipeline, searches, logs, result_path, dataset, query_id, index_type)
+
+
+# Recall-targeted variant: bisect L at 16 threads (recall does not depend on T),
+# then run the single-thread search once over the L values that tuning visited
+def add_tuned_search_steps(pipeline, build, dataset, query_id, index_type, targets):
+    result_path = f"{TEMP_ROOT}/result/{dataset}_{query_id}_{index_type}/"
+    tuned_file = f"{result_path}tuned_L.json"
+    tune_log = f"{result_path}{T_m}_search.log"
+    single_log = f"{result_path}{T_s}_search.log"
+    tune = pipeline.add(
+        f"diskann/tune/{dataset}/{query_id}/{index_type}/T{T_m}",
+        func=tune_L,
+        args=(search_cmd(build, dataset, query_id, T_m, result_path), tune_log, tuned_file, targets),
+        binary=SEARCH_BIN,
+        inputs=search_inputs(dataset, query_id),
+        deps=[build],
+        outputs=[tune_log, tuned_file],
+        threads=T_m,
+        timed=True,
+    )
+    single = pipeline.add(
+        f"diskann/search/{dataset}/{query_id}/{index_type}/T{T_s}",
+        func=search_tuned,
+        args=(search_cmd(build, dataset, query_id, T_s, result_path), tuned_file, single_log),
+        binary=SEARCH_BIN,
+        deps=[tune],
+        outputs=[single_log],
+        threads=T_s,
+        timed=True,
+    )
+    add_results_step(pipeline, [tune, single], [(T_s, single_log), (T_m, tune_log)],
+                     result_path, dataset, query_id, index_type, targets)
+
+
+def add_results_step(pipeline, searches, logs, result_path, dataset, query_id, index_type, targets=()):
+    results_file = f"{result_path}results.json"
+    pipeline.add(
+        f"diskann/results/{dataset}/{query_id}/{index_type}",
+        func=collect_results,
+        args=(results_file, logs),
+        kwargs={"targets": tuple(targets), "dataset": dataset, "query_id": query_id, "index_type": index_type},
+        deps=searches,
+        outputs=[results_file],
+    )
+
+
+def add_diskann_steps(pipeline, dataset, basic_id, query_id, index_type, R, L, SR=None, targets=None):
+    build = add_build_step(pipeline, dataset, basic_id, query_id, index_type, R, L, SR)
+    if targets:
+        add_tuned_search_steps(pipeline, build, dataset, query_id, index_type, targets)
+    else:
+        add_search_steps(pipeline, build, dataset, query_id, index_type)
+
+
+# Loop through datasets and declare the build / search steps
 def main():
-    # Step 1: Run GT generation shell script
-    print("🟡 Running groundtruth generation script (run_gt.sh)...")
-    # subprocess.run(["bash", "run_gt.sh"], check=True)
-
-    # Step 2: Continue with indexing and searching
-    for dataset in datasets:
-        for basic_id, query_id in zip(basic_ids_e, query_ids_e):
-            run_filtered(dataset, basic_id, query_id, index_type='filtered', R=R_e, L=L_e)
-        for basic_id, query_id in zip(basic_ids_e, query_ids_e):
-            run_stitched(dataset, basic_id, query_id, index_type='stitched', R=s_R_e, L=s_L_e, SR=s_SR_e)
+    parser = pipeline_parser("DiskANN filtered / stitched build and search sweep", f"{TEMP_ROOT}/cache")
+    parser.add_argument("--datasets", nargs="+", default=datasets)
+    parser.add_argument("--targets", type=parse_targets, default=None,
+                        help="recall targets, e.g. 0.8,0.9,0.95,0.99: search L adaptively instead of the fixed grid")
+    args = parser.parse_args()
+
+    # Ground truth comes from run_gt (gt files under /data/filter-yjy/diskann/gt)
+    pipeline = Pipeline.from_args(args)
+    for dataset in args.datasets:
+        for basic_id, query_id in zip(basic_ids, query_ids):
+            add_diskann_steps(pipeline, dataset, basic_id, query_id, "filtered", R=R_e, L=L_e, targets=args.targets)
+        for basic_id, query_id in zip(basic_ids, query_ids):
+            add_diskann_steps(pipeline, dataset, basic_id, query_id, "stitched", R=s_R_e, L=s_L_e, SR=s_SR_e,
+                              targets=args.targets)
         for basic_id, query_id in zip(basic_ids_c, query_ids_c):
-            run_filtered(dataset, basic_id, query_id, index_type='filtered', R=R_c, L=L_c)
+            add_diskann_steps(pipeline, dataset, basic_id, query_id, "filtered", R=R_c, L=L_c, targets=args.targets)
         for basic_id, query_id in zip(basic_ids_c, query_ids_c):
-            run_stitched(dataset, basic_id, query_id, index_type='stitched', R=s_R_c, L=s_L_c, SR=s_SR_c)
+            add_diskann_steps(pipeline, dataset, basic_id, query_id, "stitched", R=s_R_c, L=s_L_c, SR=s_SR_c,
+                              targets=args.targets)
+    return 1 if pipeline.run() else 0
 
 if __name__ == "__main__":
-    main()
-    
+    sys.exit(main())
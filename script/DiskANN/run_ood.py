@@ -1,5 +1,9 @@
 import os
 import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.convert import convert_fvecs_to_bin
 
 base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
 
@@ -46,21 +50,20 @@ def run_commands():
         "--label_file", os.path.join(labelfilter_data, "labels/text2image/ung_label_1.txt")
     ], check=True)
 
-    # Stitched single thread
-    for L in L_values_e:
-        subprocess.run([
-            "../../algorithm/DiskANN/build/apps/search_memory_index",
-            "--data_type", "float",
-            "--dist_fn", "l2",
-            "--index_path_prefix", f"{index_path}/_",
-            "--query_file", os.path.join(labelfilter_data, "datasets/text2image/text2image_query.fbin"),
-            "--gt_file", os.path.join(labelfilter_data, "gt/text2image/gt-query_set_1.bin"),
-            "--query_filters_file", os.path.join(labelfilter_data, "query_label/text2image/ung_1.txt"),
-            "-K", f"{K}",
-            "-T", f"{T_s}",
-            "-L", f"{L}",
-            "--result_path", os.path.join(result_path, "1_")
-        ], check=True)
+    # Stitched single thread, all L values
+    subprocess.run([
+        "../../algorithm/DiskANN/build/apps/search_memory_index",
+        "--data_type", "float",
+        "--dist_fn", "l2",
+        "--index_path_prefix", f"{index_path}/_",
+        "--query_file", os.path.join(labelfilter_data, "datasets/text2image/text2image_query.fbin"),
+        "--gt_file", os.path.join(labelfilter_data, "gt/text2image/gt-query_set_1.bin"),
+        "--query_filters_file", os.path.join(labelfilter_data, "query_label/text2image/ung_1.txt"),
+        "-K", f"{K}",
+        "-T", f"{T_s}",
+        "-L", *(str(L) for L in L_values_e),  # 一次运行覆盖所有 L，索引只加载一次
+        "--result_path", os.path.join(result_path, "1_")
+    ], check=True)
 
     # ============ Filtered build index ============
     index_path = os.path.join(filtered_temp, "index")
@@ -81,24 +84,31 @@ def run_commands():
         "--label_file", os.path.join(labelfilter_data, "labels/text2image/ung_label_1.txt")
     ], check=True)
 
-    # Filtered single thread
-    for L in L_values_e:
-        subprocess.run([
-            "../../algorithm/DiskANN/build/apps/search_memory_index",
-            "--data_type", "float",
-            "--dist_fn", "l2",
-            "--index_path_prefix", f"{index_path}/_",
-            "--query_file", os.path.join(labelfilter_data, "datasets/text2image/text2image_query.fbin"),
-            "--gt_file", os.path.join(labelfilter_data, "gt/text2image/gt-query_set_1.bin"),
-            "--query_filters_file", os.path.join(labelfilter_data, "query_label/text2image/ung_1.txt"),
-            "-K", f"{K}",
-            "-T", f"{T_s}",
-            "-L", f"{L}",
-            "--result_path", os.path.join(result_path, "1_")
-        ], check=True)    
+    # Filtered single thread, all L values
+    subprocess.run([
+        "../../algorithm/DiskANN/build/apps/search_memory_index",
+        "--data_type", "float",
+        "--dist_fn", "l2",
+        "--index_path_prefix", f"{index_path}/_",
+        "--query_file", os.path.join(labelfilter_data, "datasets/text2image/text2image_query.fbin"),
+        "--gt_file", os.path.join(labelfilter_data, "gt/text2image/gt-query_set_1.bin"),
+        "--query_filters_file", os.path.join(labelfilter_data, "query_label/text2image/ung_1.txt"),
+        "-K", f"{K}",
+        "-T", f"{T_s}",
+        "-L", *(str(L) for L in L_values_e),  # 一次运行覆盖所有 L，索引只加载一次
+        "--result_path", os.path.join(result_path, "1_")
+    ], check=True)    
        
 
+def convert_vectors():
+    dataset_dir = os.path.join(labelfilter_data, "datasets/text2image")
+    for name in ("base", "query"):
+        fvecs = os.path.join(dataset_dir, f"text2image_{name}.fvecs")
+        if os.path.exists(fvecs):
+            convert_fvecs_to_bin(fvecs, os.path.join(dataset_dir, f"text2image_{name}.fbin"))
+
 def main():
+    convert_vectors()
     run_commands()
 
 if __name__ == "__main__":
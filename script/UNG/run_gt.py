@@ -1,7 +1,12 @@
 import os
 import subprocess
-import numpy as np
-import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.convert import convert_fvecs_to_bin
+from common.groundtruth import compute_groundtruth_files
+from common.labels import load_label_columns, write_label_text
+
 ROOT_DIR = "/data/HybridANNS/data/Experiment/labelfilterData"
 GT_DIR = "/data/HybridANNS/data/Experiment/temp/UNG/gt"
 GT_TOOL = "../../algorithm/UNG/build/tools/compute_groundtruth"
@@ -17,46 +22,10 @@ os.makedirs(GT_DIR, exist_ok=True)
 
 
 
-# === fvecs to bin  ===
-def convert_fvecs_to_bin(fvecs_path, bin_path):
-    vectors = []
-    dim = None
-
-    with open(fvecs_path, 'rb') as f:
-        while True:
-            dim_bytes = f.read(4)
-            if not dim_bytes:
-                break  # EOF
-            d = struct.unpack('i', dim_bytes)[0]
-            if dim is None:
-                dim = d
-            elif dim != d:
-                raise ValueError(f"维度不一致：{dim} != {d}")
-            vec = f.read(4 * d)
-            if len(vec) != 4 * d:
-                raise ValueError("向量长度错误")
-            vectors.append(struct.unpack(f'{d}f', vec))
-
-    vectors_np = np.array(vectors, dtype=np.float32)
-    n = vectors_np.shape[0]
-
-    with open(bin_path, 'wb') as f:
-        f.write(struct.pack('i', n))       
-        f.write(struct.pack('i', dim))     
-        f.write(vectors_np.tobytes())      
-
-    print(f"✅ 转换成功: {fvecs_path} → {bin_path} (n={n}, dim={dim})")
-
 # === label  ===
 def convert_label_file(input_path, output_path):
-    with open(input_path, 'r') as f:
-        lines = f.readlines()[1:]  
-    with open(output_path, 'w') as f:
-        for line in lines:
-            line = line.strip()
-            if line:
-                values = line.split()
-                f.write(','.join(values) + '\n')
+    # the .hlbl cache next to the text file is reused by later runs and by compute_groundtruth_files
+    write_label_text(load_label_columns(input_path, skip_header=True), output_path, sep=",")
 
 # ===  GT ===
 def generate_groundtruth(label_type, base_id, query_id, scenario):
@@ -74,9 +43,9 @@ def generate_groundtruth(label_type, base_id, query_id, scenario):
     gt_file = os.path.join(GT_DIR, f"{label_type}_{query_id}.bin")
 
     #  fvecs
-    if not os.path.exists(base_bin) and os.path.exists(base_fvecs):
+    if os.path.exists(base_fvecs):
         convert_fvecs_to_bin(base_fvecs, base_bin)
-    if not os.path.exists(query_bin) and os.path.exists(query_fvecs):
+    if os.path.exists(query_fvecs):
         convert_fvecs_to_bin(query_fvecs, query_bin)
 
     #  label
@@ -93,6 +62,13 @@ def generate_groundtruth(label_type, base_id, query_id, scenario):
         return
 
     #  compute_groundtruth 
+    if not os.path.exists(GT_TOOL):
+        print(f"ℹ️ {GT_TOOL} not built, using the NumPy ground-truth engine")
+        compute_groundtruth_files(
+            base_bin, query_bin, gt_file, scenario, fmt="ung", num_threads=32,
+            base_label_file=base_label, query_label_file=query_label)
+        return
+
     cmd = [
         GT_TOOL,
         "--data_type", "float",
@@ -1,5 +1,9 @@
 import subprocess
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.convert import convert_fvecs_to_bin
 
 base_dir = "/data/HybridANNS/data/Experiment"
 labelfilter_dir = os.path.join(base_dir, "labelfilterData/datasets/text2image")
@@ -74,7 +78,14 @@ def get_gt():
         "--gt_file", gt_file
     ], check=True)
 
+def convert_vectors():
+    for name, fbin in (("base", base_bin_file), ("query", query_bin_file)):
+        fvecs = os.path.join(labelfilter_dir, f"text2image_{name}.fvecs")
+        if os.path.exists(fvecs):
+            convert_fvecs_to_bin(fvecs, fbin)
+
 def main():
+    convert_vectors()
     get_gt()
     for num_cross_edge in num_cross_edges:
         build_commands(num_cross_edge)
@@ -0,0 +1 @@
+"""Helpers shared by the runner scripts under ``script/``."""
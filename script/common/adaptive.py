@@ -0,0 +1,121 @@
+"""Recall-targeted search for the smallest L / nprobe reaching each target.
+
+Fixed grids spend most runs far above or below the recall band of
+interest. ``RecallSearch`` instead keeps, for every target recall, a bracket
+``(below, reached)`` of evaluated parameters and narrows it until the two
+ends are within ``rel_tol`` (or one grid ``step``) of each other.
+
+* Round one evaluates a few points spread geometrically over ``[lo, hi]``.
+* Each later round proposes one point per open bracket. The point comes
+  from a monotone model: ``log(1 - recall)`` is interpolated linearly in
+  ``log(param)`` between the two ends (regula falsi). It is clamped to the
+  middle half of the bracket, so every round cuts at least a quarter of
+  its width.
+
+Points proposed in the same round are evaluated together. Engines that
+accept several parameters per run (DiskANN ``-L``) get the whole round in
+one invocation. Recall is assumed non-decreasing in the parameter; a
+measured dip only moves the bracket ends, it never breaks the search.
+"""
+
+import math
+
+RECALL_TARGETS = (0.8, 0.9, 0.95, 0.99)
+SEEDS = 4
+REL_TOL = 0.05
+
+
+def parse_targets(text):
+    """``"0.8,0.9"`` -> ``[0.8, 0.9]`` (sorted, each in (0, 1])."""
+    targets = sorted(float(t) for t in str(text).split(",") if t.strip())
+    for t in targets:
+        if not 0 < t <= 1:
+            raise ValueError(f"recall target {t} is outside (0, 1]")
+    return targets
+
+
+class RecallSearch:
+    def __init__(self, lo, hi, targets=RECALL_TARGETS, step=1, rel_tol=REL_TOL, seeds=SEEDS):
+        if lo > hi:
+            raise ValueError(f"empty parameter range [{lo}, {hi}]")
+        self.lo = lo
+        self.hi = hi
+        self.step = step
+        self.targets = sorted(targets)
+        self.rel_tol = rel_tol
+        self.seeds = seeds
+        self.points = {}
+
+    def _snap(self, value):
+        value = self.lo + round((value - self.lo) / self.step) * self.step
+        return min(max(value, self.lo), self.hi)
+
+    def bracket(self, target):
+        """``(below, reached)``: largest param under ``target`` and smallest one reaching it."""
+        reached = min((p for p, r in self.points.items() if r >= target), default=None)
+        below = max((p for p, r in self.points.items()
+                     if r < target and (reached is None or p < reached)), default=None)
+        return below, reached
+
+    def _resolved(self, target):
+        below, reached = self.bracket(target)
+        if reached is None:
+            return self.hi in self.points          # 最大参数也达不到
+        if reached == self.lo:
+            return True
+        if below is None:
+            return False
+        return reached - below <= max(self.step, self.rel_tol * reached)
+
+    def _propose(self, target):
+        below, reached = self.bracket(target)
+        if reached is None:
+            return self.hi
+        if below is None:
+            return self.lo
+        r_lo, r_hi = self.points[below], self.points[reached]
+        guess = None
+        if below > 0 and r_lo < r_hi < 1 and target < 1:
+            # 在 (log p, log(1 - recall)) 上线性插值
+            x0, x1 = math.log(below), math.log(reached)
+            y0, y1 = math.log(1 - r_lo), math.log(1 - r_hi)
+            guess = math.exp(x0 + (math.log(1 - target) - y0) * (x1 - x0) / (y1 - y0))
+        width = reached - below
+        lo_guard, hi_guard = below + width / 4, reached - width / 4
+        if guess is None or not lo_guard <= guess <= hi_guard:
+            guess = min(max(guess if guess is not None else (below + reached) / 2, lo_guard), hi_guard)
+        value = self._snap(guess)
+        if value <= below:
+            value = below + self.step
+        if value >= reached:
+            value = reached - self.step
+        return value
+
+    def next_batch(self):
+        """Parameters to evaluate next (sorted); empty once every target is resolved."""
+        if not self.points:
+            if self.seeds <= 1 or self.hi == self.lo:
+                return [self.hi]
+            ratio = (max(self.hi, 1) / max(self.lo, 1)) ** (1 / (self.seeds - 1))
+            return sorted({self._snap(max(self.lo, 1) * ratio ** i) for i in range(self.seeds)} | {self.hi})
+        batch = {self._propose(t) for t in self.targets if not self._resolved(t)}
+        return sorted(p for p in batch if p not in self.points)
+
+    def record(self, param, recall):
+        self.points[param] = recall
+
+    def answers(self):
+        """``{target: smallest param reaching it}``, ``None`` for unreachable targets."""
+        return {t: self.bracket(t)[1] for t in self.targets}
+
+    def run(self, evaluate):
+        """Drive the search with ``evaluate(params) -> {param: recall}``; return the answers."""
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                return self.answers()
+            results = evaluate(batch)
+            for param in batch:
+                if param not in results:
+                    raise ValueError(f"no recall reported for parameter {param}")
+                self.record(param, results[param])
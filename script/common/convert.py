@@ -0,0 +1,127 @@
+"""Streaming ``.fvecs`` -> ``.bin`` conversion with a sidecar manifest.
+
+The source is read in fixed-size row chunks, so memory stays bounded by one
+chunk regardless of dataset size. Output is written to a temp file in the
+target directory and renamed into place, so an interrupted run never leaves a
+truncated ``.bin`` behind.
+
+Next to every output a ``<bin>.manifest.json`` records the source size, mtime
+and sha256. A later call skips the conversion when the source still matches:
+size + mtime are compared first (free), and only if those moved is the hash
+recomputed, so a copied-but-identical dataset does not trigger a rewrite.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+MANIFEST_SUFFIX = ".manifest.json"
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+
+def manifest_path(bin_path):
+    return str(bin_path) + MANIFEST_SUFFIX
+
+
+def file_sha256(path, block_size=1 << 24):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def atomic_write_json(path, payload):
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _load_manifest(bin_path):
+    try:
+        with open(manifest_path(bin_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(src_path, bin_path):
+    """Return True if ``bin_path`` was produced from the current ``src_path``."""
+    manifest = _load_manifest(bin_path)
+    if manifest is None or not os.path.exists(bin_path):
+        return False
+    if manifest.get("output_size") != os.path.getsize(bin_path):
+        return False
+
+    st = os.stat(src_path)
+    if manifest.get("source_size") != st.st_size:
+        return False
+    if manifest.get("source_mtime_ns") == st.st_mtime_ns:
+        return True
+
+    # Touched but possibly identical: fall back to the content hash.
+    if manifest.get("source_sha256") != file_sha256(src_path):
+        return False
+    manifest["source_mtime_ns"] = st.st_mtime_ns
+    atomic_write_json(manifest_path(bin_path), manifest)
+    return True
+
+
+def convert_fvecs_to_bin(fvecs_path, bin_path, chunk_rows=DEFAULT_CHUNK_ROWS, force=False):
+    """Convert ``fvecs_path`` to a DiskANN/UNG ``.bin`` file.
+
+    Returns True if a conversion was performed, False if the cached output was
+    reused.
+    """
+    fvecs_path, bin_path = str(fvecs_path), str(bin_path)
+    if not force and is_up_to_date(fvecs_path, bin_path):
+        print(f"ℹ️ Up to date: {bin_path}")
+        return False
+
+    st = os.stat(fvecs_path)
+    dim = int(np.fromfile(fvecs_path, dtype=np.int32, count=1)[0]) if st.st_size else 0
+    row_bytes = 4 * (dim + 1)
+    if dim <= 0 or st.st_size % row_bytes != 0:
+        raise ValueError(f"{fvecs_path}: file size does not match dim={dim}")
+    n = st.st_size // row_bytes
+
+    h = hashlib.sha256()
+    buf = np.empty((chunk_rows, dim + 1), dtype=np.float32)
+    tmp_path = f"{bin_path}.tmp.{os.getpid()}"
+    try:
+        with open(fvecs_path, "rb") as fin, open(tmp_path, "wb") as fout:
+            np.array([n, dim], dtype=np.int32).tofile(fout)
+            done = 0
+            while done < n:
+                rows = min(chunk_rows, n - done)
+                chunk = buf[:rows]
+                view = memoryview(chunk).cast("B")
+                if fin.readinto(view) != len(view):
+                    raise ValueError(f"{fvecs_path}: truncated at row {done}")
+                h.update(view)
+                if not np.all(chunk[:, 0].view(np.int32) == dim):
+                    raise ValueError(f"{fvecs_path}: inconsistent dimension near row {done}")
+                chunk[:, 1:].tofile(fout)
+                done += rows
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp_path, bin_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    atomic_write_json(manifest_path(bin_path), {
+        "source": os.path.abspath(fvecs_path),
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "source_sha256": h.hexdigest(),
+        "output_size": os.path.getsize(bin_path),
+        "n": n,
+        "dim": dim,
+    })
+    print(f"✅ Converted: {fvecs_path} → {bin_path} (n={n}, dim={dim})")
+    return True
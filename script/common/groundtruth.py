@@ -0,0 +1,374 @@
+"""Exact filtered top-K ground truth in NumPy.
+
+Replaces the external ground-truth binaries (DiskANN's
+``compute_groundtruth_for_filters``, UNG's ``tools/compute_groundtruth``)
+for the three query types used in the experiments:
+
+* ``equality``:    base label set == query label set
+* ``containment``: query label set is a subset of the base label set
+* ``range``:       base attribute value in ``[lo, hi]`` (or, without an
+  attribute file, base row id in ``[lo, hi]`` as in the Faiss range harness)
+
+Filters are answered from a precomputed index (label -> sorted row ids, or a
+value-sorted permutation for ranges), so only matching rows are ever read.
+Queries are grouped by filter key (the query label files repeat the same few
+values thousands of times), each group's matching rows are gathered once, and
+the whole group is solved with block-wise GEMMs while the running top-K is
+maintained with ``argpartition``. Query chunks are spread over a thread pool;
+BLAS releases the GIL so the chunks run concurrently.
+
+Usage (from ``script/``)::
+
+    python -m common.groundtruth --mode equality \\
+        --base_file .../sift_base.fvecs --base_label_file .../label_1.txt \\
+        --query_file .../sift_query.fvecs --query_label_file .../1.txt \\
+        --gt_file .../gt-query_set_1.ivecs --format ivecs
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .dataset import load_vectors
+from .labels import columns_to_rows, load_label_columns, missing_value
+
+MODES = ("equality", "containment", "range")
+FORMATS = ("ivecs", "diskann", "ung", "npy")
+
+
+# === label / range inputs ===
+def read_ranges(path):
+    """Read query ranges as an ``(nq, 2)`` array from ``.npy`` or text."""
+    if str(path).endswith(".npy"):
+        return np.asarray(np.load(path))
+    return np.loadtxt(path, dtype=np.int64, ndmin=2)[:, :2]
+
+
+class LabelIndex:
+    """Inverted index from label value to the sorted row ids carrying it.
+
+    Built from parallel ``(label, row_id)`` arrays; duplicates are dropped so
+    ``row_label_count`` is the size of each row's label *set*.
+    """
+
+    def __init__(self, n, labels, row_ids):
+        self.n = n
+        labels = np.asarray(labels, dtype=np.int64)
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+
+        order = np.lexsort((row_ids, labels))
+        labels, row_ids = labels[order], row_ids[order]
+        keep = np.ones(len(labels), dtype=bool)
+        keep[1:] = (labels[1:] != labels[:-1]) | (row_ids[1:] != row_ids[:-1])
+        labels, row_ids = labels[keep], row_ids[keep]
+
+        values, starts = np.unique(labels, return_index=True)
+        self.postings = dict(zip(values.tolist(), np.split(row_ids, starts[1:])))
+        self.row_label_count = np.bincount(row_ids, minlength=n)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from a list of label tuples (one per row)."""
+        counts = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        labels = np.fromiter((l for r in rows for l in r), dtype=np.int64, count=int(counts.sum()))
+        row_ids = np.repeat(np.arange(len(rows), dtype=np.int64), counts)
+        return cls(len(rows), labels, row_ids)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build from a ``(ncols, n)`` table as returned by :func:`load_label_columns`."""
+        columns = np.asarray(columns)
+        ncols, n = columns.shape
+        present = columns != missing_value(columns)
+        row_ids = np.broadcast_to(np.arange(n, dtype=np.int64), (ncols, n))
+        return cls(n, columns[present], row_ids[present])
+
+    def posting(self, label):
+        return self.postings.get(label, np.empty(0, dtype=np.int64))
+
+    def containment(self, labels):
+        labels = sorted(set(labels))
+        if not labels:
+            return slice(0, self.n)
+        lists = sorted((self.posting(l) for l in labels), key=len)
+        ids = lists[0]
+        for other in lists[1:]:
+            if len(ids) == 0:
+                break
+            ids = np.intersect1d(ids, other, assume_unique=True)
+        return ids
+
+    def equality(self, labels):
+        wanted = len(set(labels))
+        ids = self.containment(labels)
+        if isinstance(ids, slice):
+            ids = np.arange(self.n, dtype=np.int64)
+        return ids[self.row_label_count[ids] == wanted]
+
+
+class RangeIndex:
+    """Maps a closed value range to matching row ids via a sorted permutation.
+
+    With ``values=None`` rows are assumed to be ordered by the attribute (the
+    id-range convention of ``scr_range``), and a range is a contiguous slice.
+    """
+
+    def __init__(self, n, values=None):
+        self.n = n
+        if values is None:
+            self.order = None
+            self.sorted_values = None
+        else:
+            values = np.asarray(values).reshape(-1)
+            self.order = np.argsort(values, kind="stable")
+            self.sorted_values = values[self.order]
+
+    def range(self, lo, hi):
+        if self.order is None:
+            return slice(max(int(lo), 0), min(int(hi) + 1, self.n))
+        start = np.searchsorted(self.sorted_values, lo, side="left")
+        stop = np.searchsorted(self.sorted_values, hi, side="right")
+        return np.sort(self.order[start:stop])
+
+
+# === distance engine ===
+class GroundTruthEngine:
+    def __init__(self, base, metric="l2", block_rows=1 << 16, num_threads=None):
+        if metric not in ("l2", "ip"):
+            raise ValueError(f"Unsupported metric: {metric}")
+        self.base = base
+        self.metric = metric
+        self.block_rows = block_rows
+        self.num_threads = num_threads or os.cpu_count()
+        self._norms = None
+
+    def norms(self):
+        """Squared L2 norms of all base rows, computed once block by block."""
+        if self._norms is None:
+            norms = np.empty(len(self.base), dtype=np.float32)
+            for start in range(0, len(self.base), self.block_rows):
+                blk = np.asarray(self.base[start:start + self.block_rows], dtype=np.float32)
+                norms[start:start + len(blk)] = np.einsum("ij,ij->i", blk, blk)
+            self._norms = norms
+        return self._norms
+
+    def gather(self, ids):
+        """Copy the rows ``ids`` into one contiguous float32 block."""
+        return np.ascontiguousarray(self.base[ids], dtype=np.float32)
+
+    def _blocks(self, ids, rows):
+        count = ids.stop - ids.start if isinstance(ids, slice) else len(ids)
+        for start in range(0, max(count, 0), self.block_rows):
+            stop = min(start + self.block_rows, count)
+            if isinstance(ids, slice):
+                sub = np.arange(ids.start + start, ids.start + stop, dtype=np.int64)
+                x = rows[start:stop] if rows is not None else self.base[ids.start + start:ids.start + stop]
+            else:
+                sub = ids[start:stop]
+                x = rows[start:stop] if rows is not None else self.base[sub]
+            yield sub, np.asarray(x, dtype=np.float32)
+
+    def search(self, queries, ids, k, rows=None):
+        """Exact top-``k`` of ``queries`` (``(nq, d)``) over the rows ``ids``.
+
+        ``ids`` is a sorted id array or a ``slice``; ``rows`` optionally holds
+        those rows already gathered (see :meth:`gather`). Returns ``(I, D)``;
+        slots without a match hold id ``-1`` and distance ``inf``.
+        """
+        nq = len(queries)
+        best_d = np.full((nq, k), np.inf, dtype=np.float32)
+        best_i = np.full((nq, k), -1, dtype=np.int64)
+        norms = self.norms() if self.metric == "l2" else None
+
+        for sub, x in self._blocks(ids, rows):
+            dots = queries @ x.T
+            if self.metric == "l2":
+                dist = norms[sub][None, :] - 2.0 * dots
+            else:
+                dist = -dots
+
+            cand_d = np.concatenate([best_d, dist], axis=1)
+            cand_i = np.concatenate([best_i, np.broadcast_to(sub, dist.shape)], axis=1)
+            top = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            best_d = np.take_along_axis(cand_d, top, axis=1)
+            best_i = np.take_along_axis(cand_i, top, axis=1)
+
+        order = np.argsort(best_d, axis=1, kind="stable")
+        best_d = np.take_along_axis(best_d, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        if self.metric == "l2":
+            qn = np.einsum("ij,ij->i", queries, queries)[:, None]
+            best_d = np.maximum(best_d + qn, 0.0)
+        else:
+            best_d = -best_d
+        best_i[~np.isfinite(best_d)] = -1
+        return best_i, best_d
+
+    def run(self, queries, keys, candidates, k, query_block=256, gather_limit=1 << 30):
+        """Solve all queries, grouped by filter key.
+
+        ``keys[qi]`` is the hashable filter key of query ``qi`` and
+        ``candidates(key)`` returns its id set. Each distinct key is resolved
+        once and its matching rows are gathered once into a contiguous block
+        (when that block fits in ``gather_limit`` bytes); the group's queries
+        are then solved in chunks of ``query_block`` with one GEMM per chunk
+        and candidate block. Gathered blocks stay alive only until the chunks
+        using them finish, so in-flight memory stays near ``gather_limit``.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        nq = len(queries)
+        I = np.full((nq, k), -1, dtype=np.int64)
+        D = np.full((nq, k), np.inf, dtype=np.float32)
+        if self.metric == "l2":
+            self.norms()
+
+        groups = {}
+        for qi, key in enumerate(keys):
+            groups.setdefault(key, []).append(qi)
+
+        def solve(qidx, ids, rows):
+            I[qidx], D[qidx] = self.search(queries[qidx], ids, k, rows)
+
+        row_bytes = 4 * queries.shape[1]
+        in_flight = []  # (bytes, futures) per gathered group, oldest first
+        in_flight_bytes = 0
+        with ThreadPoolExecutor(max_workers=self.num_threads) as pool:
+            # Largest groups first so the tail of the pool is made of small tasks.
+            for key, members in sorted(groups.items(), key=lambda g: -len(g[1])):
+                ids = candidates(key)
+                count = ids.stop - ids.start if isinstance(ids, slice) else len(ids)
+                rows = None
+                if len(members) > 1 and not isinstance(ids, slice) and count * row_bytes <= gather_limit:
+                    while in_flight and in_flight_bytes + count * row_bytes > gather_limit:
+                        done_bytes, futures = in_flight.pop(0)
+                        for f in futures:
+                            f.result()
+                        in_flight_bytes -= done_bytes
+                    rows = self.gather(ids)
+
+                members = np.asarray(members, dtype=np.int64)
+                futures = [pool.submit(solve, members[s:s + query_block], ids, rows)
+                           for s in range(0, len(members), query_block)]
+                if rows is not None:
+                    in_flight.append((rows.nbytes, futures))
+                    in_flight_bytes += rows.nbytes
+                else:
+                    in_flight.append((0, futures))
+            for _, futures in in_flight:
+                for f in futures:
+                    f.result()
+        return I, D
+
+
+# === output formats ===
+def write_groundtruth(path, I, D, fmt):
+    """Write ``(I, D)`` as ``ivecs``, DiskANN ``.bin``, UNG ``.bin`` or ``.npy``.
+
+    * ivecs:   per query ``int32 K`` then ``K`` int32 ids
+    * diskann: ``int32 nq, int32 K``, ``nq*K`` uint32 ids, ``nq*K`` float32 dists
+    * ung:     ``nq*K`` raw ``(uint32 id, float32 dist)`` pairs, no header
+    * npy:     ``(nq, K)`` int64 id array
+    """
+    nq, k = I.shape
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        if fmt == "ivecs":
+            out = np.empty((nq, k + 1), dtype=np.int32)
+            out[:, 0] = k
+            out[:, 1:] = I
+            out.tofile(f)
+        elif fmt == "diskann":
+            np.array([nq, k], dtype=np.int32).tofile(f)
+            I.astype(np.uint32).tofile(f)
+            np.where(np.isfinite(D), D, np.finfo(np.float32).max).astype(np.float32).tofile(f)
+        elif fmt == "ung":
+            pairs = np.empty((nq, k), dtype=[("id", "<u4"), ("dist", "<f4")])
+            pairs["id"] = I.astype(np.uint32)
+            pairs["dist"] = np.where(np.isfinite(D), D, np.finfo(np.float32).max)
+            pairs.tofile(f)
+        elif fmt == "npy":
+            np.save(f, I)
+        else:
+            raise ValueError(f"Unsupported ground-truth format: {fmt}")
+    os.replace(tmp, path)
+
+
+# === driver ===
+def compute_groundtruth(base, queries, mode, k=10, metric="l2", base_labels=None,
+                        query_labels=None, base_values=None, query_ranges=None,
+                        num_threads=None):
+    """Compute filtered ground truth; returns ``(I, D)`` of shape ``(nq, k)``.
+
+    ``base_labels`` is either a list of label tuples or a ``(ncols, n)``
+    column table from :mod:`common.labels`.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode: {mode}")
+    engine = GroundTruthEngine(base, metric=metric, num_threads=num_threads)
+
+    if mode == "range":
+        index = RangeIndex(len(base), base_values)
+        keys = [(lo, hi) for lo, hi in np.asarray(query_ranges)[:, :2].tolist()]
+        candidates = lambda key: index.range(*key)
+    else:
+        if isinstance(base_labels, np.ndarray):
+            index = LabelIndex.from_columns(base_labels)
+        else:
+            index = LabelIndex.from_rows(base_labels)
+        keys = [tuple(sorted(set(labels))) for labels in query_labels]
+        candidates = index.equality if mode == "equality" else index.containment
+
+    return engine.run(queries, keys, candidates, k)
+
+
+def compute_groundtruth_files(base_file, query_file, gt_file, mode, fmt="ivecs", k=10,
+                              metric="l2", num_threads=None, base_label_file=None,
+                              query_label_file=None, base_value_file=None,
+                              query_range_file=None):
+    """File-level wrapper used by the CLI and the runner scripts."""
+    base = load_vectors(base_file)
+    queries = load_vectors(query_file)
+    kwargs = {}
+    if mode == "range":
+        kwargs["query_ranges"] = read_ranges(query_range_file)
+        if base_value_file:
+            kwargs["base_values"] = load_vectors(base_value_file)
+        queries = queries[:len(kwargs["query_ranges"])]
+    else:
+        # The labels/ and query_label/ files start with an "n m" header line.
+        kwargs["base_labels"] = load_label_columns(base_label_file, skip_header=True)
+        kwargs["query_labels"] = columns_to_rows(load_label_columns(query_label_file, skip_header=True))
+        queries = queries[:len(kwargs["query_labels"])]
+
+    I, D = compute_groundtruth(base, queries, mode, k=k, metric=metric,
+                               num_threads=num_threads, **kwargs)
+    write_groundtruth(gt_file, I, D, fmt)
+    print(f"✅ Ground truth written: {gt_file} (nq={len(I)}, K={k})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact filtered ground truth (NumPy)")
+    parser.add_argument("--mode", choices=MODES, required=True)
+    parser.add_argument("--base_file", required=True)
+    parser.add_argument("--query_file", required=True)
+    parser.add_argument("--base_label_file", help="label file (equality/containment)")
+    parser.add_argument("--query_label_file", help="query label file (equality/containment)")
+    parser.add_argument("--base_value_file", help="per-row attribute values (range); omit for id ranges")
+    parser.add_argument("--query_range_file", help="query ranges, .npy or text (range)")
+    parser.add_argument("--gt_file", required=True)
+    parser.add_argument("--format", choices=FORMATS, default="ivecs")
+    parser.add_argument("--metric", choices=("l2", "ip"), default="l2")
+    parser.add_argument("--K", type=int, default=10)
+    parser.add_argument("--num_threads", type=int, default=None)
+    args = parser.parse_args()
+
+    compute_groundtruth_files(
+        args.base_file, args.query_file, args.gt_file, args.mode, fmt=args.format,
+        k=args.K, metric=args.metric, num_threads=args.num_threads,
+        base_label_file=args.base_label_file, query_label_file=args.query_label_file,
+        base_value_file=args.base_value_file, query_range_file=args.query_range_file)
+
+if __name__ == "__main__":
+    main()
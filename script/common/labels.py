@@ -0,0 +1,229 @@
+"""Columnar binary label store (``.hlbl``) shared with the Faiss harness.
+
+The whitespace label files (``labels_with_selectivity.txt``, ``label_*.txt``,
+query label files) are parsed line by line by every consumer. ``.hlbl`` keeps
+the same table as one fixed-width column per attribute so it can be mapped
+instead of parsed::
+
+    offset 0   char[4]  magic  "HLBL"
+           4   uint32   version (2)
+           8   uint64   n       rows
+          16   uint32   ncols   attributes per row
+          20   uint32   width   bytes per value (2 -> uint16, 4 -> uint32)
+          24   uint32   skip    1 if the text file's first line was dropped
+          28   uint32   zero
+          32   uint64   size    text file size in bytes
+          40   int64    mtime   text file mtime in nanoseconds
+          48   ...      zero padding up to HEADER_SIZE
+    HEADER_SIZE         column 0 (n values), column 1, ...
+
+``skip``/``size``/``mtime`` describe the text file the table was built
+from. A ``.hlbl`` is only reused for that exact file read with the same
+header rule; otherwise it is rebuilt (Python) or ignored (C++, which
+applies ``shouldSkipFirstLine`` and falls back to parsing the text).
+
+Rows shorter than ``ncols`` (ragged label sets) are padded with the column
+type's maximum value, exposed as :func:`missing_value`. The C++ reader lives
+in ``algorithm/Faiss/src/FileReader.h`` (``LabelColumns``).
+
+Usage (from ``script/``)::
+
+    python -m common.labels .../labels/sift/labels_with_selectivity.txt
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+MAGIC = b"HLBL"
+VERSION = 2
+HEADER_SIZE = 64
+SUFFIX = ".hlbl"
+
+
+def columnar_path(txt_path):
+    """``labels/sift/label_1.txt`` -> ``labels/sift/label_1.hlbl``."""
+    return os.path.splitext(str(txt_path))[0] + SUFFIX
+
+
+def missing_value(columns):
+    return np.iinfo(columns.dtype).max
+
+
+def has_count_header(first_line):
+    """Same rule as ``FileReader::shouldSkipFirstLine``: exactly two integers."""
+    tokens = first_line.split()
+    if len(tokens) != 2:
+        return False
+    try:
+        int(tokens[0]), int(tokens[1])
+    except ValueError:
+        return False
+    return True
+
+
+def resolve_skip_header(path, skip_header=None):
+    """``skip_header`` as it will be applied to ``path`` (``None`` -> two-integer rule)."""
+    if skip_header is not None:
+        return bool(skip_header)
+    with open(path) as f:
+        return has_count_header(f.readline())
+
+
+def source_stamp(txt_path, skip_header=None):
+    """``(skip, size, mtime_ns)`` recorded in the header of a ``.hlbl`` built from ``txt_path``."""
+    st = os.stat(txt_path)
+    return resolve_skip_header(txt_path, skip_header), st.st_size, st.st_mtime_ns
+
+
+def read_label_text(path, skip_header=None):
+    """Parse a whitespace/comma label file into a list of int tuples.
+
+    ``skip_header=None`` applies the harness's two-integer header rule.
+    Blank lines are skipped, so the row count matches the vector count.
+    """
+    rows = []
+    with open(path) as f:
+        first = f.readline()
+        if not first:
+            return rows
+        if skip_header is None:
+            skip_header = has_count_header(first)
+        if not skip_header and first.strip():
+            rows.append(tuple(int(t) for t in first.replace(",", " ").split()))
+        for line in f:
+            tokens = line.replace(",", " ").split()
+            if tokens:
+                rows.append(tuple(int(t) for t in tokens))
+    return rows
+
+
+def rows_to_columns(rows):
+    """Pack ragged rows into a ``(ncols, n)`` uint16/uint32 array."""
+    n = len(rows)
+    ncols = max((len(r) for r in rows), default=0)
+    top = max((max(r) for r in rows if r), default=0)
+    dtype = np.uint16 if top < np.iinfo(np.uint16).max else np.uint32
+    if top >= np.iinfo(np.uint32).max:
+        raise ValueError(f"label value {top} does not fit in uint32")
+
+    columns = np.full((ncols, n), np.iinfo(dtype).max, dtype=dtype)
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=n)
+    for c in range(ncols):
+        has = np.flatnonzero(lengths > c)
+        columns[c, has] = [rows[i][c] for i in has.tolist()]
+    return columns
+
+
+def write_columnar(path, columns, source=None):
+    """Write ``columns``; ``source`` is the :func:`source_stamp` of the text file, if any."""
+    columns = np.asarray(columns)
+    ncols, n = columns.shape
+    header = np.zeros(HEADER_SIZE, dtype=np.uint8)
+    header[:4] = np.frombuffer(MAGIC, dtype=np.uint8)
+    header[4:8] = np.frombuffer(np.uint32(VERSION).tobytes(), dtype=np.uint8)
+    header[8:16] = np.frombuffer(np.uint64(n).tobytes(), dtype=np.uint8)
+    header[16:20] = np.frombuffer(np.uint32(ncols).tobytes(), dtype=np.uint8)
+    header[20:24] = np.frombuffer(np.uint32(columns.dtype.itemsize).tobytes(), dtype=np.uint8)
+    if source is not None:
+        skip, size, mtime_ns = source
+        header[24:28] = np.frombuffer(np.uint32(skip).tobytes(), dtype=np.uint8)
+        header[32:40] = np.frombuffer(np.uint64(size).tobytes(), dtype=np.uint8)
+        header[40:48] = np.frombuffer(np.int64(mtime_ns).tobytes(), dtype=np.uint8)
+
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "wb") as f:
+        header.tofile(f)
+        np.ascontiguousarray(columns).tofile(f)
+    os.replace(tmp, path)
+
+
+def read_source_stamp(path):
+    """The ``(skip, size, mtime_ns)`` stored in a ``.hlbl``; ``None`` if unreadable or another version."""
+    try:
+        header = np.fromfile(path, dtype=np.uint8, count=HEADER_SIZE)
+    except OSError:
+        return None
+    if len(header) < HEADER_SIZE or header[:4].tobytes() != MAGIC:
+        return None
+    if int(header[4:8].view(np.uint32)[0]) != VERSION:
+        return None
+    return (bool(header[24:28].view(np.uint32)[0]), int(header[32:40].view(np.uint64)[0]),
+            int(header[40:48].view(np.int64)[0]))
+
+
+def read_columnar(path):
+    """Map a ``.hlbl`` file as a read-only ``(ncols, n)`` array."""
+    header = np.fromfile(path, dtype=np.uint8, count=HEADER_SIZE)
+    if header[:4].tobytes() != MAGIC:
+        raise ValueError(f"{path}: not a columnar label file")
+    version = int(header[4:8].view(np.uint32)[0])
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported version {version}")
+    n = int(header[8:16].view(np.uint64)[0])
+    ncols = int(header[16:20].view(np.uint32)[0])
+    width = int(header[20:24].view(np.uint32)[0])
+    dtype = {2: np.uint16, 4: np.uint32}[width]
+    if ncols == 0 or n == 0:
+        return np.empty((ncols, n), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(ncols, n))
+
+
+def convert_label_text(txt_path, out_path=None, skip_header=None):
+    """Convert a text label file to ``.hlbl``; returns the output path."""
+    out_path = out_path or columnar_path(txt_path)
+    source = source_stamp(txt_path, skip_header)
+    write_columnar(out_path, rows_to_columns(read_label_text(txt_path, source[0])), source)
+    return out_path
+
+
+def load_label_columns(txt_path, skip_header=None):
+    """Return the ``(ncols, n)`` label table for a text label file.
+
+    The ``.hlbl`` next to it is used when it was built from this exact text
+    file (size and mtime) with the same header rule, and (re)built otherwise.
+    """
+    hlbl = columnar_path(txt_path)
+    if read_source_stamp(hlbl) != source_stamp(txt_path, skip_header):
+        convert_label_text(txt_path, hlbl, skip_header)
+    return read_columnar(hlbl)
+
+
+def columns_to_rows(columns):
+    """Unpack a ``(ncols, n)`` table into a list of label tuples."""
+    table = np.asarray(columns).T
+    missing = missing_value(columns)
+    if not (table == missing).any():
+        return [tuple(r) for r in table.tolist()]
+    return [tuple(v for v in r if v != missing) for r in table.tolist()]
+
+
+def write_label_text(columns, out_path, sep=","):
+    """Write one row per line, values joined by ``sep`` (DiskANN/UNG format)."""
+    table = np.asarray(columns).T
+    missing = missing_value(columns)
+    with open(out_path, "w") as f:
+        if not (table == missing).any():
+            np.savetxt(f, table, fmt="%d", delimiter=sep)
+        else:
+            for row in columns_to_rows(columns):
+                f.write(sep.join(map(str, row)) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert text label files to .hlbl")
+    parser.add_argument("label_files", nargs="+")
+    parser.add_argument("--skip_header", choices=("auto", "yes", "no"), default="auto",
+                        help="drop the first line (auto: only if it is an 'n m' count line)")
+    args = parser.parse_args()
+
+    skip_header = {"auto": None, "yes": True, "no": False}[args.skip_header]
+    for path in args.label_files:
+        out = convert_label_text(path, skip_header=skip_header)
+        n = read_columnar(out).shape[1]
+        print(f"✅ Converted: {path} → {out} (n={n})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Background memory sampling for child processes started by the runners.
+
+``run_sampled`` is a drop-in for ``subprocess.run`` that polls the child's
+``/proc/<pid>/status`` and ``/proc/<pid>/stat`` on a background thread while
+it runs, and collects the exact totals from ``os.wait4`` when it exits::
+
+    from common.memsampler import run_sampled
+
+    result, memory = run_sampled(cmd, check=True, trace_path="build.mem.csv")
+    print(memory.columns())
+
+It replaces the ad-hoc ``psutil`` polling (``update_peak_memory``) in the
+notebooks, which only saw the Python process and its last sample. The C++
+harness has the same sampler in ``algorithm/Faiss/src/MemorySampler.h`` and
+writes the same time-series columns.
+
+Only the direct child is sampled. Wrap the real binary, not a ``bash -c``,
+when the numbers matter.
+"""
+
+import csv
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+
+SERIES_FIELDS = ("time_ms", "rss_mb", "hwm_mb", "minor_faults", "major_faults",
+                 "voluntary_ctx", "involuntary_ctx")
+SUMMARY_FIELDS = ("peak_rss_mb", "vm_hwm_mb", "minor_faults", "major_faults",
+                  "vol_ctx_switches", "invol_ctx_switches", "avg_rss_mb", "wall_s")
+
+
+@dataclass
+class MemorySummary:
+    peak_rss_mb: float = 0.0
+    vm_hwm_mb: float = 0.0
+    minor_faults: int = 0
+    major_faults: int = 0
+    vol_ctx_switches: int = 0
+    invol_ctx_switches: int = 0
+    avg_rss_mb: float = 0.0
+    wall_s: float = 0.0
+    samples: list = field(default_factory=list, repr=False)
+
+    def columns(self):
+        """Summary values in ``SUMMARY_FIELDS`` order, for CSV rows."""
+        return [getattr(self, name) for name in SUMMARY_FIELDS]
+
+    def save_series(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SERIES_FIELDS)
+            writer.writerows(self.samples)
+
+
+def read_proc_sample(pid, start):
+    """One ``SERIES_FIELDS`` row for ``pid``, or ``None`` once it has exited."""
+    rss_kb = hwm_kb = 0
+    vol = invol = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    rss_kb = int(value.split()[0])
+                elif key == "VmHWM":
+                    hwm_kb = int(value.split()[0])
+                elif key == "voluntary_ctxt_switches":
+                    vol = int(value)
+                elif key == "nonvoluntary_ctxt_switches":
+                    invol = int(value)
+        with open(f"/proc/{pid}/stat") as f:
+            # comm may contain spaces; fields after ")" start at field 3 (state)
+            stat = f.read().rpartition(")")[2].split()
+    except (FileNotFoundError, ProcessLookupError, IndexError):
+        return None
+    minflt, majflt = int(stat[7]), int(stat[9])
+    return ((time.monotonic() - start) * 1000.0, rss_kb / 1024.0, hwm_kb / 1024.0,
+            minflt, majflt, vol, invol)
+
+
+class ProcessSampler:
+    """Poll a running process every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, pid, interval=0.01):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _loop(self):
+        while True:
+            sample = read_proc_sample(self.pid, self._start)
+            if sample is None:
+                return
+            self.samples.append(sample)
+            if self._stop.wait(self.interval):
+                return
+
+
+def run_sampled(args, *, interval=0.01, trace_path=None, check=False, **popen_kwargs):
+    """Run ``args`` like ``subprocess.run`` and sample its memory meanwhile.
+
+    Returns ``(CompletedProcess, MemorySummary)``. Fault and context-switch
+    totals and the kernel peak RSS come from ``os.wait4`` and so include the
+    child's threads. The sampled RSS series gives ``avg_rss_mb``, and with
+    ``trace_path`` it is written as CSV.
+    """
+    start = time.monotonic()
+    with subprocess.Popen(args, **popen_kwargs) as proc:
+        sampler = ProcessSampler(proc.pid, interval).start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            samples = sampler.stop()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    summary = summarize(samples, usage, time.monotonic() - start)
+    if trace_path:
+        summary.save_series(trace_path)
+
+    result = subprocess.CompletedProcess(args, proc.returncode)
+    if check:
+        result.check_returncode()
+    return result, summary
+
+
+def summarize(samples, usage, wall_s):
+    rss = [s[1] for s in samples]
+    # ru_maxrss is in KiB on Linux
+    max_rss_mb = usage.ru_maxrss / 1024.0
+    return MemorySummary(
+        peak_rss_mb=max(rss, default=0.0),
+        vm_hwm_mb=max(max_rss_mb, max((s[2] for s in samples), default=0.0)),
+        minor_faults=usage.ru_minflt,
+        major_faults=usage.ru_majflt,
+        vol_ctx_switches=usage.ru_nvcsw,
+        invol_ctx_switches=usage.ru_nivcsw,
+        avg_rss_mb=sum(rss) / len(rss) if rss else 0.0,
+        wall_s=wall_s,
+        samples=samples,
+    )
+
+
+def append_summary(csv_path, label, summary):
+    """Append ``label`` + summary columns to ``csv_path``, writing a header first."""
+    new = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(("run",) + SUMMARY_FIELDS)
+        writer.writerow([label] + summary.columns())
+
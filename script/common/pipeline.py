@@ -0,0 +1,273 @@
+"""Declarative experiment DAG with cached, hash-keyed steps.
+
+A runner declares its convert -> ground truth -> build -> search steps up
+front and then calls ``Pipeline.run()``::
+
+    pipeline = Pipeline(cache_dir)
+    gt = pipeline.add("gt/sift/1", func=make_gt, args=(...), outputs=[gt_file])
+    build = pipeline.add("build/sift/1", cmd=[BUILD, "--index", "{out}/index", ...],
+                         binary=BUILD, inputs=[base_file], deps=[gt])
+    pipeline.add("search/sift/1", cmd=[SEARCH, "--index", f"{build.out}/index", ...],
+                 binary=SEARCH, deps=[build], outputs=[result_dir])
+    pipeline.run()
+
+Each step's key is a sha256 over its name, command/arguments, parameters,
+the binary (or Python module) it runs, the size and mtime of its external
+inputs, and the keys of its dependencies. So changing a parameter, a
+binary or an upstream step invalidates everything downstream, and nothing
+else.
+
+``stdout`` captures a command's output to a file (``{out}`` allowed), for
+tools that only print their results.
+
+A step without ``outputs`` writes to a content-addressed directory
+``<cache_dir>/<name>/<key[:16]>``, referenced as ``{out}`` in its command.
+Different parameters therefore never overwrite each other's index. A step
+is done when ``<cache_dir>/done/<key>.json`` exists and its outputs are
+present; the framework creates directory outputs up front, so they also
+have to be non-empty. The marker is written only after success, so an
+interrupted sweep resumes at the first unfinished step.
+
+``threads``, ``mem_gb`` and ``timed`` are scheduling hints for ``--jobs``
+(see ``common.scheduler``); they do not enter the key.
+
+Input files are fingerprinted by size + mtime, not hashed: hashing every
+multi-GB base file on each invocation would cost more than most steps.
+Binaries and Python modules are small and are hashed.
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import re
+import subprocess
+import time
+
+from common.convert import atomic_write_json, file_sha256
+
+KEY_LENGTH = 16
+
+
+class StepFailed(RuntimeError):
+    pass
+
+
+def _input_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return [str(path), None]
+    return [str(path), st.st_size, st.st_mtime_ns]
+
+
+class Step:
+    def __init__(self, pipeline, name, cmd=None, func=None, args=(), kwargs=None, inputs=(), params=None,
+                 binary=None, deps=(), outputs=None, cwd=None, stdout=None, threads=1, mem_gb=0.0, timed=False):
+        if (cmd is None) == (func is None):
+            raise ValueError(f"{name}: exactly one of cmd / func is required")
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.params = dict(params or {})
+        self.binary = binary
+        self.deps = list(deps)
+        self.cwd = cwd
+        self.status = "pending"
+        # 调度提示，不参与 key：线程数、内存预估、是否为计时的查询
+        self.threads = threads
+        self.mem_gb = mem_gb
+        self.timed = timed
+        self.reserved = []
+
+        self.key = self._compute_key(pipeline, cmd, inputs)
+        self.out_is_dir = outputs is None
+        if outputs is None:
+            self.out = os.path.join(pipeline.cache_dir, name, self.key[:KEY_LENGTH])
+            self.outputs = [self.out]
+        else:
+            self.outputs = [str(p) for p in outputs]
+            self.out = self.outputs[0]
+        self.cmd = None if cmd is None else [str(c).replace("{out}", self.out) for c in cmd]
+        self.stdout = None if stdout is None else str(stdout).replace("{out}", self.out)
+        self.marker = os.path.join(pipeline.cache_dir, "done", f"{self.key}.json")
+
+    def _compute_key(self, pipeline, cmd, inputs):
+        if self.func is not None:
+            code = pipeline.fingerprint(inspect.getsourcefile(self.func))
+            action = [f"{self.func.__module__}.{self.func.__qualname__}", code, repr(self.args),
+                      repr(sorted(self.kwargs.items()))]
+        else:
+            action = [str(c) for c in cmd]
+        payload = {
+            "name": self.name,
+            "action": action,
+            "params": sorted((k, repr(v)) for k, v in self.params.items()),
+            "binary": pipeline.fingerprint(self.binary) if self.binary else None,
+            "inputs": [_input_fingerprint(p) for p in inputs],
+            "deps": [dep.key for dep in self.deps],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def is_dir_output(self, path):
+        # 默认输出是目录，显式输出以 "/" 结尾的也是目录
+        return self.out_is_dir or path.endswith("/")
+
+    def _missing_outputs(self):
+        # 目录由 prepare() 预先创建，只有里面有文件才算产出
+        return [p for p in self.outputs
+                if not os.path.exists(p) or (self.is_dir_output(p) and not os.listdir(p))]
+
+    def is_done(self):
+        return os.path.exists(self.marker) and not self._missing_outputs()
+
+    def prepare(self):
+        # 输出目录由框架创建，文件输出只建父目录
+        for path in self.outputs:
+            os.makedirs(path if self.is_dir_output(path) else os.path.dirname(path), exist_ok=True)
+
+    def check_outputs(self):
+        missing = self._missing_outputs()
+        if missing:
+            raise StepFailed(f"{self.name}: output not produced: {missing[0]}")
+
+    def execute(self):
+        self.prepare()
+        if self.func is None and self.stdout is not None:
+            with open(self.stdout, "w") as log:
+                subprocess.run(self.cmd, cwd=self.cwd, check=True, stdout=log)
+        elif self.func is None:
+            subprocess.run(self.cmd, cwd=self.cwd, check=True)
+        else:
+            self.func(*self.args, **self.kwargs)
+        self.check_outputs()
+
+    def mark_done(self, seconds):
+        os.makedirs(os.path.dirname(self.marker), exist_ok=True)
+        atomic_write_json(self.marker, {
+            "name": self.name,
+            "cmd": self.cmd,
+            "outputs": self.outputs,
+            "seconds": round(seconds, 3),
+            "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    def describe(self):
+        if self.cmd is not None:
+            return " ".join(self.cmd)
+        return f"{self.func.__qualname__}{self.args}"
+
+
+class Pipeline:
+    def __init__(self, cache_dir, force=None, dry_run=False, keep_going=False, jobs=1, mem_gb=None):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.force = re.compile(force) if force else None
+        self.dry_run = dry_run
+        self.keep_going = keep_going
+        self.jobs = jobs
+        self.mem_gb = mem_gb
+        self.steps = []
+        self._fingerprints = {}
+        self._dir_owners = {}
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.cache_dir, force=args.force, dry_run=args.dry_run, keep_going=args.keep_going,
+                   jobs=args.jobs, mem_gb=args.mem_gb)
+
+    def fingerprint(self, path):
+        """sha256 of a binary or source file, computed once per run."""
+        path = os.path.abspath(path)
+        if path not in self._fingerprints:
+            self._fingerprints[path] = file_sha256(path) if os.path.exists(path) else None
+        return self._fingerprints[path]
+
+    def add(self, name, **kwargs):
+        for dep in kwargs.get("deps", ()):
+            if dep not in self.steps:
+                raise ValueError(f"{name}: dependency {dep.name} must be added first")
+        step = Step(self, name, **kwargs)
+        # --jobs 下步骤会并发运行，同一目录若属于多个步骤，结果会交错写入
+        for path in step.outputs:
+            if step.is_dir_output(path):
+                owner = self._dir_owners.setdefault(os.path.normpath(path), step.name)
+                if owner != step.name:
+                    raise ValueError(f"{name}: output directory {path} already belongs to {owner}")
+        self.steps.append(step)
+        return step
+
+    def needs_run(self, step):
+        if self.force is not None and self.force.search(step.name):
+            return True
+        return not step.is_done()
+
+    def run_step(self, step):
+        print(f"▶️ {step.name}: {step.describe()}")
+        start = time.perf_counter()
+        step.execute()
+        step.mark_done(time.perf_counter() - start)
+        print(f"✅ {step.name} ({time.perf_counter() - start:.1f}s)")
+
+    def plan(self):
+        """Split the steps into (to_run, cached) and mark dependants of reruns for rerun."""
+        rerun = set()
+        for step in self.steps:
+            if self.needs_run(step) or any(dep.key in rerun for dep in step.deps):
+                rerun.add(step.key)
+                step.status = "pending"
+            else:
+                step.status = "cached"
+        return [s for s in self.steps if s.status == "pending"], [s for s in self.steps if s.status == "cached"]
+
+    def run(self):
+        """Run pending steps; return the number of failed steps.
+
+        With ``jobs == 1`` steps run one at a time in declaration order,
+        otherwise ``common.scheduler`` packs them onto disjoint CPU sets.
+        """
+        todo, cached = self.plan()
+        print(f"📋 {len(self.steps)} steps: {len(cached)} cached, {len(todo)} to run")
+        if self.dry_run:
+            for step in todo:
+                print(f"   would run {step.name}: {step.describe()}")
+            return 0
+        if self.jobs != 1:
+            from common.scheduler import run_parallel
+            return run_parallel(self, todo)
+
+        failed = 0
+        for step in todo:
+            blocked = [dep.name for dep in step.deps if dep.status in ("failed", "skipped")]
+            if blocked:
+                step.status = "skipped"
+                print(f"⏭️ {step.name}: skipped, {blocked[0]} did not finish")
+                continue
+            try:
+                self.run_step(step)
+                step.status = "done"
+            except Exception as e:
+                step.status = "failed"
+                failed += 1
+                print(f"❌ {step.name}: {e}")
+                if not self.keep_going:
+                    raise StepFailed(step.name) from e
+        return failed
+
+
+def add_pipeline_args(parser, cache_dir):
+    parser.add_argument("--cache_dir", default=cache_dir, help="step markers and content-addressed outputs")
+    parser.add_argument("--force", help="regex of step names to rerun even if cached")
+    parser.add_argument("--dry_run", action="store_true", help="only list the steps that would run")
+    parser.add_argument("--keep_going", action="store_true",
+                        help="continue with independent steps after a failure")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="steps to run concurrently on disjoint CPU sets (0: as many as fit)")
+    parser.add_argument("--mem_gb", type=float, default=None,
+                        help="memory budget for concurrent steps (default: MemAvailable)")
+    return parser
+
+
+def pipeline_parser(description, cache_dir):
+    return add_pipeline_args(argparse.ArgumentParser(description=description), cache_dir)
@@ -0,0 +1,318 @@
+"""Run independent pipeline steps concurrently on disjoint CPU sets.
+
+Each step declares ``threads``, an optional ``mem_gb`` estimate, and
+``timed`` for steps whose latency / QPS is the measurement. The scheduler
+reads the machine topology from sysfs (NUMA nodes, SMT siblings, restricted
+to our own affinity mask). It launches ready steps while free CPUs and
+memory allow, and pins each one with ``sched_setaffinity`` (plus
+``numactl --membind`` when available and the step fits on one node):
+
+* an untimed step (index build, ground truth) gets ``threads`` free logical
+  CPUs, taken from a single node when one has room;
+* a timed step gets ``threads`` whole physical cores on one node. It runs on
+  one hardware thread per core, and the SMT siblings stay idle. So nothing
+  else ever runs on a core a timed search is using.
+
+Cores are isolated, but L3 and memory bandwidth of a socket are still
+shared with builds running next to it. ``--jobs 1`` (the default) keeps
+the old serial behaviour.
+
+When the oldest ready step does not fit, later steps are started only
+if they leave enough free CPUs for it. This way a 32-thread build is not
+starved by a stream of single-thread searches. A step larger than the
+machine is clamped to it and runs alone.
+"""
+
+import glob
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import time
+
+POLL_INTERVAL = 0.2
+
+
+def parse_cpulist(text):
+    """``"0-3,8,10-11"`` -> ``[0, 1, 2, 3, 8, 10, 11]``."""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def format_cpulist(cpus):
+    return ",".join(str(c) for c in sorted(cpus))
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def mem_available_gb():
+    try:
+        for line in _read("/proc/meminfo").splitlines():
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / (1024 * 1024)
+    except OSError:
+        pass
+    return None
+
+
+class Topology:
+    """Physical cores (tuples of SMT siblings) per NUMA node, within our affinity mask."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    @classmethod
+    def detect(cls):
+        allowed = os.sched_getaffinity(0)
+        node_cpus = {}
+        for path in glob.glob("/sys/devices/system/node/node[0-9]*/cpulist"):
+            node = int(re.search(r"node(\d+)", path).group(1))
+            cpus = [c for c in parse_cpulist(_read(path)) if c in allowed]
+            if cpus:
+                node_cpus[node] = cpus
+        if not node_cpus:
+            node_cpus = {0: sorted(allowed)}
+
+        nodes = {}
+        for node, cpus in sorted(node_cpus.items()):
+            cores = []
+            for cpu in cpus:
+                try:
+                    siblings = parse_cpulist(
+                        _read(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"))
+                except OSError:
+                    siblings = [cpu]
+                core = tuple(c for c in siblings if c in allowed)
+                if core not in cores:
+                    cores.append(core)
+            nodes[node] = cores
+        return cls(nodes)
+
+    @property
+    def num_cpus(self):
+        return sum(len(core) for cores in self.nodes.values() for core in cores)
+
+    @property
+    def num_cores(self):
+        return sum(len(cores) for cores in self.nodes.values())
+
+    @property
+    def smt(self):
+        return max(len(core) for cores in self.nodes.values() for core in cores)
+
+    def describe(self):
+        return ", ".join(f"node{node}: {len(cores)} cores / {sum(len(c) for c in cores)} cpus"
+                         for node, cores in self.nodes.items())
+
+
+class CpuPool:
+    def __init__(self, topology, mem_gb=None):
+        self.topology = topology
+        self.free = {cpu for cores in topology.nodes.values() for core in cores for cpu in core}
+        self.mem_total = mem_gb
+        self.mem_free = mem_gb
+
+    def clamp(self, step):
+        limit = self.topology.num_cores if step.timed else self.topology.num_cpus
+        return max(1, min(step.threads, limit))
+
+    def cpus_needed(self, step):
+        """Logical CPUs ``step`` takes out of the pool (timed steps reserve whole cores)."""
+        n = self.clamp(step)
+        return n * self.topology.smt if step.timed else n
+
+    def _free_cores(self, node):
+        return [core for core in self.topology.nodes[node] if all(c in self.free for c in core)]
+
+    def _free_cpus(self, node):
+        # 未计时任务优先占用已有 SMT 兄弟被占用的核，给计时任务留出整核
+        cpus = []
+        for core in self.topology.nodes[node]:
+            idle = [c for c in core if c in self.free]
+            if idle and len(idle) < len(core):
+                cpus.extend(idle)
+        for core in self.topology.nodes[node]:
+            if all(c in self.free for c in core):
+                cpus.extend(core)
+        return cpus
+
+    def allocate(self, step):
+        """Return ``(cpus, node)`` for ``step`` or ``None`` if it does not fit now."""
+        n = self.clamp(step)
+        if self.mem_total is not None and step.mem_gb > self.mem_free and self.mem_free < self.mem_total:
+            return None
+        nodes = sorted(self.topology.nodes, key=lambda nd: -len(self._free_cpus(nd)))
+        if step.timed:
+            for node in nodes:
+                cores = self._free_cores(node)
+                if len(cores) >= n:
+                    return self._take([core[0] for core in cores[:n]], node, cores[:n], step)
+            if n <= max(len(cores) for cores in self.topology.nodes.values()):
+                return None
+            # 单个节点放不下：跨节点取整核
+            cores = [core for node in nodes for core in self._free_cores(node)]
+            if len(cores) >= n:
+                return self._take([core[0] for core in cores[:n]], None, cores[:n], step)
+            return None
+        for node in nodes:
+            cpus = self._free_cpus(node)
+            if len(cpus) >= n:
+                return self._take(cpus[:n], node, [cpus[:n]], step)
+        cpus = [c for node in nodes for c in self._free_cpus(node)]
+        if len(cpus) >= n:
+            return self._take(cpus[:n], None, [cpus[:n]], step)
+        return None
+
+    def _take(self, cpus, node, reserved, step):
+        step.reserved = [c for group in reserved for c in group]
+        self.free.difference_update(step.reserved)
+        if self.mem_free is not None:
+            self.mem_free -= step.mem_gb
+        return cpus, node
+
+    def release(self, step):
+        self.free.update(step.reserved)
+        step.reserved = []
+        if self.mem_free is not None:
+            self.mem_free += step.mem_gb
+
+    def free_count(self):
+        return len(self.free)
+
+
+def _pin(cpus):
+    os.sched_setaffinity(0, cpus)
+
+
+def _run_func(step, cpus):
+    _pin(cpus)
+    step.func(*step.args, **step.kwargs)
+
+
+class Job:
+    """A running step: a pinned subprocess, or a forked child for ``func`` steps."""
+
+    def __init__(self, step, cpus, node, log_dir, numactl):
+        self.step = step
+        self.cpus = cpus
+        self.start = time.perf_counter()
+        self.log = None
+        step.prepare()
+        if step.func is not None:
+            self.proc = multiprocessing.get_context("fork").Process(target=_run_func, args=(step, cpus))
+            self.proc.start()
+            return
+        cmd = step.cmd
+        if numactl and node is not None:
+            cmd = [numactl, f"--membind={node}", "--"] + cmd
+        log_path = step.stdout or os.path.join(log_dir, step.name.replace("/", "_") + ".log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self.log = open(log_path, "w")
+        env = dict(os.environ, OMP_NUM_THREADS=str(len(cpus)))
+        self.proc = subprocess.Popen(cmd, cwd=step.cwd, env=env, stdout=self.log,
+                                     stderr=None if step.stdout else subprocess.STDOUT,
+                                     preexec_fn=lambda: _pin(cpus))
+
+    def poll(self):
+        """Exit code, or ``None`` while the step is still running."""
+        if isinstance(self.proc, subprocess.Popen):
+            return self.proc.poll()
+        return None if self.proc.is_alive() else self.proc.exitcode
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+
+
+def run_parallel(pipeline, todo):
+    """Run ``todo`` (in dependency order) with at most ``pipeline.jobs`` steps at once."""
+    from common.pipeline import StepFailed
+
+    topology = Topology.detect()
+    mem = pipeline.mem_gb if pipeline.mem_gb is not None else mem_available_gb()
+    pool = CpuPool(topology, mem)
+    numactl = shutil.which("numactl") if len(topology.nodes) > 1 else None
+    log_dir = os.path.join(pipeline.cache_dir, "logs")
+    print(f"🧮 {topology.describe()}; up to {pipeline.jobs or 'unlimited'} concurrent steps")
+
+    pending = list(todo)
+    running = []
+    failed = 0
+    stop = False
+    while pending or running:
+        for job in list(running):
+            code = job.poll()
+            if code is None:
+                continue
+            running.remove(job)
+            job.close()
+            pool.release(job.step)
+            step = job.step
+            try:
+                if code != 0:
+                    raise StepFailed(f"exit code {code}")
+                step.check_outputs()
+                step.mark_done(time.perf_counter() - job.start)
+                step.status = "done"
+                print(f"✅ {step.name} ({time.perf_counter() - job.start:.1f}s) on cpus {format_cpulist(job.cpus)}")
+            except Exception as e:
+                step.status = "failed"
+                failed += 1
+                print(f"❌ {step.name}: {e}")
+                if not pipeline.keep_going:
+                    stop = True
+
+        if stop:
+            pending = []
+        head_need = None
+        for step in list(pending):
+            if any(dep.status in ("failed", "skipped") for dep in step.deps):
+                pending.remove(step)
+                step.status = "skipped"
+                print(f"⏭️ {step.name}: skipped, a dependency did not finish")
+                continue
+            if any(dep.status != "done" and dep.status != "cached" for dep in step.deps):
+                continue
+            if pipeline.jobs and len(running) >= pipeline.jobs:
+                break
+            # 最早就绪但放不下的任务预留 CPU，后面的任务只能用剩余部分回填
+            if head_need is not None and pool.free_count() - pool.cpus_needed(step) < head_need:
+                continue
+            placement = pool.allocate(step)
+            if placement is None:
+                if head_need is None:
+                    head_need = pool.cpus_needed(step)
+                continue
+            cpus, node = placement
+            pending.remove(step)
+            step.status = "running"
+            print(f"▶️ {step.name} on cpus {format_cpulist(cpus)}: {step.describe()}")
+            try:
+                running.append(Job(step, cpus, node, log_dir, numactl))
+            except Exception as e:
+                pool.release(step)
+                step.status = "failed"
+                failed += 1
+                print(f"❌ {step.name}: {e}")
+                if not pipeline.keep_going:
+                    stop = True
+                    break
+
+        if running:
+            time.sleep(POLL_INTERVAL)
+        elif pending:
+            # 机器全空时总能放下一个步骤（超大的已被截断），走到这里说明依赖声明有误
+            raise StepFailed(f"cannot schedule {pending[0].name}: dependencies never finished")
+
+    if stop:
+        raise StepFailed(f"{failed} step(s) failed")
+    return failed
@@ -0,0 +1,14 @@
+"""Multi-engine load generator for the filtered-search QPS tests.
+
+Replaces the per-dataset ``milvus_mp_search.py`` / ``multi_processing.py``
+copies under ``script/Milvus``, ``script/VBASE`` and ``script/PASE``:
+
+* ``config``  -- datasets, query sets, per-engine sweeps and connection settings
+* ``engines`` -- Milvus, VBASE, pgvector and PASE adapters behind one interface
+* ``core``    -- the closed-loop worker and QPS / latency measurement
+* ``aio_milvus`` -- asyncio Milvus driver, many clients over a few gRPC channels
+* ``openloop`` -- fixed-arrival-rate mode with coordinated-omission correction
+* ``recall``  -- returned-id buffers and recall@K against the gt ivecs
+* ``shm``     -- query vectors / conditions shared with workers by name
+* ``cli``     -- ``python -m loadgen --engine <e> --dataset <d>``
+"""
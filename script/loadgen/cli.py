@@ -0,0 +1,128 @@
+"""Command line for the load generator.
+
+    python -m loadgen --engine milvus --dataset sift
+    python -m loadgen --engine vbase --dataset gist --query_sets 1 4 --params 150 --concurrency 8 16 32
+    python -m loadgen --engine milvus --dataset sift --driver aio --concurrency 64 256
+    python -m loadgen --engine milvus --dataset sift --mode open --concurrency 64 --rates 500 1000 2000
+
+Run from ``script/`` (or via the per-dataset shims), with the data root
+resolved like the notebooks: ``<cwd>/data/Experiment`` unless ``--root`` is set.
+"""
+
+import argparse
+import logging
+import os
+import traceback
+
+import numpy as np
+
+from common.dataset import read_fvecs, read_ivecs
+from loadgen.aio_milvus import CHANNELS, run_async_search
+from loadgen.config import (CONCURRENCIES, DATASETS, DEFAULT_ROOT, DURATION, ENGINE_SETTINGS, K,
+                            QUERY_SETS, default_output, read_conditions)
+from loadgen.core import run_multiprocess_search
+from loadgen.engines import ENGINES, EngineSpec
+from loadgen.openloop import ARRIVALS, rate_sweep, run_rate_sweep
+from loadgen.shm import SharedArrays
+
+log = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Filtered-search QPS test (closed or open loop)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), required=True)
+    parser.add_argument("--dataset", choices=sorted(DATASETS), required=True)
+    parser.add_argument("--query_sets", nargs="+", choices=list(QUERY_SETS),
+                        help="default: the dataset's sweep for this engine")
+    parser.add_argument("--params", nargs="+", type=int,
+                        help="nprobe (milvus) / ef_search (pg engines); default: the dataset's sweep")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=CONCURRENCIES)
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed",
+                        help="open: fixed arrival rate, latency measured from the intended send time")
+    parser.add_argument("--driver", choices=("process", "aio"), default="process",
+                        help="aio: one asyncio process multiplexing all clients (milvus, closed loop)")
+    parser.add_argument("--channels", type=int, default=CHANNELS, help="aio: gRPC channels in the pool")
+    parser.add_argument("--max_inflight", type=int, help="aio: cap on concurrent RPCs (default: concurrency)")
+    parser.add_argument("--arrival", choices=ARRIVALS, default="poisson")
+    parser.add_argument("--rates", nargs="+", type=float,
+                        help="open mode target QPS; default: --rate_start x --rate_factor^i up to --rate_limit")
+    parser.add_argument("--rate_start", type=float, default=100)
+    parser.add_argument("--rate_factor", type=float, default=2)
+    parser.add_argument("--rate_limit", type=float, default=100000)
+    parser.add_argument("--seed", type=int, help="Poisson schedule seed (default: random)")
+    parser.add_argument("--duration", type=float,
+                        help=f"seconds per concurrency level (default: engine setting, else {DURATION})")
+    parser.add_argument("--K", type=int, default=K)
+    parser.add_argument("--no_recall", action="store_true",
+                        help="skip recall@K against labelfilterData/gt/<dataset>/gt-query_set_<qs>.ivecs")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="data root containing labelfilterData/")
+    parser.add_argument("--output", help="default: script/<Engine>/<dataset>/result/mul_qps.out")
+    parser.add_argument("--host")
+    parser.add_argument("--port")
+    parser.add_argument("--database")
+    parser.add_argument("--user")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args(argv)
+
+    dataset = DATASETS[args.dataset]
+    sweep = dataset.sweeps.get(args.engine)
+    query_sets = args.query_sets or (sweep.query_sets if sweep else None)
+    params = args.params or (sweep.params if sweep else None)
+    if not query_sets or not params:
+        raise SystemExit(f"no {args.engine} sweep for {args.dataset}; pass --query_sets and --params")
+
+    if args.driver == "aio" and (args.engine != "milvus" or args.mode != "closed"):
+        raise SystemExit("--driver aio supports only --engine milvus in closed mode")
+
+    settings = dict(ENGINE_SETTINGS[args.engine])
+    for key in ("host", "port", "database", "user"):
+        if getattr(args, key):
+            settings[key] = getattr(args, key)
+    if args.duration is None:
+        args.duration = settings.get("duration", DURATION)
+
+    output_file = args.output or default_output(args.engine, args.dataset)
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+
+    query_count = sweep.query_count if sweep else None
+    vectors = read_fvecs(dataset.query_file(args.root), query_count)
+
+    for query_set in query_sets:
+        conditions = read_conditions(dataset.condition_file(args.root, query_set))
+        n = min(len(vectors), len(conditions))
+        conditions = np.asarray(conditions[:n], dtype=np.int64)
+        gt_file = dataset.gt_file(args.root, query_set)
+        gt = read_ivecs(gt_file)[:n] if os.path.exists(gt_file) and not args.no_recall else None
+        if gt is None and not args.no_recall:
+            log.warning(f"{gt_file} not found; reporting QPS without recall")
+        spec = EngineSpec(args.engine, dataset.table, QUERY_SETS[query_set], args.K, settings)
+        if args.driver == "aio":
+            for param in params:
+                try:
+                    run_async_search(spec, vectors[:n], conditions, query_set, param, output_file,
+                                     args.concurrency, args.duration, args.channels, args.max_inflight, gt)
+                except Exception as e:
+                    log.error(f"Error during async search: {e}")
+                    traceback.print_exc()
+            continue
+
+        with SharedArrays() as shared:
+            shared_vectors = shared.share(vectors[:n])
+            shared_conditions = shared.share(conditions)
+            for param in params:
+                try:
+                    if args.mode == "open":
+                        rates = args.rates or list(rate_sweep(args.rate_start, args.rate_factor, args.rate_limit))
+                        run_rate_sweep(spec, shared_vectors, shared_conditions, query_set, param, output_file,
+                                       rates, args.concurrency, args.duration, args.arrival, args.seed, gt)
+                    else:
+                        run_multiprocess_search(spec, shared_vectors, shared_conditions, query_set, param,
+                                                output_file, args.concurrency, args.duration, gt)
+                except Exception as e:
+                    log.error(f"Error during multi-process search: {e}")
+                    traceback.print_exc()
+    return 0
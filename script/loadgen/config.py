@@ -0,0 +1,134 @@
+"""Declarative dataset, query-set and engine settings for the load generator.
+
+Adding a dataset is one ``Dataset`` entry in ``DATASETS``; the file layout
+under ``<root>/labelfilterData`` is the one the single-thread notebooks use::
+
+    datasets/<files>/<files>_query.fvecs
+    query_label/<files>/<query_set>.txt
+    gt/<files>/gt-query_set_<query_set>.ivecs
+
+``Sweep`` holds what used to be ``list_3`` (and the truncated ``list_1`` for
+PASE) in each per-dataset copy.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+DEFAULT_ROOT = os.path.join(os.getcwd(), "data/Experiment")
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+K = 10
+DURATION = 10          # 引擎未在 ENGINE_SETTINGS 中指定 duration 时的默认测试时长（秒）
+CONCURRENCIES = [16]
+
+# 查询集 -> 过滤列（原 list_1 / list_2）
+QUERY_SETS: Dict[str, List[str]] = {
+    "1": ["col_1"],
+    "3_1": ["col_16"],
+    "3_2": ["col_17"],
+    "3_3": ["col_18"],
+    "3_4": ["col_19"],
+    "4": ["col_8"],
+    "5_1": ["col_2"],
+    "5_2": ["col_3"],
+    "5_3": ["col_5"],
+    "5_4": ["col_1"],
+    "6": ["col_1", "col_9", "col_10"],
+    "7_1": ["col_1", "col_9", "col_16"],
+    "7_2": ["col_1", "col_9", "col_17"],
+    "7_3": ["col_1", "col_9", "col_18"],
+    "7_4": ["col_1", "col_9", "col_19"],
+}
+SINGLE_LABEL_SETS = list(QUERY_SETS)[:10]
+
+
+@dataclass
+class Sweep:
+    params: List[int]                          # nprobe (Milvus) / ef_search (PG)
+    query_sets: List[str] = field(default_factory=lambda: list(QUERY_SETS))
+    query_count: Optional[int] = None          # 只取前 query_count 个查询
+
+
+@dataclass
+class Dataset:
+    name: str
+    files: str = ""                            # 目录与文件名前缀，默认同 name
+    table: str = ""                            # Milvus collection / PG 表名，默认 <name>_label
+    sweeps: Dict[str, Sweep] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.files = self.files or self.name
+        self.table = self.table or f"{self.name}_label"
+
+    def query_file(self, root):
+        return os.path.join(root, "labelfilterData/datasets", self.files, f"{self.files}_query.fvecs")
+
+    def condition_file(self, root, query_set):
+        return os.path.join(root, "labelfilterData/query_label", self.files, f"{query_set}.txt")
+
+    def gt_file(self, root, query_set):
+        return os.path.join(root, "labelfilterData/gt", self.files, f"gt-query_set_{query_set}.ivecs")
+
+
+VBASE_PARAMS = [86, 150, 250, 400]
+PASE_SWEEP = Sweep([100, 150, 200, 250, 400, 1000], SINGLE_LABEL_SETS)
+
+DATASETS: Dict[str, Dataset] = {d.name: d for d in [
+    Dataset("sift", sweeps={
+        "milvus": Sweep([5, 8, 10, 15, 20, 30, 50, 100], query_count=10000),
+        "vbase": Sweep(VBASE_PARAMS),
+        "pase": PASE_SWEEP,
+    }),
+    Dataset("audio", sweeps={
+        "milvus": Sweep([2, 3, 4, 5, 8, 10, 12, 20], query_count=200),
+        "vbase": Sweep(VBASE_PARAMS),
+        "pase": PASE_SWEEP,
+    }),
+    Dataset("enron", sweeps={
+        "milvus": Sweep([2, 3, 4, 5, 8, 10, 12, 20], query_count=200),
+        "vbase": Sweep(VBASE_PARAMS),
+    }),
+    Dataset("gist", sweeps={
+        "milvus": Sweep([10, 15, 20, 30, 40, 50, 100, 150], query_count=100),
+        "vbase": Sweep(VBASE_PARAMS),
+    }),
+    Dataset("glove", files="glove-100", sweeps={
+        "milvus": Sweep([10, 15, 20, 30, 50, 100, 150, 200], query_count=10000),
+        "vbase": Sweep(VBASE_PARAMS),
+        "pase": PASE_SWEEP,
+    }),
+    Dataset("msong", sweeps={
+        "milvus": Sweep([3, 4, 5, 8, 15, 20, 30, 50], query_count=200),
+        "vbase": Sweep(VBASE_PARAMS),
+        "pase": PASE_SWEEP,
+    }),
+]}
+
+# 各引擎的连接参数与结果目录（script/<result_dir>/<dataset>/result/）
+ENGINE_SETTINGS: Dict[str, dict] = {
+    "milvus": {"host": "222.20.98.71", "port": "19530", "field": "image_embedding",
+               "metric": "L2", "result_dir": "Milvus"},
+    "vbase": {"host": "172.17.0.2", "port": "5432", "database": "vectordb", "user": "vectordb",
+              "field": "image_embedding", "result_dir": "VBASE", "duration": 15},
+    "pase": {"host": "222.20.98.71", "port": "5432", "database": "postgres", "user": "postgres",
+             "field": "image_embedding", "result_dir": "PASE"},
+    "pgvector": {"host": "localhost", "port": "5432", "database": "postgres", "user": "postgres",
+                 "field": "image_embedding", "result_dir": "pgvector"},
+}
+
+
+def default_output(engine, dataset):
+    result_dir = ENGINE_SETTINGS[engine]["result_dir"]
+    return os.path.join(SCRIPT_DIR, result_dir, dataset, "result", "mul_qps.out")
+
+
+def read_conditions(file_path):
+    """One list of ints per non-empty line."""
+    conditions = []
+    with open(file_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                conditions.append([int(element) for element in line.split()])
+    return conditions
@@ -0,0 +1,162 @@
+"""Closed-loop worker and measurement shared by every engine.
+
+Query vectors and conditions live in shared memory (``loadgen.shm``), so
+starting 256 workers costs 256 small handles rather than 256 copies.
+
+Each of the ``conc`` workers connects and sets the search parameter first,
+then reports ready and waits on a shared condition, so connection set-up and
+``load_collection`` are outside the timed window and all workers start
+together. A worker then sends its next query as soon as the previous one
+returns, for ``duration`` seconds, walking the query set from a random start.
+
+QPS is ``successful queries / longest worker duration``, as in the
+per-dataset scripts this replaces, and each concurrency appends one
+``mul_qps.out`` line.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing as mp
+import random
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from loadgen.recall import IdBuffer, merge_touched, recall_at_k
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ConcurrencyResult:
+    concurrency: int
+    count: int
+    duration: float
+    qps: float
+    latency_avg: float
+    latency_p99: float
+    recall: float = None           # 无 ground truth 时为 None
+
+
+def wait_for_start(q, cond):
+    # 持锁发出就绪信号，主进程 notify 时本 worker 一定已在 wait
+    with cond:
+        q.put(1)
+        cond.wait()
+
+
+def qps_line(query_set, param, qps, recall=None, extra=""):
+    """One ``mul_qps.out`` line; with recall it follows the notebooks' ``single_qps.out`` layout."""
+    if recall is None:
+        head = f"Recall Rate {query_set:<5} and {param:<4} : QPS: {float(qps):>8.2f}"
+    else:
+        head = f"Recall Rate {query_set:<5} and {param:<4}: {recall:>6.4f}, QPS: {float(qps):>8.2f}"
+    return head + extra + "\n"
+
+
+def search_worker(spec, shared_vectors, shared_conditions, param, duration, worker_id, q, cond):
+    engine = spec.create()
+    engine.connect()
+    engine.set_param(param)
+    vectors = shared_vectors.attach()
+    conditions = shared_conditions.attach()
+
+    wait_for_start(q, cond)
+
+    num = len(vectors)
+    idx = random.randint(0, num - 1)
+    count = 0
+    latencies = []
+    returned = IdBuffer(num, spec.k)
+    start_time = time.perf_counter()
+    try:
+        while time.perf_counter() - start_time < duration:
+            payload = engine.encode_one(vectors[idx])
+            condition = conditions[idx].tolist()
+            s = time.perf_counter()
+            try:
+                ids = engine.search(payload, condition)
+                returned.store(idx, ids)
+                if len(ids) > 0:
+                    count += 1
+            except Exception as e:
+                log.warning(f"{spec.engine} search error: {e}")
+            latencies.append(time.perf_counter() - s)
+            idx = idx + 1 if idx < num - 1 else 0
+    finally:
+        engine.close()
+
+    total_dur = time.perf_counter() - start_time
+    return count, total_dur, latencies, returned.touched()
+
+
+def run_workers(conc, worker, *args):
+    """Start ``conc`` spawned ``worker(*args, worker_id, q, cond)`` processes, release them together.
+
+    Returns the workers' results in submission order.
+    """
+    with mp.Manager() as manager:
+        q = manager.Queue()
+        cond = manager.Condition()
+
+        with concurrent.futures.ProcessPoolExecutor(
+            mp_context=mp.get_context("spawn"),
+            max_workers=conc,
+        ) as executor:
+            futures = [executor.submit(worker, *args, worker_id, q, cond) for worker_id in range(conc)]
+
+            # 等待所有 worker 就绪；若有 worker 启动失败则直接抛出
+            while q.qsize() < conc:
+                failed = [fut for fut in futures if fut.done() and fut.exception()]
+                if failed:
+                    raise failed[0].exception()
+                time.sleep(0.1)
+
+            with cond:
+                cond.notify_all()
+                log.info(f"Syncing all processes and starting concurrency search, concurrency={conc}")
+
+            return [fut.result() for fut in futures]
+
+
+def run_multiprocess_search(spec, vectors, conditions, query_set, param, output_file,
+                            concurrencies, duration, gt=None):
+    """Run every concurrency level and append its QPS line to ``output_file``.
+
+    ``vectors`` and ``conditions`` are ``SharedArray`` handles: only the
+    handle is pickled per worker. With ``gt`` (ground-truth ids aligned with
+    the queries) the line also carries recall@K and p99 latency.
+    """
+    results = []
+    with open(output_file, "a") as f:
+        for conc in concurrencies:
+            log.info(f"Start search {duration}s with concurrency {conc}")
+            worker_results = run_workers(conc, search_worker, spec, vectors, conditions, param, duration)
+
+            total_count = sum(r[0] for r in worker_results)
+            total_dur = max(r[1] for r in worker_results)
+            latencies = np.concatenate([np.asarray(r[2]) for r in worker_results])
+            returned = merge_touched((r[3] for r in worker_results), len(vectors), spec.k)
+            qps = total_count / total_dur if total_dur > 0 else 0
+            result = ConcurrencyResult(
+                concurrency=conc,
+                count=total_count,
+                duration=total_dur,
+                qps=qps,
+                latency_avg=float(latencies.mean()) if latencies.size else 0.0,
+                latency_p99=float(np.percentile(latencies, 99)) if latencies.size else 0.0,
+                recall=recall_at_k(returned, gt, spec.k),
+            )
+            results.append(result)
+            write_result(f, query_set, param, result)
+    return results
+
+
+def write_result(f, query_set, param, result):
+    recall = "" if result.recall is None else f"recall {result.recall:.4f}, "
+    log.info(f"{query_set} / {param} / conc {result.concurrency}: {recall}QPS {result.qps:.2f}, "
+             f"avg {result.latency_avg * 1000:.2f} ms, p99 {result.latency_p99 * 1000:.2f} ms")
+    extra = "" if result.recall is None else f", p99: {result.latency_p99 * 1000:>8.3f} ms"
+    f.write(qps_line(query_set, param, result.qps, result.recall, extra))
+    f.flush()
@@ -0,0 +1,187 @@
+"""Engine adapters: one connection, one search parameter, one query at a time.
+
+Workers are started with ``spawn``, so they get a picklable ``EngineSpec`` and
+build the adapter themselves with ``spec.create()``. Client libraries are
+imported in ``connect()``, so a Milvus-only box does not need ``psycopg2``.
+
+Every adapter has the same life cycle::
+
+    engine = spec.create()
+    engine.connect()
+    engine.set_param(value)        # nprobe / ef_search, once per worker
+    payload = engine.encode_one(vectors[i])   # untimed, one query at a time
+    ids = engine.search(payload, condition)
+    engine.close()
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class EngineSpec:
+    engine: str
+    table: str
+    columns: list
+    k: int
+    settings: dict
+
+    def create(self):
+        return ENGINES[self.engine](self)
+
+
+class Engine:
+    def __init__(self, spec):
+        self.spec = spec
+        self.settings = spec.settings
+
+    def connect(self):
+        raise NotImplementedError
+
+    def set_param(self, value):
+        raise NotImplementedError
+
+    def encode_one(self, vector):
+        """The ``search`` payload for one query row, built before its timer starts.
+
+        Workers encode query by query instead of the whole set up front, so
+        per-worker memory stays flat however many clients share the vectors.
+        """
+        return vector
+
+    def search(self, vector, condition):
+        """Return the ids of the top-k rows that match ``condition``."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MilvusEngine(Engine):
+    def connect(self):
+        from pymilvus import Collection, connections
+
+        self.alias = f"loadgen-{id(self)}"
+        connections.connect(alias=self.alias, host=self.settings["host"], port=self.settings["port"])
+        self.collection = Collection(self.spec.table, using=self.alias)
+        self.collection.load()
+
+    def set_param(self, value):
+        self.search_params = {"metric_type": self.settings["metric"], "params": {"nprobe": value}}
+
+    def encode_one(self, vector):
+        return vector.tolist()
+
+    def filter_expr(self, condition):
+        return " && ".join(f"{col} == {val}" for col, val in zip(self.spec.columns, condition))
+
+    def search(self, vector, condition):
+        results = self.collection.search(
+            data=[vector],
+            anns_field=self.settings["field"],
+            param=self.search_params,
+            limit=self.spec.k,
+            expr=self.filter_expr(condition),
+        )
+        return results[0].ids
+
+    def close(self):
+        from pymilvus import connections
+
+        connections.disconnect(self.alias)
+
+
+class PgEngine(Engine):
+    """PostgreSQL extensions behind one server-side prepared statement per session.
+
+    The session GUCs and the ``PREPARE`` run once per connection in
+    ``set_param``. Each query is then an ``EXECUTE`` whose parameters are the
+    condition values and the vector, already encoded in the extension's text
+    input format, so nothing is formatted or parsed per query. Subclasses are
+    the dialects: the vector's SQL type, its text encoding, the distance
+    operator and the search-parameter GUC.
+    """
+
+    statement = "loadgen_search"
+    vector_type = None
+    operator = "<->"
+    order = ""                 # 例如 " ASC"
+    ef_guc = "hnsw.ef_search"
+
+    def connect(self):
+        import psycopg2
+
+        self.conn = psycopg2.connect(
+            database=self.settings["database"],
+            user=self.settings["user"],
+            host=self.settings["host"],
+            port=self.settings["port"],
+        )
+        self.conn.autocommit = True
+        self.cursor = self.conn.cursor()
+
+    def session_gucs(self, value):
+        return {"enable_indexscan": "on", "enable_seqscan": "off", self.ef_guc: int(value)}
+
+    def set_param(self, value):
+        for name, setting in self.session_gucs(value).items():
+            self.cursor.execute(f"SET {name} = {setting}")
+        self.prepare()
+
+    def prepare(self):
+        columns = self.spec.columns
+        vector_arg = len(columns) + 1
+        where = " AND ".join(f"{col} = ${i + 1}" for i, col in enumerate(columns))
+        types = ", ".join(["integer"] * len(columns) + [self.vector_type])
+        self.cursor.execute(
+            f"PREPARE {self.statement} ({types}) AS "
+            f"SELECT id FROM {self.spec.table} WHERE {where} "
+            f"ORDER BY {self.settings['field']} {self.operator} ${vector_arg}{self.order} "
+            f"LIMIT {int(self.spec.k)}"
+        )
+        self.execute_sql = f"EXECUTE {self.statement} ({', '.join(['%s'] * vector_arg)})"
+
+    def encode_one(self, vector):
+        # float32 需要 9 位有效数字才能无损往返
+        return self.encode_vector(",".join(f"{x:.9g}" for x in vector.tolist()))
+
+    def encode_vector(self, values):
+        raise NotImplementedError
+
+    def search(self, vector, condition):
+        self.cursor.execute(self.execute_sql, (*condition, vector))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def close(self):
+        self.cursor.close()
+        self.conn.close()
+
+
+class VBaseEngine(PgEngine):
+    vector_type = "float8[]"
+
+    def encode_vector(self, values):
+        return "{" + values + "}"
+
+
+class PgvectorEngine(PgEngine):
+    vector_type = "vector"
+
+    def encode_vector(self, values):
+        return "[" + values + "]"
+
+
+class PaseEngine(PgEngine):
+    vector_type = "pase"
+    operator = "<?>"
+    order = " ASC"
+
+    def encode_vector(self, values):
+        return values
+
+
+ENGINES = {
+    "milvus": MilvusEngine,
+    "vbase": VBaseEngine,
+    "pgvector": PgvectorEngine,
+    "pase": PaseEngine,
+}
@@ -0,0 +1,200 @@
+"""Open-loop (fixed arrival rate) load with coordinated-omission correction.
+
+The closed loop sends a worker's next query only after the previous one
+returns. Under overload the client therefore slows down with the server:
+QPS self-throttles and latency is under-reported. Here each target rate
+fixes a send schedule in advance, either Poisson or constant arrivals split
+evenly over the ``conc`` client processes. Latency runs from a query's
+*intended* send time to its completion, so time a query spent waiting
+behind a slow one is counted.
+
+Queries scheduled in the ``duration`` window are all sent; a worker that
+is still behind after ``DRAIN_FACTOR * duration`` stops, and the queries it
+skipped are reported as dropped. A rate is saturated when queries were
+dropped, or when the answered queries per second of the run fall below
+``SATURATION_RATIO`` of the arrivals actually scheduled per second of the
+window. Every answered query counts, including empty results. The
+comparison is against the scheduled count, not the nominal rate, so
+Poisson noise in the schedule cannot end a sweep. A run that stretches
+past ``duration / SATURATION_RATIO`` while catching up on a backlog also
+counts as saturated. ``run_rate_sweep`` stops at the first saturated
+rate; the knee is the last unsaturated one.
+
+``conc`` bounds the number of queries in flight. It has to be large enough
+for the target rate (rate x latency, by Little's law), or the client is the
+bottleneck and the run shows up as saturated.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from loadgen.core import qps_line, run_workers, wait_for_start
+from loadgen.recall import IdBuffer, merge_touched, recall_at_k
+
+log = logging.getLogger(__name__)
+
+ARRIVALS = ("poisson", "constant")
+DRAIN_FACTOR = 2.0
+SATURATION_RATIO = 0.95
+
+
+@dataclass
+class RateResult:
+    target_rate: float
+    concurrency: int
+    count: int                     # 返回非空结果的查询数（与闭环 QPS 口径一致）
+    dropped: int
+    duration: float
+    scheduled: int                 # 窗口内计划发送的查询数
+    answered: int                  # 成功返回的查询数（含空结果）
+    window: float                  # 计划发送窗口 (s)
+    qps: float
+    latency_p50: float             # 从计划发送时刻算起（已校正）
+    latency_p99: float
+    service_p99: float             # 从实际发送时刻算起（未校正）
+    recall: float = None
+
+    @property
+    def saturated(self):
+        if self.dropped > 0:
+            return True
+        return self.answered / self.duration < SATURATION_RATIO * self.scheduled / self.window
+
+
+def arrival_offsets(rate, duration, arrival, conc, worker_id, seed=None):
+    """Send times (s, from the start) of one worker's share of ``rate`` QPS."""
+    if arrival == "constant":
+        # 全局等间隔 1/rate，按序号轮流分给各 worker
+        return np.arange(worker_id, rate * duration, conc) / rate
+    # 独立 Poisson 过程叠加仍是 Poisson 过程，每个 worker 取 rate / conc
+    rng = np.random.default_rng(seed)
+    worker_rate = rate / conc
+    n = int(worker_rate * duration * 1.5) + 16
+    offsets = np.cumsum(rng.exponential(1.0 / worker_rate, n))
+    while offsets[-1] < duration:
+        offsets = np.concatenate([offsets, offsets[-1] + np.cumsum(rng.exponential(1.0 / worker_rate, n))])
+    return offsets[offsets < duration]
+
+
+def open_loop_worker(spec, shared_vectors, shared_conditions, param, duration, rate, arrival, conc,
+                     seed, worker_id, q, cond):
+    engine = spec.create()
+    engine.connect()
+    engine.set_param(param)
+    vectors = shared_vectors.attach()
+    conditions = shared_conditions.attach()
+    offsets = arrival_offsets(rate, duration, arrival, conc, worker_id,
+                              None if seed is None else seed + worker_id)
+
+    wait_for_start(q, cond)
+
+    num = len(vectors)
+    idx = (worker_id * num) // conc
+    count = 0
+    answered = 0
+    latencies = np.empty(len(offsets))
+    service = np.empty(len(offsets))
+    returned = IdBuffer(num, spec.k)
+    sent = 0
+    start_time = time.perf_counter()
+    deadline = start_time + DRAIN_FACTOR * duration
+    try:
+        for offset in offsets:
+            # 在等待发送时刻之前编码，不计入延迟
+            payload = engine.encode_one(vectors[idx])
+            condition = conditions[idx].tolist()
+            intended = start_time + offset
+            now = time.perf_counter()
+            if now < intended:
+                time.sleep(intended - now)
+            elif now > deadline:
+                break
+            s = time.perf_counter()
+            try:
+                ids = engine.search(payload, condition)
+                returned.store(idx, ids)
+                answered += 1
+                if len(ids) > 0:
+                    count += 1
+            except Exception as e:
+                log.warning(f"{spec.engine} search error: {e}")
+            done = time.perf_counter()
+            latencies[sent] = done - intended
+            service[sent] = done - s
+            sent += 1
+            idx = idx + 1 if idx < num - 1 else 0
+    finally:
+        engine.close()
+
+    total_dur = time.perf_counter() - start_time
+    return (count, total_dur, latencies[:sent], service[:sent], len(offsets) - sent, returned.touched(),
+            answered, len(offsets))
+
+
+def run_open_loop_search(spec, vectors, conditions, param, rate, conc, duration, arrival="poisson", seed=None,
+                         gt=None):
+    worker_results = run_workers(conc, open_loop_worker, spec, vectors, conditions, param, duration,
+                                 rate, arrival, conc, seed)
+    count = sum(r[0] for r in worker_results)
+    total_dur = max(duration, max(r[1] for r in worker_results))
+    latencies = np.concatenate([r[2] for r in worker_results])
+    service = np.concatenate([r[3] for r in worker_results])
+    returned = merge_touched((r[5] for r in worker_results), len(vectors), spec.k)
+    has_samples = latencies.size > 0
+    return RateResult(
+        target_rate=rate,
+        concurrency=conc,
+        count=count,
+        dropped=sum(r[4] for r in worker_results),
+        duration=total_dur,
+        scheduled=sum(r[7] for r in worker_results),
+        answered=sum(r[6] for r in worker_results),
+        window=duration,
+        qps=count / total_dur,
+        latency_p50=float(np.percentile(latencies, 50)) if has_samples else 0.0,
+        latency_p99=float(np.percentile(latencies, 99)) if has_samples else 0.0,
+        service_p99=float(np.percentile(service, 99)) if has_samples else 0.0,
+        recall=recall_at_k(returned, gt, spec.k),
+    )
+
+
+def rate_sweep(start, factor, limit):
+    rate = start
+    while rate <= limit:
+        yield rate
+        rate *= factor
+
+
+def run_rate_sweep(spec, vectors, conditions, query_set, param, output_file, rates, concurrencies,
+                   duration, arrival="poisson", seed=None, gt=None):
+    """Sweep target rates per concurrency; append one line per rate to ``output_file``."""
+    results = []
+    with open(output_file, "a") as f:
+        for conc in concurrencies:
+            knee = None
+            for rate in rates:
+                log.info(f"Start open-loop {arrival} search {duration}s at {rate:.0f} QPS with concurrency {conc}")
+                result = run_open_loop_search(spec, vectors, conditions, param, rate, conc, duration, arrival,
+                                              seed, gt)
+                results.append(result)
+                recall = "" if result.recall is None else f"recall {result.recall:.4f}, "
+                log.info(f"{query_set} / {param} / conc {conc} / rate {rate:.0f}: {recall}QPS {result.qps:.2f}, "
+                         f"p50 {result.latency_p50 * 1000:.2f} ms, p99 {result.latency_p99 * 1000:.2f} ms, "
+                         f"service p99 {result.service_p99 * 1000:.2f} ms, "
+                         f"answered {result.answered}/{result.scheduled}, dropped {result.dropped}")
+                f.write(qps_line(query_set, param, result.qps, result.recall,
+                                 f", Rate: {rate:>8.2f}, p50: {result.latency_p50 * 1000:>8.3f} ms, "
+                                 f"p99: {result.latency_p99 * 1000:>8.3f} ms"))
+                f.flush()
+                if result.saturated:
+                    break
+                knee = result
+            if knee is None:
+                log.info(f"{query_set} / {param} / conc {conc}: saturated at the first rate")
+            else:
+                log.info(f"{query_set} / {param} / conc {conc}: knee at {knee.target_rate:.0f} QPS "
+                         f"(p99 {knee.latency_p99 * 1000:.2f} ms)")
+    return results
@@ -0,0 +1,51 @@
+"""Returned-id bookkeeping and recall@K for the load runs.
+
+A worker stores the ids of each answer in a preallocated ``(num_queries, K)``
+array keyed by query index (``-1`` pads short answers), so recording costs
+one row copy in the timed loop. After the window it sends back only the rows
+it touched. The parent merges those rows and scores them against the
+``gt-query_set_*.ivecs`` ground truth, as the single-thread notebooks do:
+``hits / (evaluated queries * K)``.
+"""
+
+import numpy as np
+
+
+class IdBuffer:
+    def __init__(self, num, k):
+        self.ids = np.full((num, k), -1, dtype=np.int64)
+        self.seen = np.zeros(num, dtype=bool)
+
+    def store(self, idx, ids):
+        n = min(len(ids), self.ids.shape[1])
+        row = self.ids[idx]
+        row[:n] = ids[:n]
+        row[n:] = -1
+        self.seen[idx] = True
+
+    def touched(self):
+        """``(query indices, id rows)`` for the queries answered at least once."""
+        rows = np.flatnonzero(self.seen)
+        return rows, self.ids[rows]
+
+
+def merge_touched(parts, num, k):
+    """Combine the workers' ``touched()`` parts into one ``IdBuffer``."""
+    merged = IdBuffer(num, k)
+    for rows, ids in parts:
+        merged.ids[rows] = ids
+        merged.seen[rows] = True
+    return merged
+
+
+def recall_at_k(buffer, gt, k):
+    """Mean recall@k over the answered queries that have ground truth; ``None`` without gt."""
+    if gt is None:
+        return None
+    rows = np.flatnonzero(buffer.seen[:len(gt)])
+    if rows.size == 0:
+        return 0.0
+    truth = np.asarray(gt[rows, :k], dtype=np.int64)
+    found = buffer.ids[rows, :k]
+    hits = (found[:, :, None] == truth[:, None, :]).any(axis=2).sum()
+    return float(hits) / (rows.size * k)
@@ -0,0 +1,67 @@
+"""Query arrays shared with spawned workers through ``multiprocessing.shared_memory``.
+
+The parent copies each array into a named segment once per query set and
+passes workers a small ``SharedArray`` handle. A worker attaches by name and
+gets a NumPy view of the same pages, so it pickles only the handle, and the
+memory use stays flat whatever the concurrency::
+
+    with SharedArrays() as shared:
+        handle = shared.share(vectors)
+        ...                       # pass ``handle`` to workers
+    # segments are unlinked here
+
+    vectors = handle.attach()    # in the worker
+"""
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 子进程中已映射的段；views 引用其缓冲区，需保持到进程退出
+_ATTACHED = {}
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    name: str
+    shape: tuple
+    dtype: str
+
+    def __len__(self):
+        return self.shape[0]
+
+    def attach(self):
+        """Read-only view of the segment, mapped once per process."""
+        shm = _ATTACHED.get(self.name)
+        if shm is None:
+            shm = _ATTACHED[self.name] = shared_memory.SharedMemory(name=self.name)
+        view = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+        view.flags.writeable = False
+        return view
+
+
+class SharedArrays:
+    """Owner of the segments; unlinks all of them on exit."""
+
+    def __init__(self):
+        self.segments = []
+
+    def share(self, array):
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.segments.append(shm)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        return SharedArray(shm.name, array.shape, array.dtype.str)
+
+    def close(self):
+        for shm in self.segments:
+            shm.close()
+            shm.unlink()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
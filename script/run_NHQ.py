@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import os
 import subprocess
-import argparse
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.pipeline import Pipeline, pipeline_parser
 
 # ========= 固定路径 =========
 BASE_DATA_PATH = "/data/HybridANNS/data"
@@ -34,12 +37,6 @@ query_sets = {
    
 }
 
-# ========= 参数解析 =========
-parser = argparse.ArgumentParser()
-parser.add_argument("--datasets", nargs="+", help="Specify datasets (default: all)")
-parser.add_argument("--queries", nargs="+", help="Specify query keys (default: all)")
-args = parser.parse_args()
-
 # ========= 编译模块 =========
 def compile_all():
     import shutil
@@ -72,100 +69,58 @@ def compile_all():
     print("✅ Compilation completed\n")
 
 
-# ========= 构建索引 =========
-def build_index(dataset, query_key):
-    # 检查必要文件是否存在
-    base_vecs = os.path.join(DATA_PATH, dataset, f"{dataset}_base.fvecs")
-    label_file = os.path.join(LABEL_PATH, dataset, f"label_{query_key.replace('_', '-')}.txt")
-    
-    # 检查基本数据文件是否存在
-    if not os.path.isfile(base_vecs):
-        print(f"❌ Base vector file not found: {base_vecs}")
-        return False
-    
-    if not os.path.isfile(label_file):
-        print(f"❌ Label file not found: {label_file}")
-        return False
-    
-    params = dict(x.split("=") for x in dataset_params[dataset].split("; "))
-    index_dir = os.path.join(INDEX_PATH, f"NHQ_{dataset}_kgraph_{query_key.replace('_', '-')}")
+# ========= 构建 / 查询步骤 =========
+BUILD_BIN = os.path.join(NHQ_PATH, "NHQ-NPG_kgraph/build/tests/test_dng_index")
+SEARCH_BIN = os.path.join(NHQ_PATH, "NHQ-NPG_kgraph/build/tests/test_dng_optimized_search")
 
-    os.makedirs(index_dir, exist_ok=True)
 
-    bin_path = os.path.join(NHQ_PATH, "NHQ-NPG_kgraph/build/tests/test_dng_index")
-    
-    # 检查执行文件是否存在
-    if not os.path.isfile(bin_path):
-        print(f"❌ Binary file not found: {bin_path}")
-        return False
-    
-    cmd = [
-        "taskset", "-c", "0-31", bin_path,
-        base_vecs, label_file,
-        os.path.join(index_dir, "index"),
-        os.path.join(index_dir, "table"),
-        params["K"], params["L"], params["ITER"], params["S"], params["R"],
-        params["RANGE"], params["PL"], params["B"], params["M"]
-    ]
-    print(f"🔨 Building index: {dataset}, query {query_key}")
-    print(f"📦 Command: {' '.join(str(c) for c in cmd)}\n")
-    subprocess.run(cmd, check=True)
-    return True
-
-# ========= 执行查询 =========
-def search(dataset, query_key):
-    base_file = os.path.join(DATA_PATH, dataset, f"{dataset}_base.fvecs")
+def add_nhq_steps(pipeline, dataset, query_key):
+    base_vecs = os.path.join(DATA_PATH, dataset, f"{dataset}_base.fvecs")
+    base_label = os.path.join(LABEL_PATH, dataset, f"label_{query_key.replace('_', '-')}.txt")
     query_vecs = os.path.join(DATA_PATH, dataset, f"{dataset}_query.fvecs")
-    label_file = os.path.join(QUERY_PATH, dataset, f"{query_key}.txt")
+    query_label = os.path.join(QUERY_PATH, dataset, f"{query_key}.txt")
     gt_file = os.path.join(GROUNDTRUTH_PATH, dataset, f"gt-{query_sets[query_key]}.ivecs")
-    index_dir = os.path.join(INDEX_PATH, f"NHQ_{dataset}_kgraph_{query_key.replace('_', '-')}")
-    
-    # 检查所有必需文件
-    required_files = {
-        "Base vector file": base_file,
-        "Query vector file": query_vecs,
-        "Label file": label_file,
-        "Ground truth file": gt_file,
-        "Index file": os.path.join(index_dir, "index"),
-        "Table file": os.path.join(index_dir, "table")
-    }
-    
-    # 检查每个文件是否存在
-    missing_files = []
-    for desc, file_path in required_files.items():
-        if not os.path.isfile(file_path):
-            missing_files.append(f"{desc}: {file_path}")
-    
-    # 如果有缺失文件，报告并返回
-    if missing_files:
-        print(f"⚠️ Missing files for {dataset}/{query_key}:")
-        for missing in missing_files:
-            print(f"   - {missing}")
-        return False
-
-    bin_path = os.path.join(NHQ_PATH, "NHQ-NPG_kgraph/build/tests/test_dng_optimized_search")
-    
-    # 检查执行文件是否存在
-    if not os.path.isfile(bin_path):
-        print(f"❌ Binary file not found: {bin_path}")
-        return False
-    
-    cmd = [bin_path,
-           os.path.join(index_dir, "index"),
-           os.path.join(index_dir, "table"),
-           base_file, query_vecs, label_file, gt_file, dataset]
+    params = dict(x.split("=") for x in dataset_params[dataset].split("; "))
 
-    print(f"🔍 Running search: {dataset}, query {query_key}")
-    print(f"📦 Command: {' '.join(str(c) for c in cmd)}\n")
-    subprocess.run(cmd, check=True)
-    return True
+    # 索引目录 INDEX_PATH/<step>/<key> 由构建参数和二进制的哈希决定
+    build = pipeline.add(
+        f"NHQ_{dataset}_kgraph_{query_key.replace('_', '-')}",
+        cmd=[BUILD_BIN,
+             base_vecs, base_label, "{out}/index", "{out}/table",
+             params["K"], params["L"], params["ITER"], params["S"], params["R"],
+             params["RANGE"], params["PL"], params["B"], params["M"]],
+        binary=BUILD_BIN,
+        inputs=[base_vecs, base_label],
+        threads=32,   # 原先用 taskset -c 0-31 固定核，现在由调度器分配
+    )
+    # 查询程序只把结果打印到标准输出，保存为 search.log
+    pipeline.add(
+        f"NHQ_{dataset}_kgraph_{query_key.replace('_', '-')}_search",
+        cmd=[SEARCH_BIN, f"{build.out}/index", f"{build.out}/table",
+             base_vecs, query_vecs, query_label, gt_file, dataset],
+        binary=SEARCH_BIN,
+        inputs=[query_vecs, query_label, gt_file],
+        deps=[build],
+        stdout="{out}/search.log",
+        timed=True,
+    )
 
 # ========= 主流程 =========
-if __name__ == "__main__":
+def main():
+    parser = pipeline_parser("NHQ build / search", INDEX_PATH)
+    parser.add_argument("--datasets", nargs="+", help="Specify datasets (default: all)")
+    parser.add_argument("--queries", nargs="+", help="Specify query keys (default: all)")
+    # 缺少输入文件或构建失败的组合记为失败，默认其余组合继续执行
+    parser.add_argument("--stop_on_failure", dest="keep_going", action="store_false",
+                        help="stop at the first failed step")
+    parser.set_defaults(keep_going=True)
+    args = parser.parse_args()
+
     # compile_all()
     datasets = args.datasets if args.datasets else list(dataset_params.keys())
     queries = args.queries if args.queries else list(query_sets.keys())
 
+    pipeline = Pipeline.from_args(args)
     for dataset in datasets:
         if dataset not in dataset_params:
             print(f"❌ Unknown dataset: {dataset}")
@@ -174,10 +129,8 @@ if __name__ == "__main__":
             if query_key not in query_sets:
                 print(f"❌ Unknown query: {query_key}")
                 continue
-            try:
-                if build_index(dataset, query_key):
-                    search(dataset, query_key)
-                else:
-                    print(f"⚠️ Skipping search for {dataset}, query {query_key} due to index build failure")
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Failed on {dataset}, query {query_key}: {e}")
\ No newline at end of file
+            add_nhq_steps(pipeline, dataset, query_key)
+    return 1 if pipeline.run() else 0
+
+if __name__ == "__main__":
+    sys.exit(main())